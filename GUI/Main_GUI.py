@@ -1,7 +1,9 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import json
+import threading
 from api_handler import APIHandler
+from results_store import ResultsStore
 from datetime import datetime
 
 
@@ -26,7 +28,7 @@ class SelectionFrame(ttk.Frame):
         api_frame.pack(fill='x', padx=20, pady=10)
 
         self.api_var = tk.StringVar()
-        apis = ['Claude', 'ChatGPT', 'Sonar', 'xAI']
+        apis = list(controller.api_handler.clients) + ['Any']
         for api in apis:
             ttk.Radiobutton(api_frame,
                             text=api,
@@ -122,7 +124,8 @@ class InputFrame(ttk.Frame):
             result = self.controller.api_handler.analyze(
                 self.controller.selected_api,
                 self.controller.selected_analysis,
-                text
+                text,
+                priority='interactive'
             )
 
             # Add metadata to results
@@ -132,6 +135,12 @@ class InputFrame(ttk.Frame):
                 "input_text": text,
                 "results": result
             }
+            self.controller.analysis_results["id"] = self.controller.results_store.add(
+                self.controller.selected_api,
+                self.controller.selected_analysis,
+                text,
+                result
+            )
 
             self.controller.show_results_frame()
 
@@ -143,24 +152,90 @@ class InputFrame(ttk.Frame):
 
 
 class ResultsFrame(ttk.Frame):
+    # Treeview columns: (store column, heading, width)
+    COLUMNS = [
+        ("created_at", "Time", 150),
+        ("api", "API", 80),
+        ("analysis_type", "Analysis", 170),
+        ("input_text", "Text", 320),
+        ("label", "Label", 110),
+        ("score", "Score", 60)
+    ]
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
         self.configure(padding="20")
 
+        # View state; rows are fetched from the store one window at a time
+        self.sort_column = "id"
+        self.sort_descending = True
+        self.filters = {}
+        self.total = 0
+        self.offset = 0
+        self.visible_rows = 20
+
         # Title
         self.title_label = ttk.Label(self,
                                      text="Analysis Results",
                                      font=('Helvetica', 14, 'bold'))
         self.title_label.pack(pady=10)
 
-        # Results text area
-        self.results_text = tk.Text(self, height=15, width=60)
-        self.results_text.pack(pady=10, fill='both', expand=True)
-
-        # Visualization frame (placeholder)
-        self.viz_frame = ttk.Frame(self)
-        self.viz_frame.pack(fill='both', expand=True, pady=10)
+        # Filter bar
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill='x', pady=5)
+
+        ttk.Label(filter_frame, text="Search:").pack(side='left')
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(filter_frame, textvariable=self.search_var, width=30)
+        search_entry.pack(side='left', padx=5)
+        search_entry.bind('<Return>', lambda event: self.apply_filters())
+
+        self.filter_vars = {}
+        for column, heading in (("api", "API"), ("analysis_type", "Analysis"), ("label", "Label")):
+            ttk.Label(filter_frame, text=f"{heading}:").pack(side='left', padx=(10, 0))
+            variable = tk.StringVar()
+            combo = ttk.Combobox(filter_frame, textvariable=variable, width=14,
+                                 postcommand=lambda column=column: self._load_choices(column))
+            combo.pack(side='left', padx=5)
+            combo.bind('<<ComboboxSelected>>', lambda event: self.apply_filters())
+            combo.bind('<Return>', lambda event: self.apply_filters())
+            self.filter_vars[column] = (variable, combo)
+
+        ttk.Button(filter_frame, text="Clear", command=self.clear_filters).pack(side='right')
+
+        # Results table; only the visible window of rows is ever inserted into the Treeview
+        table_frame = ttk.Frame(self)
+        table_frame.pack(fill='both', expand=True, pady=5)
+
+        self.tree = ttk.Treeview(table_frame,
+                                 columns=[column for column, _, _ in self.COLUMNS],
+                                 show='headings',
+                                 selectmode='browse')
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading, command=lambda column=column: self.sort_by(column))
+            self.tree.column(column, width=width, stretch=(column == "input_text"))
+        self.tree.pack(side='left', fill='both', expand=True)
+
+        self.scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll_to(self.offset - 3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_to(self.offset + 3))
+        self.tree.bind('<Up>', lambda event: self.move_selection(-1))
+        self.tree.bind('<Down>', lambda event: self.move_selection(1))
+        self.tree.bind('<Prior>', lambda event: self.scroll_to(self.offset - self.visible_rows))
+        self.tree.bind('<Next>', lambda event: self.scroll_to(self.offset + self.visible_rows))
+        self.tree.bind('<<TreeviewSelect>>', self.show_details)
+
+        self.status_label = ttk.Label(self, text="")
+        self.status_label.pack(anchor='w')
+
+        # Full JSON of the selected row
+        self.results_text = tk.Text(self, height=8, width=60)
+        self.results_text.pack(pady=10, fill='both')
 
         # Buttons frame
         button_frame = ttk.Frame(self)
@@ -171,18 +246,171 @@ class ResultsFrame(ttk.Frame):
                                       command=self.controller.show_selection_frame)
         new_analysis_btn.pack(side='left', padx=5)
 
+        self.import_btn = ttk.Button(button_frame,
+                                     text="Import Results...",
+                                     command=self.import_results)
+        self.import_btn.pack(side='left', padx=5)
+
         download_btn = ttk.Button(button_frame,
                                   text="Download Results",
                                   command=self.save_results)
         download_btn.pack(side='right', padx=5)
 
+    @property
+    def store(self):
+        return self.controller.results_store
+
     def display_results(self, results):
-        # Clear previous results
+        # The newest result is the first row of the default view; filters left over from browsing could hide it
+        self.sort_column = "id"
+        self.sort_descending = True
+        self.search_var.set('')
+        for variable, _ in self.filter_vars.values():
+            variable.set('')
+        self.filters = {}
+        self.refresh(keep_offset=False)
+        if results and self.tree.get_children():
+            row = str(results.get('id', ''))
+            row = row if self.tree.exists(row) else self.tree.get_children()[0]
+            self.tree.selection_set(row)
+            self.tree.focus(row)
+            self.tree.see(row)
+
+    def refresh(self, keep_offset=True):
+        self.total = self.store.count(self.filters)
+        self.offset = self.offset if keep_offset else 0
+        self.render()
+
+    def render(self):
+        self.offset = max(0, min(self.offset, self.total - self.visible_rows))
+        rows = self.store.rows(self.offset, self.visible_rows, self.sort_column, self.sort_descending, self.filters)
+
+        selected = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for row_id, created_at, api, analysis_type, input_text, label, score in rows:
+            self.tree.insert('', 'end', iid=str(row_id), values=(
+                created_at[:19].replace('T', ' '), api or '', analysis_type or '',
+                " ".join(input_text.split())[:200], label or '', '' if score is None else f"{score:.2f}"))
+        if selected and self.tree.exists(selected[0]):
+            self.tree.selection_set(selected[0])
+
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, (self.offset + len(rows)) / self.total)
+            shown = f"Rows {self.offset + 1:,}-{self.offset + len(rows):,} of {self.total:,}"
+        else:
+            self.scrollbar.set(0, 1)
+            shown = "No results"
+        order = "descending" if self.sort_descending else "ascending"
+        self.status_label.config(text=f"{shown} | sorted by {self.sort_column} ({order})")
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self.total - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+        return 'break'
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(amount) * self.total)
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def on_mousewheel(self, event):
+        return self.scroll_to(self.offset - int(event.delta / 120) * 3)
+
+    def on_resize(self, event):
+        # Fit the window of fetched rows to the widget height
+        style = ttk.Style()
+        row_height = style.lookup('Treeview', 'rowheight') or 20
+        visible_rows = max(1, int(event.height / int(row_height)) - 1)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.render()
+
+    def move_selection(self, step):
+        children = self.tree.get_children()
+        selected = self.tree.selection()
+        if not children:
+            return 'break'
+        index = children.index(selected[0]) + step if selected else 0
+        if index < 0:
+            self.scroll_to(self.offset - 1)
+            index = 0
+        elif index >= len(children):
+            self.scroll_to(self.offset + 1)
+            index = len(self.tree.get_children()) - 1
+        children = self.tree.get_children()
+        if children:
+            self.tree.selection_set(children[index])
+            self.tree.focus(children[index])
+        return 'break'
+
+    def sort_by(self, column):
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = column in ("created_at", "score")
+        self.refresh(keep_offset=False)
+
+    def _load_choices(self, column):
+        variable, combo = self.filter_vars[column]
+        combo['values'] = [''] + self.store.distinct(column)
+
+    def apply_filters(self):
+        self.filters = {"text": self.search_var.get().strip()}
+        for column, (variable, _) in self.filter_vars.items():
+            self.filters[column] = variable.get().strip()
+        self.refresh(keep_offset=False)
+
+    def clear_filters(self):
+        self.search_var.set('')
+        for variable, _ in self.filter_vars.values():
+            variable.set('')
+        self.apply_filters()
+
+    def show_details(self, event=None):
+        selected = self.tree.selection()
         self.results_text.delete("1.0", "end")
+        if not selected:
+            return
+        record = self.store.get(int(selected[0]))
+        if record:
+            self.results_text.insert("1.0", json.dumps(record, indent=2))
+
+    def import_results(self):
+        path = filedialog.askopenfilename(title="Import results",
+                                          filetypes=[("JSON Lines", "*.jsonl"), ("All files", "*.*")])
+        if not path:
+            return
+
+        # Large files take a while; import on a worker thread and poll for it from the Tk event loop
+        self.import_btn.state(['disabled'])
+        self.status_label.config(text=f"Importing {path}...")
+        outcome = {}
 
-        # Display formatted results
-        formatted_results = json.dumps(results, indent=2)
-        self.results_text.insert("1.0", formatted_results)
+        def run():
+            try:
+                outcome['imported'] = self.store.import_jsonl(path)
+            except Exception as e:
+                outcome['error'] = e
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        self.after(100, self._finish_import, worker, path, outcome)
+
+    def _finish_import(self, worker, path, outcome):
+        if worker.is_alive():
+            self.after(100, self._finish_import, worker, path, outcome)
+            return
+        self.import_btn.state(['!disabled'])
+        self.refresh(keep_offset=False)
+        if 'error' in outcome:
+            messagebox.showerror("Import Error", f"Could not import {path}: {str(outcome['error'])}")
+        else:
+            messagebox.showinfo("Import Results", f"Imported {outcome['imported']:,} results.")
 
     def save_results(self):
         # We'll implement the save functionality later
@@ -202,6 +430,10 @@ class MainApplication(tk.Tk):
         # Initialize API handler
         self.api_handler = APIHandler()
 
+        # Every result is kept on disk; the results view pages through it
+        output_settings = self.api_handler.config.get_output_settings()
+        self.results_store = ResultsStore(output_settings.get('results_db', './results/results.db'))
+
         # Initialize variables
         self.selected_api = None
         self.selected_analysis = None
@@ -215,6 +447,13 @@ class MainApplication(tk.Tk):
         # Start with selection frame
         self.show_selection_frame()
 
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        self.api_handler.close()
+        self.results_store.close()
+        self.destroy()
+
     def show_selection_frame(self):
         self.input_frame.pack_forget()
         self.results_frame.pack_forget()
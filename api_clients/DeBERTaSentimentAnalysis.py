@@ -2,6 +2,10 @@ import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch.nn.functional as F
 import os
+import threading
+from typing import Dict, Any, List, Optional
+from long_document import chunk_weight, summarize_chunks
+from tokenization_cache import TokenizationCache
 
 """
 DeBERTA-v3 was found on Hugging Face here: https://huggingface.co/mrm8488/deberta-v3-ft-financial-news-sentiment-analysis
@@ -10,32 +14,127 @@ More information on its training set can be found here: https://huggingface.co/m
 
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
 
-def analyze_sentiment(text):
-    # Load the model and tokenizer
-    tokenizer = AutoTokenizer.from_pretrained("mrm8488/deberta-v3-ft-financial-news-sentiment-analysis")
-    model = AutoModelForSequenceClassification.from_pretrained(
-        "mrm8488/deberta-v3-ft-financial-news-sentiment-analysis")
+MODEL_NAME = "mrm8488/deberta-v3-ft-financial-news-sentiment-analysis"
+
+# DeBERTa's labels are: ['negative', 'neutral', 'positive']
+LABELS = ['negative', 'neutral', 'positive']
+
+
+class DeBERTaSentimentAnalyzer:
+    def __init__(self, model_name: str = MODEL_NAME, max_length: int = 512, device: Optional[str] = None,
+                 tokenizer=None, model=None, traced_model=None, token_cache_size: int = 50000):
+        """
+        Load the tokenizer and model once so repeated calls only pay for inference.
+
+        Parameters:
+            model_name (str): Hugging Face model id or local directory.
+            max_length (int): Maximum number of tokens per input.
+            device (str): Torch device, defaults to CUDA when available.
+            tokenizer, model: Preloaded components; skip loading from `model_name` when given.
+            traced_model: Optional TorchScript graph taking (input_ids, attention_mask) and returning logits.
+            token_cache_size (int): Number of tokenized texts kept in the LRU cache.
+        """
+        self.max_length = max_length
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        if tokenizer is None:
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if model is None:
+            model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.tokenizer = tokenizer
+        self.model = model.to(self.device)
+        self.model.eval()
+        self.traced_model = traced_model
+        self.token_cache = TokenizationCache(self.tokenizer, max_length, token_cache_size)
+
+    def _logits(self, inputs) -> torch.Tensor:
+        if self.traced_model is not None:
+            output = self.traced_model(inputs['input_ids'], inputs['attention_mask'])
+            return output[0] if isinstance(output, (tuple, list)) else output
+        return self.model(**inputs).logits
+
+    @staticmethod
+    def _to_percentages(probabilities: List[float]) -> Dict[str, float]:
+        return {label: round(p * 100, 2) for label, p in zip(LABELS, probabilities)}
+
+    def analyze(self, text: str) -> Dict[str, float]:
+        return self.analyze_batch([text])[0]
 
-    # Tokenize the input text
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
+    def analyze_batch(self, texts: List[str], batch_size: int = 32) -> List[Dict[str, float]]:
+        """Score many texts, padding each batch to its longest member for a single forward pass."""
+        results = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                inputs = self.token_cache.encode_batch(texts[start:start + batch_size])
+                inputs = {name: tensor.to(self.device) for name, tensor in inputs.items()}
+                probabilities = F.softmax(self._logits(inputs), dim=1)
+                results.extend(self._to_percentages(row) for row in probabilities.tolist())
+        return results
 
-    # Get model outputs
-    outputs = model(**inputs)
+    def analyze_long_document(self, text: str, stride: int = 128, pooling: str = 'length',
+                              batch_size: int = 16) -> Dict[str, Any]:
+        """
+        Score text of any length with overlapping token windows instead of truncating at max_length.
 
-    # Apply softmax to get probabilities
-    probabilities = F.softmax(outputs.logits, dim=1)
+        All windows are scored in batched forward passes and pooled by window length or by
+        prediction confidence. Per-window scores and character offsets are returned so the most
+        positive/negative passages can be located.
 
-    # Convert to percentages
-    percentages = probabilities[0].tolist()
+        Parameters:
+            text (str): Full document.
+            stride (int): Number of tokens shared between consecutive windows.
+            pooling (str): 'length' or 'confidence'.
+            batch_size (int): Windows per forward pass.
+        """
+        encoded = self.tokenizer(text, truncation=True, max_length=self.max_length, stride=stride,
+                                 return_overflowing_tokens=True, return_offsets_mapping=True,
+                                 padding=True, return_tensors="pt")
+        offsets = encoded.pop('offset_mapping')
+        encoded.pop('overflow_to_sample_mapping', None)
+        lengths = encoded['attention_mask'].sum(dim=1).tolist()
 
-    # DeBERTa's labels are: ['negative', 'neutral', 'positive']
-    sentiments = {
-        'negative': round(percentages[0] * 100, 2),
-        'neutral': round(percentages[1] * 100, 2),
-        'positive': round(percentages[2] * 100, 2)
-    }
+        chunks = []
+        with torch.inference_mode():
+            for start in range(0, encoded['input_ids'].shape[0], batch_size):
+                inputs = {name: tensor[start:start + batch_size].to(self.device) for name, tensor in encoded.items()}
+                probabilities = F.softmax(self._logits(inputs), dim=1).tolist()
+                for offset, row in enumerate(probabilities):
+                    index = start + offset
+                    # Special tokens have (0, 0) offsets
+                    spans = [span for span in offsets[index].tolist() if span[1] > span[0]]
+                    sentiment = self._to_percentages(row)
+                    chunks.append({
+                        "index": index,
+                        "start_char": spans[0][0] if spans else 0,
+                        "end_char": spans[-1][1] if spans else 0,
+                        "tokens": int(lengths[index]),
+                        "sentiment": sentiment,
+                        "weight": chunk_weight(sentiment, int(lengths[index]), pooling)
+                    })
 
-    return sentiments
+        return summarize_chunks(chunks, pooling)
+
+
+_shared_analyzer: Optional[DeBERTaSentimentAnalyzer] = None
+_shared_lock = threading.Lock()
+
+
+def get_analyzer() -> DeBERTaSentimentAnalyzer:
+    """Return the process-wide analyzer, loading the model on first use."""
+    global _shared_analyzer
+    with _shared_lock:
+        if _shared_analyzer is None:
+            # Prefer a prebuilt artifact (see deberta_artifact.py) to skip hub lookups at start-up
+            artifact_dir = os.environ.get('NLIE_DEBERTA_ARTIFACT')
+            if artifact_dir:
+                from deberta_artifact import load_artifact
+                _shared_analyzer = load_artifact(artifact_dir)
+            else:
+                _shared_analyzer = DeBERTaSentimentAnalyzer()
+    return _shared_analyzer
+
+
+def analyze_sentiment(text):
+    return get_analyzer().analyze(text)
 
 
 # Example usage
@@ -46,4 +145,4 @@ if __name__ == "__main__":
     print(f"Input text: {test_sentence}")
     print("\nSentiment Analysis Results:")
     for sentiment, percentage in results.items():
-        print(f"{sentiment.capitalize()}: {percentage}%")
\ No newline at end of file
+        print(f"{sentiment.capitalize()}: {percentage}%")
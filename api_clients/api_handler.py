@@ -1,33 +1,37 @@
-from typing import Dict, Any
-import json
-from anthropic import Anthropic
+from typing import Dict, Any, List, Optional
+import time
+import asyncio
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from anthropic import Anthropic, NOT_GIVEN
 import openai
-import requests
+import httpx
 from datetime import datetime
 from config_handler import ConfigHandler
+from async_transport import AsyncChatCompletionsClient, run_sync, current_cancellation
+from request_scheduler import RequestScheduler, DeadlineExceeded
+from long_document import analyze_long_document_remote
+from provider_health import HealthTracker
+from hedging import RequestHedger
+from record_replay import build_recorder
+from tracing import tracer, configure_tracing, SPAN_KIND_CLIENT, STATUS_ERROR
+from structured_output import (RESPONSE_SCHEMAS, PARSE_METRICS, openai_response_format, openai_response_format_for,
+                               openai_sampling_params, anthropic_tool, parse_result, check_result)
 
 
-class BaseAPIClient:
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-
-    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        raise NotImplementedError
-
-    def analyze_ner(self, text: str) -> Dict[str, Any]:
-        raise NotImplementedError
+# Short keys used for analysis types in config.yaml
+ANALYSIS_TYPE_KEYS = {
+    "Sentiment Analysis": "sentiment",
+    "Named Entity Recognition": "ner",
+    "Text Classification": "classification"
+}
 
-    def analyze_classification(self, text: str) -> Dict[str, Any]:
-        raise NotImplementedError
 
+# Pseudo-provider name that routes each request to the fastest healthy capable provider
+ANY_PROVIDER = "Any"
 
-class ClaudeClient(BaseAPIClient):
-    def __init__(self, api_key: str):
-        super().__init__(api_key)
-        self.client = Anthropic(api_key=api_key)
 
-    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        system_prompt = """You are a financial sentiment analyzer. Your task is to analyze the sentiment of financial headlines 
+# System prompts shared by the LLM clients
+SENTIMENT_SYSTEM_PROMPT = """You are a financial sentiment analyzer. Your task is to analyze the sentiment of financial headlines 
         and provide a percentage breakdown across three categories: positive, neutral, and negative. The percentages should 
         sum to 100%. Consider the following in your analysis:
         - Impact on stock price/company value
@@ -45,36 +49,7 @@ class ClaudeClient(BaseAPIClient):
             "explanation": "Brief explanation of the analysis"
         }"""
 
-        try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20240620",
-                max_tokens=1000,
-                temperature=0,
-                system=system_prompt,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"Analyze the sentiment of this text: {text}"
-                    }
-                ]
-            )
-
-            result = json.loads(response.content[0].text)
-            result['timestamp'] = datetime.now().isoformat()
-            return result
-
-        except Exception as e:
-            return {
-                "error": f"An error occurred: {str(e)}",
-                "sentiment": {
-                    "positive": 0,
-                    "neutral": 0,
-                    "negative": 0
-                }
-            }
-
-    def analyze_ner(self, text: str) -> Dict[str, Any]:
-        system_prompt = """You are a Named Entity Recognition system. Analyze the provided text and identify key entities.
+NER_SYSTEM_PROMPT = """You are a Named Entity Recognition system. Analyze the provided text and identify key entities.
         Categorize them into: PERSON, ORGANIZATION, LOCATION, DATE, MONEY, and MISC.
 
         Respond only with a JSON object in this exact format:
@@ -90,32 +65,7 @@ class ClaudeClient(BaseAPIClient):
             "summary": "Brief summary of found entities"
         }"""
 
-        try:
-            response = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=1000,
-                temperature=0,
-                system=system_prompt,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"Perform NER analysis on this text: {text}"
-                    }
-                ]
-            )
-
-            result = json.loads(response.content[0].text)
-            result['timestamp'] = datetime.now().isoformat()
-            return result
-
-        except Exception as e:
-            return {
-                "error": f"An error occurred: {str(e)}",
-                "entities": []
-            }
-
-    def analyze_classification(self, text: str) -> Dict[str, Any]:
-        system_prompt = """You are a text classification system. Analyze the provided text and classify it into relevant categories.
+CLASSIFICATION_SYSTEM_PROMPT = """You are a text classification system. Analyze the provided text and classify it into relevant categories.
         Provide confidence scores for each category.
 
         Respond only with a JSON object in this exact format:
@@ -131,277 +81,687 @@ class ClaudeClient(BaseAPIClient):
             "summary": "Brief classification summary"
         }"""
 
-        try:
-            response = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=1000,
-                temperature=0,
-                system=system_prompt,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"Classify this text: {text}"
-                    }
-                ]
-            )
-
-            result = json.loads(response.content[0].text)
-            result['timestamp'] = datetime.now().isoformat()
-            return result
 
-        except Exception as e:
-            return {
-                "error": f"An error occurred: {str(e)}",
-                "categories": []
-            }
+# Prompts per analysis type, for callers that build requests without a client (e.g. batch jobs)
+SYSTEM_PROMPTS = {
+    "sentiment": SENTIMENT_SYSTEM_PROMPT,
+    "ner": NER_SYSTEM_PROMPT,
+    "classification": CLASSIFICATION_SYSTEM_PROMPT
+}
 
+USER_PROMPTS = {
+    "sentiment": "Analyze the sentiment of this text: {text}",
+    "ner": "Perform NER analysis on this text: {text}",
+    "classification": "Classify this text: {text}"
+}
 
-class SonarClient(BaseAPIClient):
-    def __init__(self, api_key: str, base_url: str = "https://api.perplexity.ai"):
-        super().__init__(api_key)
-        self.base_url = base_url
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
 
-    def _make_request(self, messages: list) -> Dict[str, Any]:
-        url = f"{self.base_url}/chat/completions"
-        payload = {
-            "model": "sonar",
-            "messages": messages
-        }
-        response = requests.post(url, json=payload, headers=self.headers)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            response.raise_for_status()
+# Zeroed payloads returned alongside an "error" key when a call fails
+EMPTY_RESULTS = {
+    "sentiment": {"sentiment": {"positive": 0, "neutral": 0, "negative": 0}},
+    "ner": {"entities": []},
+    "classification": {"categories": []}
+}
+
+
+class BaseAPIClient:
+    # Provider name used in metrics; matches the APIHandler.clients key
+    name = None
+    # Analysis types (ANALYSIS_TYPE_KEYS values) the client can serve, used for "Any" routing
+    supported_analyses = ('sentiment', 'ner', 'classification')
+    # Default model for every analysis type; config.yaml can override it per task
+    model = None
+    # True when the aanalyze_* methods are native coroutines rather than sync calls on a worker thread
+    native_async = False
+
+    def __init__(self, api_key: str, task_settings: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.api_key = api_key
+        self.task_settings = task_settings or {}
+
+    def settings_for(self, analysis: str) -> Dict[str, Any]:
+        """Model, max_tokens, temperature and timeout for one analysis type, with unset values defaulted."""
+        settings = {"model": self.model, "max_tokens": 1000, "temperature": 0, "timeout": None}
+        settings.update({key: value for key, value in self.task_settings.get(analysis, {}).items()
+                         if value is not None})
+        return settings
+
+    def _request_span(self, analysis: str, settings: Dict[str, Any]):
+        """Client span around one provider request; usage attributes are added once the response is in."""
+        return tracer.span("llm.request", kind=SPAN_KIND_CLIENT, **{
+            "gen_ai.system": self.name,
+            "gen_ai.operation.name": analysis,
+            "gen_ai.request.model": settings['model'],
+            "gen_ai.request.max_tokens": settings['max_tokens']
+        })
 
     def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        system_prompt = """You are a financial sentiment analyzer. Your task is to analyze the sentiment of financial headlines 
-        and provide a percentage breakdown across three categories: positive, neutral, and negative. The percentages should 
-        sum to 100%. Consider the following in your analysis:
-        - Impact on stock price/company value
-        - Market reaction
-        - Industry implications
-        - Overall business health indicators
+        raise NotImplementedError
 
-        Respond only with a JSON object in this exact format:
-        {
-            "sentiment": {
-                "positive": float,
-                "neutral": float,
-                "negative": float
-            },
-            "explanation": "Brief explanation of the analysis"
-        }"""
+    def analyze_ner(self, text: str) -> Dict[str, Any]:
+        raise NotImplementedError
 
+    def analyze_classification(self, text: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    # Async variants default to running the sync method on a worker thread
+    async def aanalyze_sentiment(self, text: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.analyze_sentiment, text)
+
+    async def aanalyze_ner(self, text: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.analyze_ner, text)
+
+    async def aanalyze_classification(self, text: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.analyze_classification, text)
+
+
+class ClaudeClient(BaseAPIClient):
+    name = "Claude"
+    model = "claude-3-5-sonnet-20240620"
+
+    def __init__(self, api_key: str, http_client: Optional[httpx.Client] = None,
+                 task_settings: Optional[Dict[str, Dict[str, Any]]] = None):
+        super().__init__(api_key, task_settings)
+        self.client = Anthropic(api_key=api_key, http_client=http_client)
+
+    def _analyze(self, analysis: str, text: str) -> Dict[str, Any]:
         try:
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Analyze the sentiment of this text: {text}"}
-            ]
-
-            response = self._make_request(messages)
-            content = response['choices'][0]['message']['content']
-            clean_content = content.replace('```json\n', '').replace('\n```', '')
-            result = json.loads(clean_content)
+            tool = anthropic_tool(analysis)
+            settings = self.settings_for(analysis)
+            with self._request_span(analysis, settings) as span:
+                response = self.client.messages.create(
+                    model=settings['model'],
+                    max_tokens=settings['max_tokens'],
+                    temperature=settings['temperature'],
+                    timeout=settings['timeout'] or NOT_GIVEN,
+                    system=SYSTEM_PROMPTS[analysis],
+                    tools=[tool],
+                    tool_choice={"type": "tool", "name": tool['name']},
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": USER_PROMPTS[analysis].format(text=text)
+                        }
+                    ]
+                )
+                usage = getattr(response, 'usage', None)
+                if usage is not None:
+                    span.set_attribute("gen_ai.usage.input_tokens", usage.input_tokens)
+                    span.set_attribute("gen_ai.usage.output_tokens", usage.output_tokens)
+
+            tool_input = next((block.input for block in response.content if block.type == "tool_use"), None)
+            if tool_input is not None:
+                result = check_result(tool_input, analysis, self.name)
+            else:
+                text_output = "".join(block.text for block in response.content if block.type == "text")
+                result = parse_result(text_output, analysis, self.name)
             result['timestamp'] = datetime.now().isoformat()
             return result
 
         except Exception as e:
-            return {
-                "error": f"An error occurred: {str(e)}",
-                "sentiment": {
-                    "positive": 0,
-                    "neutral": 0,
-                    "negative": 0
-                }
-            }
+            return {"error": f"An error occurred: {str(e)}", **EMPTY_RESULTS[analysis]}
+
+    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
+        return self._analyze("sentiment", text)
 
-    # Similar implementation pattern for NER and classification...
     def analyze_ner(self, text: str) -> Dict[str, Any]:
-        # Implementation similar to sentiment analysis but with NER prompt
-        pass
+        return self._analyze("ner", text)
 
     def analyze_classification(self, text: str) -> Dict[str, Any]:
-        # Implementation similar to sentiment analysis but with classification prompt
-        pass
+        return self._analyze("classification", text)
+
 
+class OpenAICompatibleClient(BaseAPIClient):
+    """Shared request path for providers exposing an OpenAI-style `/chat/completions` endpoint."""
 
-class xAIClient(BaseAPIClient):
-    def __init__(self, api_key: str, base_url: str = "https://api.x.ai/v1"):
-        super().__init__(api_key)
+    native_async = True
+
+    def __init__(self, api_key: str, base_url: str, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 task_settings: Optional[Dict[str, Dict[str, Any]]] = None):
+        super().__init__(api_key, task_settings)
         self.base_url = base_url
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.async_client = AsyncChatCompletionsClient(api_key, base_url, transport=transport)
+
+    def _make_request(self, messages: list, settings: Dict[str, Any],
+                      response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Sync facade: runs on the shared event loop so sync callers share the HTTP/2 connections
+        return run_sync(self._amake_request(messages, settings, response_format))
+
+    async def _amake_request(self, messages: list, settings: Dict[str, Any],
+                             response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        params = {"response_format": response_format} if response_format else {}
+        return await self.async_client.chat_completion(
+            settings['model'], messages, timeout=settings['timeout'],
+            max_tokens=settings['max_tokens'], temperature=settings['temperature'], **params)
+
+    def _response_format(self, analysis: str) -> Optional[Dict[str, Any]]:
+        """Native structured-output request for `analysis`; OpenAI-style strict JSON schema by default."""
+        return openai_response_format(analysis)
+
+    @staticmethod
+    def _messages(system_prompt: str, user_content: str) -> list:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ]
+
+    def _parse_response(self, response: Dict[str, Any], analysis: str) -> Dict[str, Any]:
+        content = response['choices'][0]['message']['content']
+        result = parse_result(content, analysis, self.name)
+        result['timestamp'] = datetime.now().isoformat()
+        return result
+
+    @staticmethod
+    def _record_usage(span, response: Dict[str, Any]) -> None:
+        usage = response.get('usage') or {}
+        span.set_attribute("gen_ai.usage.input_tokens", usage.get('prompt_tokens'))
+        span.set_attribute("gen_ai.usage.output_tokens", usage.get('completion_tokens'))
+
+    def _analyze(self, analysis: str, text: str) -> Dict[str, Any]:
+        try:
+            messages = self._messages(SYSTEM_PROMPTS[analysis], USER_PROMPTS[analysis].format(text=text))
+            settings = self.settings_for(analysis)
+            with self._request_span(analysis, settings) as span:
+                response = self._make_request(messages, settings, self._response_format(analysis))
+                self._record_usage(span, response)
+            return self._parse_response(response, analysis)
+        except Exception as e:
+            return {"error": f"An error occurred: {str(e)}", **EMPTY_RESULTS[analysis]}
 
-    def _make_request(self, messages: list) -> Dict[str, Any]:
-        url = f"{self.base_url}/chat/completions"
-        payload = {
-            "model": "grok-2-latest",
-            "messages": messages
-        }
-        response = requests.post(url, json=payload, headers=self.headers)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            response.raise_for_status()
+    async def _aanalyze(self, analysis: str, text: str) -> Dict[str, Any]:
+        try:
+            messages = self._messages(SYSTEM_PROMPTS[analysis], USER_PROMPTS[analysis].format(text=text))
+            settings = self.settings_for(analysis)
+            with self._request_span(analysis, settings) as span:
+                response = await self._amake_request(messages, settings, self._response_format(analysis))
+                self._record_usage(span, response)
+            return self._parse_response(response, analysis)
+        except Exception as e:
+            return {"error": f"An error occurred: {str(e)}", **EMPTY_RESULTS[analysis]}
 
     def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        system_prompt = """You are a financial sentiment analyzer. Your task is to analyze the sentiment of financial headlines 
-        and provide a percentage breakdown across three categories: positive, neutral, and negative. The percentages should 
-        sum to 100%. Consider the following in your analysis:
-        - Impact on stock price/company value
-        - Market reaction
-        - Industry implications
-        - Overall business health indicators
+        return self._analyze("sentiment", text)
 
-        Respond only with a JSON object in this exact format:
-        {
-            "sentiment": {
-                "positive": float,
-                "neutral": float,
-                "negative": float
-            },
-            "explanation": "Brief explanation of the analysis"
-        }"""
+    def analyze_ner(self, text: str) -> Dict[str, Any]:
+        return self._analyze("ner", text)
 
-        try:
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Analyze the sentiment of this text: {text}"}
-            ]
-
-            response = self._make_request(messages)
-            content = response['choices'][0]['message']['content']
-            clean_content = content.replace('```json\n', '').replace('\n```', '')
-            result = json.loads(clean_content)
-            result['timestamp'] = datetime.now().isoformat()
-            return result
+    def analyze_classification(self, text: str) -> Dict[str, Any]:
+        return self._analyze("classification", text)
+
+    async def aanalyze_sentiment(self, text: str) -> Dict[str, Any]:
+        return await self._aanalyze("sentiment", text)
+
+    async def aanalyze_ner(self, text: str) -> Dict[str, Any]:
+        return await self._aanalyze("ner", text)
+
+    async def aanalyze_classification(self, text: str) -> Dict[str, Any]:
+        return await self._aanalyze("classification", text)
+
+
+class SonarClient(OpenAICompatibleClient):
+    name = "Sonar"
+    model = "sonar"
+
+    def __init__(self, api_key: str, base_url: str = "https://api.perplexity.ai",
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 task_settings: Optional[Dict[str, Dict[str, Any]]] = None):
+        super().__init__(api_key, base_url or "https://api.perplexity.ai", transport, task_settings)
+
+    def _response_format(self, analysis: str) -> Optional[Dict[str, Any]]:
+        # Perplexity takes the bare schema without OpenAI's name/strict wrapper
+        return {"type": "json_schema", "json_schema": {"schema": RESPONSE_SCHEMAS[analysis]}}
+
+
+class xAIClient(OpenAICompatibleClient):
+    name = "xAI"
+    model = "grok-2-latest"
+
+    def __init__(self, api_key: str, base_url: str = "https://api.x.ai/v1",
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 task_settings: Optional[Dict[str, Dict[str, Any]]] = None):
+        super().__init__(api_key, base_url or "https://api.x.ai/v1", transport, task_settings)
+
+
+class ChatGPTClient(OpenAICompatibleClient):
+    """OpenAI chat completions through per-instance SDK clients, so several keys can be used side by side."""
+    name = "ChatGPT"
+    model = "gpt-3.5-turbo"
+
+    def __init__(self, api_key: str, http_client: Optional[httpx.Client] = None,
+                 async_transport: Optional[httpx.AsyncBaseTransport] = None, timeout: float = 30.0,
+                 max_connections: int = 100, task_settings: Optional[Dict[str, Dict[str, Any]]] = None):
+        BaseAPIClient.__init__(self, api_key, task_settings)
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.client = openai.OpenAI(
+            api_key=api_key,
+            timeout=timeout,
+            http_client=http_client or httpx.Client(limits=limits, timeout=timeout)
+        )
+        self.async_client = openai.AsyncOpenAI(
+            api_key=api_key,
+            timeout=timeout,
+            http_client=httpx.AsyncClient(transport=async_transport, limits=limits, timeout=timeout)
+        )
+
+    def _response_format(self, analysis: str) -> Optional[Dict[str, Any]]:
+        return openai_response_format_for(self.settings_for(analysis)['model'], analysis)
+
+    def _make_request(self, messages: list, settings: Dict[str, Any],
+                      response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        response = self.client.chat.completions.create(
+            model=settings['model'],
+            messages=messages,
+            timeout=settings['timeout'] or openai.NOT_GIVEN,
+            response_format=response_format or openai.NOT_GIVEN,
+            **openai_sampling_params(settings['model'], settings['max_tokens'], settings['temperature'])
+        )
+        return response.model_dump()
+
+    async def _amake_request(self, messages: list, settings: Dict[str, Any],
+                             response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        response = await self.async_client.chat.completions.create(
+            model=settings['model'],
+            messages=messages,
+            timeout=settings['timeout'] or openai.NOT_GIVEN,
+            response_format=response_format or openai.NOT_GIVEN,
+            **openai_sampling_params(settings['model'], settings['max_tokens'], settings['temperature'])
+        )
+        return response.model_dump()
+
+
+class LocalClassificationClient(BaseAPIClient):
+    supported_analyses = ('classification',)
+
+    def __init__(self, settings: Dict[str, Any]):
+        super().__init__(api_key="")
+        # Imported lazily so the remote clients work without torch/numpy installed
+        from local_classifier import build_classifier
+        self.classifier = build_classifier(settings)
 
+    def analyze_classification(self, text: str) -> Dict[str, Any]:
+        try:
+            return self.classifier.classify(text)
         except Exception as e:
             return {
                 "error": f"An error occurred: {str(e)}",
-                "sentiment": {
-                    "positive": 0,
-                    "neutral": 0,
-                    "negative": 0
-                }
+                "categories": []
             }
 
-    # Similar implementation pattern for NER and classification...
-    def analyze_ner(self, text: str) -> Dict[str, Any]:
-        # Implementation similar to sentiment analysis but with NER prompt
-        pass
-
-    def analyze_classification(self, text: str) -> Dict[str, Any]:
-        # Implementation similar to sentiment analysis but with classification prompt
-        pass
+    def analyze_classification_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        return self.classifier.classify_batch(texts)
 
 
-class ChatGPTClient(BaseAPIClient):
-    def __init__(self, api_key: str):
-        super().__init__(api_key)
-        openai.api_key = api_key
-        self.client = openai
+class DeBERTaClient(BaseAPIClient):
+    supported_analyses = ('sentiment',)
 
-    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        system_prompt = """You are a financial sentiment analyzer. Your task is to analyze the sentiment of financial headlines 
-        and provide a percentage breakdown across three categories: positive, neutral, and negative. The percentages should 
-        sum to 100%. Consider the following in your analysis:
-        - Impact on stock price/company value
-        - Market reaction
-        - Industry implications
-        - Overall business health indicators
+    def __init__(self):
+        super().__init__(api_key="")
 
-        Respond only with a JSON object in this exact format:
-        {
-            "sentiment": {
-                "positive": float,
-                "neutral": float,
-                "negative": float
-            },
-            "explanation": "Brief explanation of the analysis"
-        }"""
+    @staticmethod
+    def _wrap(sentiment: Dict[str, float]) -> Dict[str, Any]:
+        return {"sentiment": sentiment, "timestamp": datetime.now().isoformat()}
 
+    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
         try:
-            response = self.client.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Analyze the sentiment of this text: {text}"
-                    }
-                ],
-                max_tokens=1000,
-                temperature=0
-            )
-
-            # The response structure is different from Claude
-            result = json.loads(response.choices[0].message.content)
-            result['timestamp'] = datetime.now().isoformat()
-            return result
-
+            # Imported lazily; the model is loaded once per process on first use
+            from DeBERTaSentimentAnalysis import get_analyzer
+            with tracer.span("local.inference", model="deberta"):
+                return self._wrap(get_analyzer().analyze(text))
         except Exception as e:
-            return {
-                "error": f"An error occurred: {str(e)}",
-                "sentiment": {
-                    "positive": 0,
-                    "neutral": 0,
-                    "negative": 0
-                }
-            }
-    # Similar implementation pattern for NER and classification...
-    def analyze_ner(self, text: str) -> Dict[str, Any]:
-        # Implementation similar to sentiment analysis but with NER prompt
-        pass
+            return {"error": f"An error occurred: {str(e)}", **EMPTY_RESULTS['sentiment']}
+
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        from DeBERTaSentimentAnalysis import get_analyzer
+        return [self._wrap(sentiment) for sentiment in get_analyzer().analyze_batch(texts)]
+
+    def analyze_long_document(self, text: str, pooling: str = 'length') -> Dict[str, Any]:
+        from DeBERTaSentimentAnalysis import get_analyzer
+        result = get_analyzer().analyze_long_document(text, pooling=pooling)
+        result['timestamp'] = datetime.now().isoformat()
+        return result
 
-    def analyze_classification(self, text: str) -> Dict[str, Any]:
-        # Implementation similar to sentiment analysis but with classification prompt
-        pass
 
 class APIHandler:
-    def __init__(self):
+    def __init__(self, replay_settings: Optional[Dict[str, Any]] = None):
+        """
+        Build all clients from config.yaml.
+
+        `replay_settings` overrides the config's record/replay section, e.g. for offline benchmarks.
+        """
         self.config = ConfigHandler()
+        configure_tracing(self.config.get_tracing_settings())
+
+        # Optional record/replay layer underneath every client's HTTP traffic
+        self.recorder = build_recorder(
+            replay_settings if replay_settings is not None else self.config.get_replay_settings())
+        recorder = self.recorder
 
         # Initialize clients with config
         self.clients = {
             'Claude': ClaudeClient(
-                self.config.get_api_key('claude')
+                self.config.get_api_key('claude'),
+                recorder.httpx_client() if recorder else None,
+                task_settings=self._task_settings('claude')
             ),
             'Sonar': SonarClient(
                 self.config.get_api_key('sonar'),
-                self.config.get_base_url('sonar')
+                self.config.get_base_url('sonar'),
+                recorder.async_transport() if recorder else None,
+                task_settings=self._task_settings('sonar')
             ),
             'ChatGPT': ChatGPTClient(
-                self.config.get_api_key('openai')
+                self.config.get_api_key('openai'),
+                recorder.httpx_client() if recorder else None,
+                recorder.async_transport(http2=False) if recorder else None,
+                timeout=self.config.get_model_settings().get('timeout', 30.0),
+                task_settings=self._task_settings('openai')
             ),
             'xAI': xAIClient(
                 self.config.get_api_key('xai'),
-                self.config.get_base_url('xai')
-            )
+                self.config.get_base_url('xai'),
+                recorder.async_transport() if recorder else None,
+                task_settings=self._task_settings('xai')
+            ),
+            'DeBERTa': DeBERTaClient()
         }
 
-    def analyze(self, api_name: str, analysis_type: str, text: str) -> Dict[str, Any]:
+        # Local embedding classifier is only available when a model directory is configured
+        classification_settings = self.config.get_analysis_settings('classification')
+        if classification_settings.get('embedding_model_path'):
+            self.clients['Local'] = LocalClassificationClient(classification_settings)
+
+        scheduler_settings = self.config.get_scheduler_settings()
+        self.scheduler = RequestScheduler(
+            concurrency=scheduler_settings.get('concurrency'),
+            default_concurrency=scheduler_settings.get('default_concurrency', 4),
+            max_wait=scheduler_settings.get('max_wait'),
+            aged_every=scheduler_settings.get('aged_every', 5)
+        )
+
+        routing_settings = self.config.get_routing_settings()
+        self.health = HealthTracker(routing_settings.get('circuit_breaker'), routing_settings.get('explore_every', 20))
+
+        hedging_settings = routing_settings.get('hedging', {})
+        self.hedging_enabled = hedging_settings.get('enabled', False)
+        self.hedging_priorities = hedging_settings.get('priorities', ['interactive'])
+        self.hedging_fallbacks = hedging_settings.get('fallbacks', {})
+        # Every scheduler slot of every provider may be running a hedged primary call at once
+        scheduler_slots = sum(self.scheduler.concurrency.get(name, self.scheduler.default_concurrency)
+                              for name in self.clients)
+        self.hedger = RequestHedger(
+            self.health,
+            self.scheduler,
+            percentile=hedging_settings.get('percentile', 0.95),
+            min_delay=hedging_settings.get('min_delay', 0.5),
+            max_hedge_rate=hedging_settings.get('max_hedge_rate', 0.1),
+            hedge_priority=hedging_settings.get('hedge_priority', 'normal'),
+            max_workers=hedging_settings.get('max_workers') or max(scheduler_slots, 1)
+        )
+
+        semantic_settings = self.config.get_cache_settings().get('semantic', {})
+        self.semantic_cache = None
+        if semantic_settings.get('enabled'):
+            from semantic_cache import build_semantic_cache
+            self.semantic_cache = build_semantic_cache(semantic_settings)
+
+    def _task_settings(self, service: str) -> Dict[str, Dict[str, Any]]:
+        return {analysis: self.config.get_task_settings(service, analysis) for analysis in SYSTEM_PROMPTS}
+
+    def analyze(self, api_name: str, analysis_type: str, text: str, priority: str = 'normal',
+                timeout: Optional[float] = None, hedge: Optional[bool] = None) -> Dict[str, Any]:
+        future = self.submit(api_name, analysis_type, text, priority, timeout, hedge)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Nobody is waiting any more; let the scheduler drop it if it has not started
+            future.cancel()
+            return {"error": f"Analysis timed out after {timeout} seconds"}
+        except DeadlineExceeded as e:
+            return {"error": f"Analysis failed: {str(e)}"}
+
+    def submit(self, api_name: str, analysis_type: str, text: str, priority: str = 'normal',
+               timeout: Optional[float] = None, hedge: Optional[bool] = None) -> Future:
+        """
+        Queue an analysis on the shared scheduler and return a Future for its result dict.
+
+        `priority` is 'interactive', 'normal' or 'bulk'; `timeout` drops the request if it has not
+        been dispatched within that many seconds. `hedge` forces request hedging on or off; by default
+        it follows `routing_settings.hedging` for the request's priority.
+        """
+        span = tracer.start_span("analyze", {"analysis.type": analysis_type, "request.priority": priority,
+                                             "provider.requested": api_name})
+        with tracer.use_span(span):
+            future = self._submit(span, api_name, analysis_type, text, priority, timeout, hedge)
+        future.add_done_callback(lambda done: self._end_span(span, done))
+        return future
+
+    def _submit(self, span, api_name: str, analysis_type: str, text: str, priority: str,
+                timeout: Optional[float], hedge: Optional[bool]) -> Future:
+        analysis_key = ANALYSIS_TYPE_KEYS.get(analysis_type)
+        if analysis_key is None:
+            return self._completed({"error": f"Unknown analysis type: {analysis_type}"})
+
+        if api_name == ANY_PROVIDER:
+            api_name = self._route(analysis_key)
+            if api_name is None:
+                return self._completed({"error": f"No healthy provider available for {analysis_type}"})
+
+        client = self.clients.get(api_name)
+        if not client:
+            return self._completed({"error": f"API client {api_name} not implemented"})
+
+        # Fail fast instead of queueing behind a provider that is known to be down
+        if self.health.get(api_name).is_open():
+            return self._completed(self._circuit_open_result(api_name))
+
+        span.set_attribute("provider", api_name)
+        namespace = f"{api_name}|{analysis_type}"
+        if self.semantic_cache:
+            with tracer.span("cache.lookup") as lookup_span:
+                cached = self.semantic_cache.lookup(namespace, analysis_key, text)
+                lookup_span.set_attribute("cache.hit", cached is not None)
+            span.set_attribute("cache.outcome", "hit" if cached is not None else "miss")
+            if cached is not None:
+                return self._completed(cached)
+
+        if hedge is None:
+            hedge = self.hedging_enabled and priority in self.hedging_priorities
+        span.set_attribute("hedge.enabled", hedge)
+        queued_ns = time.time_ns()
+
+        # Scheduler and hedge threads start without a current span, so re-enter the request's span there
+        def call(provider: str) -> Dict[str, Any]:
+            with tracer.use_span(span):
+                return self._call_with_health(
+                    provider, lambda: self._run_analysis(self.clients[provider], analysis_type, text))
+
+        def run() -> Dict[str, Any]:
+            tracer.start_span("scheduler.queue", {"request.priority": priority}, parent=span,
+                              start_ns=queued_ns).end()
+            if hedge:
+                result = self.hedger.run(api_name, self._hedge_provider(api_name, analysis_key), call)
+            else:
+                result = call(api_name)
+            if self.semantic_cache and self._succeeded(result):
+                with tracer.use_span(span), tracer.span("cache.store"):
+                    self.semantic_cache.store(namespace, text, result)
+            return result
+
+        return self.scheduler.submit(api_name, run, priority, timeout)
+
+    @staticmethod
+    def _mark_span(span, result: Any) -> None:
+        if isinstance(result, dict):
+            span.set_attribute("provider", result.get('provider'))
+            if 'error' in result:
+                span.set_status(STATUS_ERROR, str(result['error']))
+
+    def _end_span(self, span, future: Future) -> None:
+        if future.cancelled():
+            span.set_status(STATUS_ERROR, "cancelled")
+        elif future.exception() is not None:
+            span.record_exception(future.exception())
+        else:
+            self._mark_span(span, future.result())
+        span.end()
+
+    def _route(self, analysis_key: str) -> Optional[str]:
+        """Currently fastest healthy provider that can serve the analysis type."""
+        candidates = [name for name, client in self.clients.items() if analysis_key in client.supported_analyses]
+        return self.health.fastest(candidates)
+
+    def _hedge_provider(self, api_name: str, analysis_key: str) -> str:
+        """Configured fallback if it can serve the request and is healthy, otherwise the same provider."""
+        fallback = self.hedging_fallbacks.get(api_name)
+        client = self.clients.get(fallback)
+        if client and analysis_key in client.supported_analyses and not self.health.get(fallback).is_open():
+            return fallback
+        return api_name
+
+    @staticmethod
+    def _succeeded(result: Any) -> bool:
+        return isinstance(result, dict) and 'error' not in result
+
+    @staticmethod
+    def _circuit_open_result(api_name: str) -> Dict[str, Any]:
+        # No zeroed scores here: a skipped call must not look like a neutral result
+        return {"error": f"Circuit open for {api_name}; provider is failing", "circuit_open": True}
+
+    def _call_with_health(self, api_name: str, call) -> Dict[str, Any]:
+        with tracer.span("provider.call", provider=api_name) as span:
+            health = self.health.get(api_name)
+            if not health.allow_request():
+                span.set_status(STATUS_ERROR, "circuit open")
+                return self._circuit_open_result(api_name)
+
+            start = time.monotonic()
+            try:
+                result = call()
+            except Exception as e:
+                result = {"error": f"Analysis failed: {str(e)}"}
+            cancellation = current_cancellation.get()
+            if cancellation is not None and cancellation.cancelled:
+                # Abandoned by the hedger: neither a failure nor a latency sample for the provider
+                health.release_probe()
+                span.set_status(STATUS_ERROR, "cancelled")
+                return {"error": f"Request to {api_name} was cancelled", "cancelled": True}
+            health.record(self._succeeded(result), time.monotonic() - start)
+
+            if isinstance(result, dict):
+                result.setdefault('provider', api_name)
+            self._mark_span(span, result)
+            return result
+
+    def health_report(self) -> Dict[str, Any]:
+        """Rolling error rate, p95 latency and circuit state per provider."""
+        return self.health.snapshot()
+
+    def hedging_report(self) -> Dict[str, Any]:
+        """Hedge rate, hedge wins and wasted duplicate calls."""
+        return self.hedger.stats()
+
+    @staticmethod
+    def parsing_report() -> Dict[str, Any]:
+        """Clean, repaired and failed result parses and the failure rate per provider."""
+        return PARSE_METRICS.snapshot()
+
+    def analyze_long_document(self, api_name: str, text: str, pooling: str = 'length',
+                              priority: str = 'normal') -> Dict[str, Any]:
+        """
+        Sentiment for documents longer than a model's context, e.g. full articles or call transcripts.
+
+        DeBERTa scores overlapping token windows in batched passes; the LLM clients get overlapping word
+        windows sent in parallel through the scheduler. Either way the result holds the pooled
+        `sentiment` plus per-chunk scores in `chunks`.
+        """
+        client = self.clients.get(api_name)
+        if not client and api_name != ANY_PROVIDER:
+            return {"error": f"API client {api_name} not implemented"}
+
+        try:
+            if isinstance(client, DeBERTaClient):
+                return client.analyze_long_document(text, pooling)
+            result = analyze_long_document_remote(self, api_name, text, pooling, priority=priority)
+            result['timestamp'] = datetime.now().isoformat()
+            return result
+        except Exception as e:
+            return {"error": f"Analysis failed: {str(e)}", **EMPTY_RESULTS['sentiment']}
+
+    async def aanalyze(self, api_name: str, analysis_type: str, text: str) -> Dict[str, Any]:
+        """Async counterpart of analyze() for callers already running an event loop."""
+        with tracer.span("analyze", **{"analysis.type": analysis_type, "provider.requested": api_name}) as span:
+            result = await self._aanalyze(span, api_name, analysis_type, text)
+            self._mark_span(span, result)
+            return result
+
+    async def _aanalyze(self, span, api_name: str, analysis_type: str, text: str) -> Dict[str, Any]:
+        analysis_key = ANALYSIS_TYPE_KEYS.get(analysis_type)
+        if analysis_key is None:
+            return {"error": f"Unknown analysis type: {analysis_type}"}
+
+        if api_name == ANY_PROVIDER:
+            api_name = self._route(analysis_key)
+            if api_name is None:
+                return {"error": f"No healthy provider available for {analysis_type}"}
+
         client = self.clients.get(api_name)
         if not client:
             return {"error": f"API client {api_name} not implemented"}
 
+        span.set_attribute("provider", api_name)
+        namespace = f"{api_name}|{analysis_type}"
+        if self.semantic_cache:
+            cached = await asyncio.to_thread(self.semantic_cache.lookup, namespace, analysis_key, text)
+            span.set_attribute("cache.outcome", "hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+
+        health = self.health.get(api_name)
+        if not health.allow_request():
+            return self._circuit_open_result(api_name)
+
+        start = time.monotonic()
         try:
             if analysis_type == "Sentiment Analysis":
-                return client.analyze_sentiment(text)
+                result = await client.aanalyze_sentiment(text)
             elif analysis_type == "Named Entity Recognition":
-                return client.analyze_ner(text)
-            elif analysis_type == "Text Classification":
-                return client.analyze_classification(text)
+                result = await client.aanalyze_ner(text)
             else:
-                return {"error": f"Unknown analysis type: {analysis_type}"}
+                result = await client.aanalyze_classification(text)
         except Exception as e:
-            return {"error": f"Analysis failed: {str(e)}"}
\ No newline at end of file
+            result = {"error": f"Analysis failed: {str(e)}"}
+        health.record(self._succeeded(result), time.monotonic() - start)
+
+        if isinstance(result, dict):
+            result.setdefault('provider', api_name)
+        if self.semantic_cache and self._succeeded(result):
+            await asyncio.to_thread(self.semantic_cache.store, namespace, text, result)
+        return result
+
+    @staticmethod
+    def _completed(result: Dict[str, Any]) -> Future:
+        future = Future()
+        future.set_result(result)
+        return future
+
+    @staticmethod
+    def _run_analysis(client: BaseAPIClient, analysis_type: str, text: str) -> Dict[str, Any]:
+        if analysis_type == "Sentiment Analysis":
+            return client.analyze_sentiment(text)
+        elif analysis_type == "Named Entity Recognition":
+            return client.analyze_ner(text)
+        else:
+            return client.analyze_classification(text)
+
+    def close(self) -> None:
+        """Stop the scheduler and persist any cached state before shutdown."""
+        self.scheduler.shutdown()
+        self.hedger.executor.shutdown(wait=False)
+        if self.semantic_cache:
+            self.semantic_cache.flush()
+        if self.recorder:
+            self.recorder.save()
+        tracer.shutdown()
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Coroutine, Callable, List
+
+import httpx
+
+from tracing import current_span
+
+
+class AsyncChatCompletionsClient:
+    def __init__(self, api_key: str, base_url: str, timeout: float = 30.0, max_connections: int = 4,
+                 max_in_flight: int = 2000, http2: bool = True,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Native asyncio client for OpenAI-compatible `/chat/completions` endpoints.
+
+        Requests are multiplexed as HTTP/2 streams over a handful of connections per host, so thousands
+        of calls can be in flight from one process without a thread per call.
+
+        Parameters:
+            api_key (str): Bearer token for the provider.
+            base_url (str): Provider base URL, e.g. "https://api.x.ai/v1".
+            timeout (float): Per-request timeout in seconds.
+            max_connections (int): Connections kept open to the host.
+            max_in_flight (int): Upper bound on concurrent requests from this client.
+            http2 (bool): Negotiate HTTP/2 when the server supports it.
+            transport (httpx.AsyncBaseTransport): Optional transport override.
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_in_flight = max_in_flight
+        self.http2 = http2
+        self.transport = transport
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        # httpx clients and semaphores are bound to one loop; every request runs on the shared background
+        # loop, so callers on other loops share one connection pool and one in-flight limit
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=self.http2,
+                transport=self.transport,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                # Waiting for a free stream is bounded by the semaphore, not the pool timeout
+                timeout=httpx.Timeout(self.timeout, pool=None)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._client
+
+    async def chat_completion(self, model: str, messages: list, timeout: Optional[float] = None,
+                              **params) -> Dict[str, Any]:
+        """POST a chat completion; `timeout` overrides the client's per-request timeout for this call."""
+        # The span is read here because the background loop does not see the caller's context
+        return await run_on_background_loop(self._post(current_span(), model, messages, timeout, params))
+
+    async def _post(self, span, model: str, messages: list, timeout: Optional[float],
+                    params: Dict[str, Any]) -> Dict[str, Any]:
+        client = self._ensure_client()
+        payload = {"model": model, "messages": messages, **params}
+        request_timeout = httpx.Timeout(timeout, pool=None) if timeout else httpx.USE_CLIENT_DEFAULT
+        # httpcore reports connect, TLS, send and response-header phases to this hook
+        extensions = {"trace": self._trace_hook(span)} if span.is_recording else None
+        span.add_event("stream_slot.wait")
+        async with self._semaphore:
+            span.add_event("stream_slot.acquired")
+            response = await client.post("/chat/completions", json=payload, timeout=request_timeout,
+                                         extensions=extensions)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _trace_hook(span):
+        async def hook(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name.endswith((".started", ".complete", ".failed")):
+                span.add_event(event_name)
+        return hook
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            client, self._client = self._client, None
+            await run_on_background_loop(client.aclose())
+
+
+class Cancellation:
+    """
+    Lets a caller abandon requests it no longer needs, e.g. the losing half of a hedged pair.
+
+    Requests run through `run_sync` while a Cancellation is current (see `current_cancellation`) have
+    their background-loop task cancelled when `cancel()` is called, which aborts the HTTP request.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self.callbacks: List[Callable[[], Any]] = []
+        self.lock = threading.Lock()
+
+    def add_callback(self, callback: Callable[[], Any]) -> None:
+        with self.lock:
+            if not self.cancelled:
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self) -> None:
+        with self.lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+current_cancellation: ContextVar[Optional[Cancellation]] = ContextVar("current_cancellation", default=None)
+
+
+class BackgroundEventLoop:
+    """Event loop running on a daemon thread, used to drive async clients from synchronous code."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-transport", daemon=True)
+        self.thread.start()
+
+    def run(self, coroutine: Coroutine, timeout: Optional[float] = None) -> Any:
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        cancellation = current_cancellation.get()
+        if cancellation is not None:
+            cancellation.add_callback(future.cancel)
+        return future.result(timeout)
+
+
+_background_loop: Optional[BackgroundEventLoop] = None
+_background_lock = threading.Lock()
+
+
+def background_loop() -> BackgroundEventLoop:
+    global _background_loop
+    with _background_lock:
+        if _background_loop is None:
+            _background_loop = BackgroundEventLoop()
+    return _background_loop
+
+
+def run_sync(coroutine: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared background loop and block until it finishes."""
+    return background_loop().run(coroutine, timeout)
+
+
+async def run_on_background_loop(coroutine: Coroutine) -> Any:
+    """Await a coroutine on the shared background loop from any other loop (or directly, if already on it)."""
+    loop = background_loop().loop
+    if asyncio.get_running_loop() is loop:
+        return await coroutine
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
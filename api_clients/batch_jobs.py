@@ -0,0 +1,388 @@
+import io
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from api_handler import SYSTEM_PROMPTS, USER_PROMPTS, EMPTY_RESULTS, ANALYSIS_TYPE_KEYS
+from structured_output import (openai_response_format_for, openai_sampling_params, anthropic_tool, parse_result,
+                               check_result)
+from config_handler import ConfigHandler
+
+"""
+Offline batch-job mode for bulk runs.
+
+Records are serialized into a provider's asynchronous batch format, split into as many batches as
+the provider's request-count and upload-size limits require, submitted, polled until the provider
+finishes and joined back onto the input records by `custom_id`, in the same row shape as the other
+bulk paths ({**record, "api", "analysis_type", "results"}). Batch endpoints are cheaper but may take
+hours, so job state is saved to a JSON file and a later `collect` can resume from it.
+
+    python batch_jobs.py submit --provider openai --analysis sentiment --input headlines.jsonl --state job.json
+    python batch_jobs.py collect --state job.json --output results.jsonl
+
+Input records are JSON lines with a "text" field and an optional "id".
+"""
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled", "ended"}
+
+ANALYSIS_TYPES = {key: analysis_type for analysis_type, key in ANALYSIS_TYPE_KEYS.items()}
+
+# Room left in each batch for the request envelope around the per-record requests
+ENVELOPE_BYTES = 64 * 1024
+
+
+def parse_content(content: str, analysis: str, provider: str) -> Dict[str, Any]:
+    result = parse_result(content, analysis, provider)
+    result['timestamp'] = datetime.now().isoformat()
+    return result
+
+
+def record_ids(records: List[Dict[str, Any]]) -> List[str]:
+    """The `custom_id` of each record: its "id" field, or its position in the input."""
+    return [str(record.get('id', index)) for index, record in enumerate(records)]
+
+
+class BatchJob:
+    provider = None
+    # Provider limits on a single batch
+    max_requests = None
+    max_bytes = None
+
+    def __init__(self, api_key: str, base_url: str, model: str, analysis: str, max_tokens: int = 1000,
+                 max_requests: Optional[int] = None, max_bytes: Optional[int] = None):
+        """`max_requests` and `max_bytes` lower the provider's per-batch limits, e.g. for testing."""
+        if analysis not in SYSTEM_PROMPTS:
+            raise ValueError(f"Unknown analysis: {analysis}")
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.analysis = analysis
+        self.max_tokens = max_tokens
+        self.max_requests = min(max_requests or self.max_requests, self.max_requests)
+        self.max_bytes = min(max_bytes or self.max_bytes, self.max_bytes)
+        self.batch_ids: List[str] = []
+        self.record_ids: List[str] = []
+        self.input_path: Optional[str] = None
+        self.session = requests.Session()
+
+    def _error_result(self, message: str) -> Dict[str, Any]:
+        return {"error": f"An error occurred: {message}", **EMPTY_RESULTS[self.analysis]}
+
+    def _split(self, entries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Group per-record requests into batches within the provider's request-count and size limits."""
+        chunks, chunk, size = [], [], ENVELOPE_BYTES
+        for entry in entries:
+            # One separator (newline or comma) per request
+            entry_size = len(json.dumps(entry).encode()) + 1
+            if entry_size + ENVELOPE_BYTES > self.max_bytes:
+                raise ValueError(f"Record {entry['custom_id']} alone exceeds the {self.max_bytes}-byte batch limit")
+            if chunk and (len(chunk) >= self.max_requests or size + entry_size > self.max_bytes):
+                chunks.append(chunk)
+                chunk, size = [], ENVELOPE_BYTES
+            chunk.append(entry)
+            size += entry_size
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def submit(self, records: List[Dict[str, Any]]) -> List[str]:
+        """Upload the records in as many batches as the provider's limits require and return their ids."""
+        self.record_ids = record_ids(records)
+        if len(set(self.record_ids)) != len(self.record_ids):
+            raise ValueError("Record ids must be unique within a job")
+        entries = [self._request(record_id, record) for record_id, record in zip(self.record_ids, records)]
+        self.batch_ids = []
+        for chunk in self._split(entries):
+            self.batch_ids.append(self._submit(chunk))
+        return self.batch_ids
+
+    def wait(self, poll_interval: float = 30.0, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Poll until every batch reaches a terminal status and return the final batch objects."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        finished: Dict[str, Dict[str, Any]] = {}
+        while True:
+            for batch_id in self.batch_ids:
+                if batch_id not in finished:
+                    batch = self.status(batch_id)
+                    if self._status_of(batch) in TERMINAL_STATUSES:
+                        finished[batch_id] = batch
+            if len(finished) == len(self.batch_ids):
+                return [finished[batch_id] for batch_id in self.batch_ids]
+            if deadline is not None and time.monotonic() > deadline:
+                running = [batch_id for batch_id in self.batch_ids if batch_id not in finished]
+                raise TimeoutError(f"Batches {', '.join(running)} still running after {timeout}s")
+            time.sleep(poll_interval)
+
+    def collect(self, poll_interval: float = 30.0, timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Wait for completion and return results keyed by record id, one per submitted record."""
+        results = {}
+        for batch in self.wait(poll_interval, timeout):
+            results.update(self._results(batch))
+        # Records the provider never answered still get an entry
+        return {record_id: results.get(record_id, self._error_result("no result returned for record"))
+                for record_id in self.record_ids}
+
+    def join(self, records: List[Dict[str, Any]], results: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Result rows for the input records, matched by `custom_id`, in input order."""
+        if record_ids(records) != self.record_ids:
+            raise ValueError("Records do not match the ones this job was submitted with")
+        return [{**record, "api": f"batch:{self.provider}", "analysis_type": ANALYSIS_TYPES[self.analysis],
+                 "results": results[record_id]}
+                for record_id, record in zip(self.record_ids, records)]
+
+    def save(self, path: str) -> None:
+        state = {
+            "provider": self.provider,
+            "batch_ids": self.batch_ids,
+            "record_ids": self.record_ids,
+            "input_path": self.input_path,
+            "model": self.model,
+            "analysis": self.analysis,
+            "base_url": self.base_url
+        }
+        with open(path, 'w') as file:
+            json.dump(state, file, indent=2)
+
+    @staticmethod
+    def load(path: str, api_key: str) -> "BatchJob":
+        with open(path, 'r') as file:
+            state = json.load(file)
+        job_class = BATCH_JOB_CLASSES[state['provider']]
+        job = job_class(api_key, state['base_url'], state['model'], state['analysis'])
+        # State files from before jobs were split hold a single batch id
+        job.batch_ids = state.get('batch_ids') or [state['batch_id']]
+        job.record_ids = state['record_ids']
+        job.input_path = state.get('input_path')
+        return job
+
+    def _request(self, record_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """The provider's per-record request entry, carrying `custom_id`."""
+        raise NotImplementedError
+
+    def _submit(self, entries: List[Dict[str, Any]]) -> str:
+        raise NotImplementedError
+
+    def status(self, batch_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _status_of(batch: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def _results(self, batch: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class OpenAIBatchJob(BatchJob):
+    """OpenAI Batch API: JSONL file upload, /batches job, output file download."""
+    provider = "openai"
+    max_requests = 50000
+    max_bytes = 200 * 1024 * 1024
+
+    def __init__(self, api_key: str, base_url: str = "https://api.openai.com/v1", model: str = "gpt-4o-mini",
+                 analysis: str = "sentiment", max_tokens: int = 1000, max_requests: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        super().__init__(api_key, base_url, model, analysis, max_tokens, max_requests, max_bytes)
+        self.session.headers.update({"Authorization": f"Bearer {api_key}"})
+        self.response_format = openai_response_format_for(self.model, self.analysis)
+
+    def _request(self, record_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        body = {
+            "model": self.model,
+            **openai_sampling_params(self.model, self.max_tokens, 0),
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPTS[self.analysis]},
+                {"role": "user", "content": USER_PROMPTS[self.analysis].format(text=record['text'])}
+            ]
+        }
+        if self.response_format:
+            body['response_format'] = self.response_format
+        return {"custom_id": record_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+
+    def _submit(self, entries: List[Dict[str, Any]]) -> str:
+        lines = [json.dumps(entry) for entry in entries]
+        upload = self.session.post(f"{self.base_url}/files", data={"purpose": "batch"},
+                                   files={"file": ("batch.jsonl", io.BytesIO("\n".join(lines).encode()))})
+        upload.raise_for_status()
+
+        response = self.session.post(f"{self.base_url}/batches", json={
+            "input_file_id": upload.json()['id'],
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h"
+        })
+        response.raise_for_status()
+        return response.json()['id']
+
+    def status(self, batch_id: str) -> Dict[str, Any]:
+        response = self.session.get(f"{self.base_url}/batches/{batch_id}")
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _status_of(batch: Dict[str, Any]) -> str:
+        return batch['status']
+
+    def _download(self, file_id: Optional[str]) -> List[Dict[str, Any]]:
+        if not file_id:
+            return []
+        response = self.session.get(f"{self.base_url}/files/{file_id}/content")
+        response.raise_for_status()
+        return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+    def _results(self, batch: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for line in self._download(batch.get('output_file_id')) + self._download(batch.get('error_file_id')):
+            record_id = line['custom_id']
+            response = line.get('response') or {}
+            try:
+                if line.get('error') or response.get('status_code') != 200:
+                    raise ValueError(line.get('error') or response.get('body', {}).get('error'))
+                results[record_id] = parse_content(response['body']['choices'][0]['message']['content'],
+                                                   self.analysis, "batch:openai")
+            except Exception as e:
+                results[record_id] = self._error_result(str(e))
+        return results
+
+
+class AnthropicBatchJob(BatchJob):
+    """Anthropic Message Batches API: one request with all params, results streamed as JSONL."""
+    provider = "anthropic"
+    max_requests = 100000
+    max_bytes = 256 * 1024 * 1024
+
+    def __init__(self, api_key: str, base_url: str = "https://api.anthropic.com",
+                 model: str = "claude-3-5-sonnet-20240620", analysis: str = "sentiment", max_tokens: int = 1000,
+                 max_requests: Optional[int] = None, max_bytes: Optional[int] = None):
+        super().__init__(api_key, base_url, model, analysis, max_tokens, max_requests, max_bytes)
+        self.session.headers.update({"x-api-key": api_key, "anthropic-version": "2023-06-01"})
+        self.tool = anthropic_tool(self.analysis)
+
+    def _request(self, record_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "custom_id": record_id,
+            "params": {
+                "model": self.model,
+                "max_tokens": self.max_tokens,
+                "temperature": 0,
+                "system": SYSTEM_PROMPTS[self.analysis],
+                "tools": [self.tool],
+                "tool_choice": {"type": "tool", "name": self.tool['name']},
+                "messages": [
+                    {"role": "user", "content": USER_PROMPTS[self.analysis].format(text=record['text'])}
+                ]
+            }
+        }
+
+    def _submit(self, entries: List[Dict[str, Any]]) -> str:
+        response = self.session.post(f"{self.base_url}/v1/messages/batches", json={"requests": entries})
+        response.raise_for_status()
+        return response.json()['id']
+
+    def status(self, batch_id: str) -> Dict[str, Any]:
+        response = self.session.get(f"{self.base_url}/v1/messages/batches/{batch_id}")
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _status_of(batch: Dict[str, Any]) -> str:
+        return batch['processing_status']
+
+    def _results(self, batch: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        if not batch.get('results_url'):
+            return {}
+        response = self.session.get(batch['results_url'])
+        response.raise_for_status()
+
+        results = {}
+        for raw in response.text.splitlines():
+            if not raw.strip():
+                continue
+            line = json.loads(raw)
+            outcome = line['result']
+            try:
+                if outcome['type'] != 'succeeded':
+                    raise ValueError(outcome.get('error') or outcome['type'])
+                results[line['custom_id']] = self._parse_message(outcome['message']['content'])
+            except Exception as e:
+                results[line['custom_id']] = self._error_result(str(e))
+        return results
+
+    def _parse_message(self, content: List[Dict[str, Any]]) -> Dict[str, Any]:
+        tool_input = next((block['input'] for block in content if block['type'] == "tool_use"), None)
+        if tool_input is None:
+            text = "".join(block['text'] for block in content if block['type'] == "text")
+            return parse_content(text, self.analysis, "batch:anthropic")
+        result = check_result(tool_input, self.analysis, "batch:anthropic")
+        result['timestamp'] = datetime.now().isoformat()
+        return result
+
+
+BATCH_JOB_CLASSES = {
+    "openai": OpenAIBatchJob,
+    "anthropic": AnthropicBatchJob
+}
+
+# config.yaml service name for each batch provider
+CONFIG_SERVICES = {
+    "openai": "openai",
+    "anthropic": "claude"
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit and collect provider batch jobs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = subparsers.add_parser("submit")
+    submit_parser.add_argument("--provider", choices=list(BATCH_JOB_CLASSES), required=True)
+    submit_parser.add_argument("--analysis", choices=list(SYSTEM_PROMPTS), default="sentiment")
+    submit_parser.add_argument("--input", required=True, help="JSONL file of records with a 'text' field")
+    submit_parser.add_argument("--state", required=True, help="Where to save the job state")
+    submit_parser.add_argument("--base-url", help="Override the provider URL, e.g. a local stand-in server")
+
+    collect_parser = subparsers.add_parser("collect")
+    collect_parser.add_argument("--state", required=True)
+    collect_parser.add_argument("--output", required=True, help="JSONL file to write results to")
+    collect_parser.add_argument("--input", help="Input JSONL the job was submitted from (default: the path saved "
+                                                "at submit time)")
+    collect_parser.add_argument("--poll-interval", type=float, default=30.0)
+
+    args = parser.parse_args()
+    config = ConfigHandler()
+
+    if args.command == "submit":
+        service = CONFIG_SERVICES[args.provider]
+        job_class = BATCH_JOB_CLASSES[args.provider]
+        kwargs = {"model": config.get_model_name(service), "analysis": args.analysis}
+        if args.base_url:
+            kwargs['base_url'] = args.base_url
+        job = job_class(config.get_api_key(service), **kwargs)
+
+        with open(args.input, 'r') as file:
+            records = [json.loads(line) for line in file if line.strip()]
+        batch_ids = job.submit(records)
+        job.input_path = os.path.abspath(args.input)
+        print(f"Submitted {len(records)} records in {len(batch_ids)} batches: {', '.join(batch_ids)}")
+        job.save(args.state)
+    else:
+        with open(args.state, 'r') as file:
+            provider = json.load(file)['provider']
+        job = BatchJob.load(args.state, config.get_api_key(CONFIG_SERVICES[provider]))
+        results = job.collect(poll_interval=args.poll_interval)
+        input_path = args.input or job.input_path
+        with open(input_path, 'r') as file:
+            records = [json.loads(line) for line in file if line.strip()]
+        rows = job.join(records, results)
+        with open(args.output, 'w') as file:
+            for row in rows:
+                file.write(json.dumps(row) + "\n")
+        print(f"Wrote {len(rows)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
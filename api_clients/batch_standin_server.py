@@ -0,0 +1,198 @@
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any
+
+"""
+Local stand-in for the OpenAI Batch and Anthropic Message Batches APIs.
+
+It walks batches through the same lifecycle as the real services (OpenAI: validating -> in_progress ->
+completed, Anthropic: in_progress -> ended) after `--delay` seconds and answers every request with a
+canned JSON result, so batch_jobs.py can be exercised end to end without network access:
+
+    python batch_standin_server.py --port 8999 --delay 2
+    python batch_jobs.py submit --provider openai --base-url http://127.0.0.1:8999/v1 ...
+    python batch_jobs.py submit --provider anthropic --base-url http://127.0.0.1:8999 ...
+
+Texts containing "FAIL" produce a per-request error so error mapping can be checked too.
+"""
+
+CANNED_CONTENT = {
+    "sentiment": {"sentiment": {"positive": 34.0, "neutral": 33.0, "negative": 33.0},
+                  "explanation": "Stand-in result"},
+    "ner": {"entities": [], "summary": "Stand-in result"},
+    "classification": {"categories": [{"name": "other", "confidence": 1.0, "explanation": "Stand-in result"}],
+                       "dominant_category": "other", "summary": "Stand-in result"}
+}
+
+
+def _canned_reply(system_prompt: str, user_content: str) -> str:
+    if "Named Entity" in system_prompt:
+        content = CANNED_CONTENT['ner']
+    elif "classification" in system_prompt:
+        content = CANNED_CONTENT['classification']
+    else:
+        content = CANNED_CONTENT['sentiment']
+    # Wrap in a code fence like real models sometimes do
+    return "```json\n" + json.dumps(content) + "\n```"
+
+
+class BatchStandIn:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.files: Dict[str, str] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def _elapsed(self, batch: Dict[str, Any]) -> float:
+        return time.time() - batch['created_at']
+
+    def openai_status(self, batch_id: str) -> Dict[str, Any]:
+        with self.lock:
+            batch = self.batches[batch_id]
+            elapsed = self._elapsed(batch)
+            if elapsed < self.delay / 2:
+                batch['status'] = "validating"
+            elif elapsed < self.delay:
+                batch['status'] = "in_progress"
+            elif batch['status'] != "completed":
+                self._complete_openai(batch)
+            return {key: value for key, value in batch.items() if not key.startswith('_')}
+
+    def _complete_openai(self, batch: Dict[str, Any]) -> None:
+        output, errors = [], []
+        for line in self.files[batch['input_file_id']].splitlines():
+            request = json.loads(line)
+            messages = request['body']['messages']
+            if "FAIL" in messages[-1]['content']:
+                errors.append({"custom_id": request['custom_id'], "response": None,
+                               "error": {"code": "stand_in_failure", "message": "Requested failure"}})
+                continue
+            output.append({
+                "custom_id": request['custom_id'],
+                "response": {"status_code": 200, "body": {
+                    "choices": [{"message": {"role": "assistant",
+                                             "content": _canned_reply(messages[0]['content'], messages[-1]['content'])}}]
+                }},
+                "error": None
+            })
+
+        batch['output_file_id'] = self._store_file("\n".join(json.dumps(line) for line in output))
+        batch['error_file_id'] = self._store_file("\n".join(json.dumps(line) for line in errors)) if errors else None
+        batch['status'] = "completed"
+        batch['request_counts'] = {"total": len(output) + len(errors), "completed": len(output),
+                                   "failed": len(errors)}
+
+    def _store_file(self, content: str) -> str:
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        self.files[file_id] = content
+        return file_id
+
+    def anthropic_status(self, batch_id: str, base_url: str) -> Dict[str, Any]:
+        with self.lock:
+            batch = self.batches[batch_id]
+            if self._elapsed(batch) >= self.delay and batch['processing_status'] != "ended":
+                batch['processing_status'] = "ended"
+                batch['results_url'] = f"{base_url}/v1/messages/batches/{batch_id}/results"
+            return {key: value for key, value in batch.items() if not key.startswith('_')}
+
+    def anthropic_results(self, batch_id: str) -> str:
+        lines = []
+        for request in self.batches[batch_id]['_requests']:
+            params = request['params']
+            user_content = params['messages'][-1]['content']
+            if "FAIL" in user_content:
+                result = {"type": "errored", "error": {"type": "stand_in_failure", "message": "Requested failure"}}
+            else:
+                result = {"type": "succeeded", "message": {
+                    "content": [{"type": "text", "text": _canned_reply(params.get('system', ''), user_content)}]
+                }}
+            lines.append(json.dumps({"custom_id": request['custom_id'], "result": result}))
+        return "\n".join(lines)
+
+
+def make_handler(state: BatchStandIn):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body, content_type: str = "application/json") -> None:
+            payload = (json.dumps(body) if content_type == "application/json" else body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        def do_POST(self):
+            if self.path == "/v1/files":
+                # Minimal multipart parsing: the uploaded JSONL is the part named "file"
+                message = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self._body())
+                content = next(part.get_payload(decode=True) for part in message.iter_parts()
+                               if part.get_param('name', header='content-disposition') == 'file')
+                with state.lock:
+                    file_id = state._store_file(content.decode())
+                self._send(200, {"id": file_id, "object": "file", "purpose": "batch"})
+            elif self.path == "/v1/batches":
+                request = json.loads(self._body())
+                batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+                with state.lock:
+                    state.batches[batch_id] = {"id": batch_id, "object": "batch", "status": "validating",
+                                               "input_file_id": request['input_file_id'],
+                                               "endpoint": request['endpoint'], "created_at": time.time()}
+                self._send(200, state.openai_status(batch_id))
+            elif self.path == "/v1/messages/batches":
+                request = json.loads(self._body())
+                batch_id = f"msgbatch_{uuid.uuid4().hex[:12]}"
+                with state.lock:
+                    state.batches[batch_id] = {"id": batch_id, "type": "message_batch",
+                                               "processing_status": "in_progress", "results_url": None,
+                                               "created_at": time.time(), "_requests": request['requests']}
+                self._send(200, state.anthropic_status(batch_id, self._base_url()))
+            else:
+                self._send(404, {"error": f"Unknown endpoint: {self.path}"})
+
+        def _base_url(self) -> str:
+            return f"http://{self.headers.get('Host')}"
+
+        def do_GET(self):
+            if match := re.fullmatch(r"/v1/batches/([\w-]+)", self.path):
+                self._send(200, state.openai_status(match.group(1)))
+            elif match := re.fullmatch(r"/v1/files/([\w-]+)/content", self.path):
+                self._send(200, state.files[match.group(1)], "application/jsonl")
+            elif match := re.fullmatch(r"/v1/messages/batches/([\w-]+)/results", self.path):
+                self._send(200, state.anthropic_results(match.group(1)), "application/jsonl")
+            elif match := re.fullmatch(r"/v1/messages/batches/([\w-]+)", self.path):
+                self._send(200, state.anthropic_status(match.group(1), self._base_url()))
+            else:
+                self._send(404, {"error": f"Unknown endpoint: {self.path}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8999, delay: float = 2.0) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread and return the server (call shutdown() to stop)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(BatchStandIn(delay)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for provider batch APIs")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--delay", type=float, default=2.0, help="Seconds until a batch completes")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(BatchStandIn(args.delay)))
+    print(f"Batch stand-in listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
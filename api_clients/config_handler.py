@@ -56,6 +56,51 @@ class ConfigHandler:
         """Get output configuration settings."""
         return self.config.get('output_settings', {})
 
+    def get_cache_settings(self) -> Dict[str, Any]:
+        """Get result cache configuration settings."""
+        return self.config.get('cache_settings', {})
+
+    def get_scheduler_settings(self) -> Dict[str, Any]:
+        """Get request scheduler configuration settings."""
+        return self.config.get('scheduler_settings', {})
+
+    def get_routing_settings(self) -> Dict[str, Any]:
+        """Get provider health and routing configuration settings."""
+        return self.config.get('routing_settings', {})
+
+    def get_replay_settings(self) -> Dict[str, Any]:
+        """Get record/replay configuration settings."""
+        return self.config.get('replay_settings', {})
+
+    def get_tracing_settings(self) -> Dict[str, Any]:
+        """Get tracing configuration settings."""
+        return self.config.get('tracing_settings', {})
+
+    def get_ingestion_settings(self) -> Dict[str, Any]:
+        """Get feed ingestion configuration settings."""
+        return self.config.get('ingestion_settings', {})
+
+    def get_entity_index_settings(self) -> Dict[str, Any]:
+        """Get per-entity sentiment index configuration settings."""
+        return self.config.get('entity_index_settings', {})
+
+    def get_task_settings(self, service: str, analysis_type: str) -> Dict[str, Any]:
+        """
+        Get model, max_tokens, temperature and timeout for one service and analysis type.
+
+        Values under `api_keys.<service>.tasks.<analysis_type>` take precedence over the service's
+        `model` and the global `model_settings`. Unset values are None so clients keep their defaults.
+        """
+        service_config = self.config.get('api_keys', {}).get(service, {})
+        model_settings = self.get_model_settings()
+        task = service_config.get('tasks', {}).get(analysis_type, {})
+        return {
+            "model": task.get('model', service_config.get('model')),
+            "max_tokens": task.get('max_tokens', model_settings.get('max_tokens')),
+            "temperature": task.get('temperature', model_settings.get('default_temperature')),
+            "timeout": task.get('timeout', model_settings.get('timeout'))
+        }
+
     def validate_config(self) -> bool:
         """Validate the configuration file has all required fields."""
         required_fields = [
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, Any
+
+import torch
+from safetensors.torch import load_file
+from transformers import AutoConfig, AutoModelForSequenceClassification, PreTrainedTokenizerFast
+
+from DeBERTaSentimentAnalysis import DeBERTaSentimentAnalyzer, MODEL_NAME, LABELS
+
+"""
+A DeBERTa artifact is a self-contained directory:
+
+    manifest.json       model id, labels, max_length and build time
+    config.json         model configuration
+    model.safetensors   weights, memory-mapped at load time
+    tokenizer.json      serialized fast tokenizer (plus its special-token files)
+    model.traced.pt     optional TorchScript graph of the forward pass
+
+`prepare_artifact` needs network access once; `load_artifact` needs none.
+"""
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Wrap the Hugging Face model so the traced graph takes plain tensors and returns logits."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def prepare_artifact(output_dir: str, model_name: str = MODEL_NAME, max_length: int = 512,
+                     trace: bool = True) -> Dict[str, Any]:
+    """
+    Build an artifact directory from a hub model.
+
+    Parameters:
+        output_dir (str): Directory to write the artifact into.
+        model_name (str): Hugging Face model id or local directory to export.
+        max_length (int): Maximum tokens per input recorded for the loader.
+        trace (bool): Also write a TorchScript graph of the forward pass.
+
+    Returns:
+        dict: The manifest written to `manifest.json`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    analyzer = DeBERTaSentimentAnalyzer(model_name, max_length=max_length, device="cpu")
+    if not analyzer.tokenizer.is_fast:
+        raise ValueError(f"{model_name} has no fast tokenizer to serialize")
+
+    # Writes config.json and model.safetensors, deduplicating tied tensors
+    analyzer.model.save_pretrained(output_dir, safe_serialization=True)
+    analyzer.tokenizer.save_pretrained(output_dir)
+
+    files = ["config.json", "model.safetensors", "tokenizer.json"]
+    if trace:
+        example = analyzer.tokenizer(["Tesla Reports Record Q4 Earnings"], return_tensors="pt", padding=True)
+        with torch.inference_mode():
+            traced = torch.jit.trace(_LogitsOnly(analyzer.model),
+                                     (example['input_ids'], example['attention_mask']), strict=False)
+        traced = torch.jit.freeze(traced.eval())
+        traced.save(os.path.join(output_dir, "model.traced.pt"))
+        files.append("model.traced.pt")
+
+    manifest = {
+        "model_name": model_name,
+        "labels": LABELS,
+        "max_length": max_length,
+        "files": files,
+        "created": datetime.now().isoformat()
+    }
+    with open(os.path.join(output_dir, "manifest.json"), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def load_artifact(artifact_dir: str, use_traced: bool = True) -> DeBERTaSentimentAnalyzer:
+    """
+    Build an analyzer from an artifact. Every file is read with local_files_only, so the hub is never contacted.
+
+    The model skeleton is created on the meta device, so no memory is spent on random initial
+    weights; safetensors maps the weight file and tensors are assigned straight into the module.
+    """
+    with open(os.path.join(artifact_dir, "manifest.json"), 'r') as file:
+        manifest = json.load(file)
+
+    tokenizer = PreTrainedTokenizerFast.from_pretrained(artifact_dir, local_files_only=True)
+
+    config = AutoConfig.from_pretrained(artifact_dir, local_files_only=True)
+    with torch.device("meta"):
+        model = AutoModelForSequenceClassification.from_config(config)
+    # Tied tensors are stored once, so missing keys are expected until tie_weights() runs
+    model.load_state_dict(load_file(os.path.join(artifact_dir, "model.safetensors")), assign=True, strict=False)
+    model.tie_weights()
+    unloaded = [name for name, tensor in model.state_dict().items() if tensor.is_meta]
+    if unloaded:
+        raise ValueError(f"Artifact is missing weights: {unloaded[:5]}")
+
+    traced_model = None
+    traced_path = os.path.join(artifact_dir, "model.traced.pt")
+    if use_traced and os.path.exists(traced_path):
+        traced_model = torch.jit.load(traced_path, map_location="cpu")
+
+    return DeBERTaSentimentAnalyzer(manifest['model_name'], max_length=manifest['max_length'], device="cpu",
+                                    tokenizer=tokenizer, model=model, traced_model=traced_model)
+
+
+def _cold_start(mode: str, artifact_dir: str) -> None:
+    """Runs in a fresh interpreter: time from import to the first scored headline."""
+    start = time.perf_counter()
+    if mode == "hub":
+        analyzer = DeBERTaSentimentAnalyzer(device="cpu")
+    else:
+        analyzer = load_artifact(artifact_dir, use_traced=(mode == "traced"))
+    loaded = time.perf_counter()
+    analyzer.analyze("Tesla Reports Record Q4 Earnings, Beating Analyst Expectations")
+    first = time.perf_counter()
+    print(json.dumps({"mode": mode, "load_seconds": loaded - start, "first_result_seconds": first - start}))
+
+
+def benchmark(artifact_dir: str, runs: int = 3) -> None:
+    """Compare cold-start time of hub loading against the artifact loaders, each in a new process."""
+    for mode in ("hub", "artifact", "traced"):
+        timings = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, __file__, "_cold_start", mode, artifact_dir],
+                                    capture_output=True, text=True, check=True).stdout
+            timings.append(json.loads(output.strip().splitlines()[-1]))
+        load = min(t['load_seconds'] for t in timings)
+        first = min(t['first_result_seconds'] for t in timings)
+        print(f"{mode:>8}: load {load:6.2f}s, first result {first:6.2f}s (best of {runs})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or benchmark a prebuilt DeBERTa artifact")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prepare_parser = subparsers.add_parser("prepare", help="Write an artifact directory")
+    prepare_parser.add_argument("output_dir")
+    prepare_parser.add_argument("--model", default=MODEL_NAME)
+    prepare_parser.add_argument("--no-trace", action="store_true")
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Report cold-start times")
+    benchmark_parser.add_argument("artifact_dir")
+    benchmark_parser.add_argument("--runs", type=int, default=3)
+
+    cold_start_parser = subparsers.add_parser("_cold_start")
+    cold_start_parser.add_argument("mode", choices=["hub", "artifact", "traced"])
+    cold_start_parser.add_argument("artifact_dir")
+
+    args = parser.parse_args()
+    if args.command == "prepare":
+        print(json.dumps(prepare_artifact(args.output_dir, args.model, trace=not args.no_trace), indent=2))
+    elif args.command == "benchmark":
+        benchmark(args.artifact_dir, args.runs)
+    else:
+        _cold_start(args.mode, args.artifact_dir)
@@ -0,0 +1,172 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+from typing import Dict, List, Optional
+
+import torch
+import torch.multiprocessing as mp
+
+from DeBERTaSentimentAnalysis import DeBERTaSentimentAnalyzer, MODEL_NAME
+
+# Rust tokenizer threads do not survive fork; each worker is single-process parallel instead
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+
+def _worker(analyzer: DeBERTaSentimentAnalyzer, threads: int, batch_size: int,
+            tasks: mp.Queue, results: mp.Queue, active_generation) -> None:
+    # Pin intra-op threads so N workers x threads does not exceed the core count
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Already set in the parent before fork
+        pass
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        generation, batch_id, texts = task
+        if generation != active_generation.value:
+            # Left over from a map() that timed out or failed; nobody is waiting for it
+            continue
+        try:
+            results.put((generation, batch_id, analyzer.analyze_batch(texts, batch_size=batch_size), None))
+        except Exception as e:
+            results.put((generation, batch_id, None, str(e)))
+
+
+class DeBERTaWorkerPool:
+    def __init__(self, workers: Optional[int] = None, threads_per_worker: Optional[int] = None,
+                 batch_size: int = 32, model_name: str = MODEL_NAME):
+        """
+        Score sentiment with several processes sharing one copy of the DeBERTa weights.
+
+        The model is loaded once in the parent. On Linux workers are forked after loading, so the
+        weights are shared copy-on-write; elsewhere the parameters are moved to shared memory and
+        passed to spawned workers. Avoid running inference in the parent before creating the pool:
+        forking after torch has started its thread pool can deadlock.
+
+        Parameters:
+            workers (int): Number of worker processes, defaults to one per 4 cores.
+            threads_per_worker (int): Torch intra-op threads per worker, defaults to cores / workers.
+            batch_size (int): Texts per forward pass inside a worker.
+            model_name (str): Hugging Face model id or local directory.
+        """
+        cpu_count = os.cpu_count() or 1
+        self.workers = workers or max(1, cpu_count // 4)
+        self.threads_per_worker = threads_per_worker or max(1, cpu_count // self.workers)
+        self.batch_size = batch_size
+        # Results are matched by batch id, so one map() runs at a time
+        self.lock = threading.Lock()
+        # Tags each map() so late results from an abandoned call are ignored by the next one
+        self.generation = 0
+
+        self.analyzer = DeBERTaSentimentAnalyzer(model_name, device="cpu")
+        self.analyzer.model.share_memory()
+
+        context = mp.get_context('fork' if sys.platform.startswith('linux') else 'spawn')
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        # Generation of the map() in progress, 0 when none is; workers skip queued batches from any other
+        self.active_generation = context.Value('q', 0, lock=False)
+        self.processes = [
+            context.Process(target=_worker, daemon=True,
+                            args=(self.analyzer, self.threads_per_worker, batch_size, self.tasks, self.results,
+                                  self.active_generation))
+            for _ in range(self.workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def map(self, texts: List[str], timeout: Optional[float] = None,
+            poll_interval: float = 1.0) -> List[Dict[str, float]]:
+        """
+        Score texts across all workers and return results in input order.
+
+        Raises RuntimeError if a worker process dies while batches are outstanding, and TimeoutError
+        if the results are not all back within `timeout` seconds.
+        """
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        collected, errors = {}, []
+        with self.lock:
+            if not any(process.is_alive() for process in self.processes):
+                raise RuntimeError("All DeBERTa workers have exited")
+            self.generation += 1
+            generation = self.generation
+            self.active_generation.value = generation
+            try:
+                alive = sum(process.is_alive() for process in self.processes)
+                deadline = time.monotonic() + timeout if timeout is not None else None
+                for batch_id, batch in enumerate(batches):
+                    self.tasks.put((generation, batch_id, batch))
+
+                while len(collected) < len(batches):
+                    wait = poll_interval if deadline is None else min(poll_interval, deadline - time.monotonic())
+                    try:
+                        result_generation, batch_id, batch_results, error = self.results.get(timeout=max(wait, 0))
+                    except queue.Empty:
+                        pending = len(batches) - len(collected)
+                        if sum(process.is_alive() for process in self.processes) < alive:
+                            # The batch a dead worker held is lost; fail the call instead of waiting forever
+                            raise RuntimeError(f"A DeBERTa worker exited with {pending} batches outstanding")
+                        if deadline is not None and time.monotonic() >= deadline:
+                            raise TimeoutError(f"DeBERTa workers did not return {pending} batches within {timeout}s")
+                        continue
+                    if result_generation != generation:
+                        continue
+                    if error:
+                        errors.append(f"batch {batch_id}: {error}")
+                    collected[batch_id] = batch_results
+            finally:
+                self.active_generation.value = 0
+
+        if errors:
+            raise RuntimeError(f"DeBERTa worker failed on {'; '.join(errors)}")
+
+        return [result for batch_id in range(len(batches)) for result in collected[batch_id]]
+
+    def close(self, timeout: float = 30.0) -> None:
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(texts: List[str], worker_counts: List[int], batch_size: int) -> None:
+    """Report throughput for each worker count so scaling can be checked against the core count."""
+    for workers in worker_counts:
+        with DeBERTaWorkerPool(workers=workers, batch_size=batch_size) as pool:
+            pool.map(texts[:batch_size * workers])  # warm-up
+            start = time.perf_counter()
+            pool.map(texts)
+            elapsed = time.perf_counter() - start
+        print(f"{workers:>3} workers x {pool.threads_per_worker:>2} threads: "
+              f"{len(texts) / elapsed:8.1f} texts/s")
+
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the DeBERTa worker pool")
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument("--texts", type=int, default=2048)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    sample = [
+        "Tesla Reports Record Q4 Earnings, Beating Analyst Expectations",
+        "Meta Announces 10% Workforce Reduction Amid Cost-Cutting Measures",
+        "Apple Maintains Market Position Despite Industry-Wide Chip Shortage"
+    ]
+    benchmark([sample[i % len(sample)] for i in range(args.texts)], args.workers, args.batch_size)
@@ -0,0 +1,445 @@
+import os
+import math
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable
+
+import numpy as np
+
+"""
+Rolling, time-decayed sentiment per entity and provider.
+
+NER results name the entities in a headline and sentiment results score it; EntitySentimentJoiner
+pairs the two as they stream in and EntitySentimentIndex credits the headline's score to each entity,
+per sentiment provider and across all providers.
+
+Aggregates use forward decay: an observation at time t is added with weight exp(lambda * (t - t0))
+for a fixed reference t0, instead of decaying every stored value as time passes. Every aggregate then
+decays by the same factor, so an entity's weighted mean sentiment never changes between updates and
+its effective mention count is one multiplication away. Point queries are O(1), and top-k queries
+slice a ranking of the entities above the weight threshold, rebuilt only after updates (at most once
+per `max_staleness` seconds) or once its lightest entity has decayed below the threshold.
+
+State is a handful of dense numpy arrays indexed by entity id, saved and loaded with np.savez:
+
+    python entity_index.py --snapshot index.npz build results.jsonl
+    python entity_index.py --snapshot index.npz query AAPL
+    python entity_index.py --snapshot index.npz top --k 10 --order negative
+"""
+
+SENTIMENT = "Sentiment Analysis"
+NER = "Named Entity Recognition"
+
+# NER categories that name something worth tracking; DATE and MONEY are skipped
+DEFAULT_CATEGORIES = ("ORGANIZATION", "PERSON", "LOCATION", "MISC")
+
+# Rescale the forward-decay weights before exp() gets anywhere near float64 overflow
+MAX_EXPONENT = 200.0
+
+ORDERS = ("positive", "negative", "weight")
+
+
+def normalize_entity(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def sentiment_score(result: Dict[str, Any]) -> Optional[float]:
+    """
+    Collapse a sentiment result to (positive - negative) / (positive + neutral + negative), in [-1, 1].
+
+    Providers report percentages or fractions; dividing by the total puts both on the same scale.
+    """
+    scores = result.get('sentiment') if isinstance(result, dict) else None
+    if not scores or 'error' in result:
+        return None
+    positive, negative = float(scores.get('positive', 0.0)), float(scores.get('negative', 0.0))
+    total = positive + float(scores.get('neutral', 0.0)) + negative
+    if total <= 0:
+        return None
+    return (positive - negative) / total
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class EntitySentimentIndex:
+    def __init__(self, half_life: float = 6 * 3600.0, aliases: Optional[Dict[str, str]] = None,
+                 initial_capacity: int = 1024, max_staleness: float = 1.0):
+        """
+        Create an empty index.
+
+        Parameters:
+            half_life (float): Seconds after which an observation counts half as much.
+            aliases (dict): Entity names mapped to the name they are tracked under, e.g. {"Apple Inc": "AAPL"}.
+            initial_capacity (int): Entity rows allocated up front; the arrays double as needed.
+            max_staleness (float): Seconds a top-k ranking may lag behind updates before it is rebuilt.
+        """
+        self.half_life = half_life
+        self.decay = math.log(2) / half_life
+        self.aliases = {normalize_entity(alias): target for alias, target in (aliases or {}).items()}
+        self.max_staleness = max_staleness
+        self.lock = threading.RLock()
+
+        self.t0 = time.time()
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.providers: List[str] = []
+        self.provider_ids: Dict[str, int] = {}
+
+        # Per entity and provider: forward-decayed weight and weighted score sums, raw mention counts
+        self.weight = np.zeros((initial_capacity, 0))
+        self.total = np.zeros((initial_capacity, 0))
+        self.mentions = np.zeros((initial_capacity, 0), dtype=np.int64)
+        # Across providers, kept alongside so all-provider queries do not sum columns
+        self.all_weight = np.zeros(initial_capacity)
+        self.all_total = np.zeros(initial_capacity)
+        self.last_seen = np.zeros(initial_capacity)
+
+        self.version = 0
+        self.rankings: Dict[tuple, tuple] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.names)
+
+    def _grow(self, rows: int) -> None:
+        capacity = len(self.all_weight)
+        if rows <= capacity:
+            return
+        extra = max(rows, capacity * 2) - capacity
+        self.weight = np.pad(self.weight, ((0, extra), (0, 0)))
+        self.total = np.pad(self.total, ((0, extra), (0, 0)))
+        self.mentions = np.pad(self.mentions, ((0, extra), (0, 0)))
+        self.all_weight = np.pad(self.all_weight, (0, extra))
+        self.all_total = np.pad(self.all_total, (0, extra))
+        self.last_seen = np.pad(self.last_seen, (0, extra))
+
+    def _entity_id(self, name: str, create: bool) -> Optional[int]:
+        key = normalize_entity(name)
+        key = normalize_entity(self.aliases.get(key, key))
+        entity_id = self.ids.get(key)
+        if entity_id is None and create:
+            entity_id = len(self.names)
+            self._grow(entity_id + 1)
+            self.ids[key] = entity_id
+            self.names.append(" ".join(self.aliases.get(normalize_entity(name), name).split()))
+        return entity_id
+
+    def _provider_id(self, provider: str, create: bool) -> Optional[int]:
+        provider_id = self.provider_ids.get(provider)
+        if provider_id is None and create:
+            provider_id = len(self.providers)
+            self.providers.append(provider)
+            self.provider_ids[provider] = provider_id
+            self.weight = np.pad(self.weight, ((0, 0), (0, 1)))
+            self.total = np.pad(self.total, ((0, 0), (0, 1)))
+            self.mentions = np.pad(self.mentions, ((0, 0), (0, 1)))
+        return provider_id
+
+    def _rescale(self, timestamp: float) -> None:
+        # Move the reference time forward; every aggregate shrinks by the same factor
+        factor = math.exp(-self.decay * (timestamp - self.t0))
+        for array in (self.weight, self.total, self.all_weight, self.all_total):
+            array *= factor
+        self.t0 = timestamp
+        self.rankings.clear()
+
+    def update(self, entities: Iterable[str], score: float, provider: str, timestamp: Optional[float] = None) -> None:
+        """Credit one headline's sentiment `score` (in [-1, 1]) from `provider` to each of its entities."""
+        timestamp = timestamp or time.time()
+        with self.lock:
+            if self.decay * (timestamp - self.t0) > MAX_EXPONENT:
+                self._rescale(timestamp)
+            weight = math.exp(self.decay * (timestamp - self.t0))
+            provider_id = self._provider_id(provider, create=True)
+            entity_ids = {self._entity_id(name, create=True) for name in entities if name and name.strip()}
+            if not entity_ids:
+                return
+            rows = np.fromiter(entity_ids, dtype=np.int64)
+            self.weight[rows, provider_id] += weight
+            self.total[rows, provider_id] += weight * score
+            self.mentions[rows, provider_id] += 1
+            self.all_weight[rows] += weight
+            self.all_total[rows] += weight * score
+            np.maximum.at(self.last_seen, rows, timestamp)
+            self.version += 1
+
+    def _now_factor(self, now: Optional[float]) -> float:
+        return math.exp(-self.decay * ((now or time.time()) - self.t0))
+
+    def get(self, entity: str, provider: Optional[str] = None, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Current decayed sentiment for one entity, across all providers or for one."""
+        with self.lock:
+            entity_id = self._entity_id(entity, create=False)
+            if entity_id is None:
+                return None
+            if provider is None:
+                weight, total = self.all_weight[entity_id], self.all_total[entity_id]
+                mentions = int(self.mentions[entity_id].sum())
+            else:
+                provider_id = self._provider_id(provider, create=False)
+                if provider_id is None:
+                    return None
+                weight, total = self.weight[entity_id, provider_id], self.total[entity_id, provider_id]
+                mentions = int(self.mentions[entity_id, provider_id])
+            if weight <= 0:
+                return None
+            return {
+                "entity": self.names[entity_id],
+                "provider": provider or "all",
+                "sentiment": round(float(total / weight), 4),
+                "weight": round(float(weight * self._now_factor(now)), 4),
+                "mentions": mentions,
+                "last_seen": datetime.fromtimestamp(self.last_seen[entity_id]).isoformat()
+            }
+
+    def by_provider(self, entity: str, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        return {provider: result for provider in self.providers
+                if (result := self.get(entity, provider, now)) is not None}
+
+    def _ranking(self, order: str, provider: Optional[str], min_weight: float, threshold: float) -> np.ndarray:
+        """
+        Ids of the entities whose stored weight is at least `threshold`, best first.
+
+        `threshold` is `min_weight` in stored (reference-time) units, so it rises as time passes while stored
+        weights stay put; a cached ranking is reused until an update lands or its lightest entity falls below it.
+        """
+        key = (order, provider, min_weight)
+        cached = self.rankings.get(key)
+        if (cached and cached[3] <= threshold <= cached[4]
+                and (cached[1] == self.version or time.time() - cached[2] < self.max_staleness)):
+            return cached[0]
+
+        size = self.size
+        if provider is None:
+            weight, total = self.all_weight[:size], self.all_total[:size]
+        else:
+            provider_id = self.provider_ids[provider]
+            weight, total = self.weight[:size, provider_id], self.total[:size, provider_id]
+        present = np.flatnonzero((weight > 0) & (weight >= threshold))
+        if order == "weight":
+            keys = -weight[present]
+        else:
+            mean = total[present] / weight[present]
+            keys = -mean if order == "positive" else mean
+        # Neither order is affected by decay, so the ranking only goes stale through updates and the threshold
+        ranking = present[np.argsort(keys, kind='stable')]
+        floor = float(weight[present].min()) if len(present) else math.inf
+        self.rankings[key] = (ranking, self.version, time.time(), threshold, floor)
+        return ranking
+
+    def top(self, k: int = 10, order: str = "positive", provider: Optional[str] = None,
+            min_weight: float = 1.0, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Entities with the most positive or negative rolling sentiment, or the most (decayed) mentions.
+
+        Entities whose decayed weight is below `min_weight` are skipped, so a single old headline does not
+        top the list.
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order: {order}")
+        with self.lock:
+            if provider is not None and provider not in self.provider_ids:
+                return []
+            # Compare stored weights against the threshold scaled to the reference time instead of decaying them
+            threshold = min_weight / self._now_factor(now)
+            ranking = self._ranking(order, provider, min_weight, threshold)
+            return [self.get(self.names[entity_id], provider, now) for entity_id in ranking[:k]]
+
+    def save(self, path: str) -> None:
+        """Write a snapshot atomically (to a temporary file, then renamed over `path`)."""
+        with self.lock:
+            size = self.size
+            temporary = f"{path}.tmp.npz"
+            np.savez(temporary,
+                     meta=np.array([self.half_life, self.t0]),
+                     names=np.array(self.names, dtype=str),
+                     providers=np.array(self.providers, dtype=str),
+                     weight=self.weight[:size], total=self.total[:size], mentions=self.mentions[:size],
+                     all_weight=self.all_weight[:size], all_total=self.all_total[:size],
+                     last_seen=self.last_seen[:size])
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str, aliases: Optional[Dict[str, str]] = None, max_staleness: float = 1.0,
+             half_life: Optional[float] = None) -> "EntitySentimentIndex":
+        """Restore a snapshot; `half_life`, if given, must match the one it was built with."""
+        with np.load(path) as snapshot:
+            stored_half_life, t0 = snapshot['meta']
+            if half_life is not None and not math.isclose(half_life, stored_half_life):
+                raise ValueError(f"Snapshot was built with half_life={stored_half_life}, not {half_life}")
+            index = cls(float(stored_half_life), aliases, initial_capacity=max(len(snapshot['names']), 1),
+                        max_staleness=max_staleness)
+            index.t0 = float(t0)
+            index.names = [str(name) for name in snapshot['names']]
+            index.ids = {normalize_entity(name): entity_id for entity_id, name in enumerate(index.names)}
+            index.providers = [str(provider) for provider in snapshot['providers']]
+            index.provider_ids = {provider: provider_id for provider_id, provider in enumerate(index.providers)}
+            size = len(index.names)
+            index._grow(size)
+            index.weight = np.zeros((len(index.all_weight), len(index.providers)))
+            index.total = np.zeros_like(index.weight)
+            index.mentions = np.zeros(index.weight.shape, dtype=np.int64)
+            index.weight[:size], index.total[:size], index.mentions[:size] = (
+                snapshot['weight'], snapshot['total'], snapshot['mentions'])
+            index.all_weight[:size], index.all_total[:size], index.last_seen[:size] = (
+                snapshot['all_weight'], snapshot['all_total'], snapshot['last_seen'])
+        return index
+
+    @classmethod
+    def open(cls, path: Optional[str], half_life: float = 6 * 3600.0, aliases: Optional[Dict[str, str]] = None,
+             max_staleness: float = 1.0) -> "EntitySentimentIndex":
+        """Load the snapshot at `path` if there is one, otherwise start empty."""
+        if path and os.path.exists(path):
+            return cls.load(path, aliases, max_staleness, half_life)
+        return cls(half_life, aliases, max_staleness=max_staleness)
+
+
+class EntitySentimentJoiner:
+    def __init__(self, index: EntitySentimentIndex, categories: Iterable[str] = DEFAULT_CATEGORIES,
+                 max_pending: int = 100000):
+        """
+        Pair NER and sentiment results for the same text and feed them into `index`.
+
+        Either half may arrive first, and one NER result serves sentiment from every provider. Texts are
+        remembered for the last `max_pending` headlines; older unmatched halves are dropped.
+        """
+        self.index = index
+        self.categories = {category.upper() for category in categories}
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.joined = 0
+
+    def _entities(self, result: Dict[str, Any]) -> List[str]:
+        return [entity.get('text', '') for entity in result.get('entities', [])
+                if str(entity.get('category', '')).upper() in self.categories]
+
+    def _slot(self, key: str) -> Dict[str, Any]:
+        slot = self.pending.get(key)
+        if slot is None:
+            slot = self.pending[key] = {"entities": None, "sentiments": []}
+            if len(self.pending) > self.max_pending:
+                self.pending.popitem(last=False)
+        else:
+            self.pending.move_to_end(key)
+        return slot
+
+    def add_entities(self, text: str, result: Dict[str, Any]) -> None:
+        if 'error' in result:
+            return
+        with self.lock:
+            slot = self._slot(text)
+            slot['entities'] = self._entities(result)
+            waiting, slot['sentiments'] = slot['sentiments'], []
+        for provider, score, timestamp in waiting:
+            self._apply(slot['entities'], provider, score, timestamp)
+
+    def add_sentiment(self, text: str, result: Dict[str, Any], provider: Optional[str] = None,
+                      timestamp: Optional[float] = None) -> None:
+        score = sentiment_score(result)
+        if score is None:
+            return
+        provider = provider or result.get('provider') or "unknown"
+        timestamp = timestamp or _timestamp(result.get('timestamp')) or time.time()
+        with self.lock:
+            slot = self._slot(text)
+            entities = slot['entities']
+            if entities is None:
+                slot['sentiments'].append((provider, score, timestamp))
+                return
+        self._apply(entities, provider, score, timestamp)
+
+    def _apply(self, entities: List[str], provider: str, score: float, timestamp: float) -> None:
+        if entities:
+            self.index.update(entities, score, provider, timestamp)
+            with self.lock:
+                self.joined += 1
+
+    def observe(self, record: Dict[str, Any]) -> None:
+        """Take a result row as written by work_queue.py, feed_ingest.py or the results store."""
+        text = record.get('input_text') or record.get('text') or record.get('title')
+        results = record.get('results')
+        if not text or not isinstance(results, dict):
+            return
+        if record.get('analysis_type') == NER or 'entities' in results:
+            self.add_entities(text, results)
+        elif record.get('analysis_type') == SENTIMENT or 'sentiment' in results:
+            timestamp = _timestamp(record.get('published_at')) or _timestamp(record.get('fetched_at'))
+            self.add_sentiment(text, results, record.get('api') if record.get('api') != "Any" else None, timestamp)
+
+
+JOIN_FIELDS = ('input_text', 'text', 'title', 'results', 'analysis_type', 'api', 'published_at', 'fetched_at')
+
+
+def joinable(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep only the NER and sentiment rows, and the fields `observe` reads; runs in the corpus_reader workers."""
+    return [{field: record[field] for field in JOIN_FIELDS if field in record} for record in records
+            if isinstance(record.get('results'), dict)
+            and ('entities' in record['results'] or 'sentiment' in record['results']
+                 or record.get('analysis_type') in (NER, SENTIMENT))]
+
+
+def build_index(settings: Dict[str, Any]) -> EntitySentimentJoiner:
+    """Create (or restore) an index and joiner from the `entity_index_settings` section of config.yaml."""
+    index = EntitySentimentIndex.open(
+        settings.get('snapshot_path'),
+        half_life=settings.get('half_life_hours', 6) * 3600.0,
+        aliases=settings.get('aliases'),
+        max_staleness=settings.get('max_staleness', 1.0)
+    )
+    return EntitySentimentJoiner(index, settings.get('categories', DEFAULT_CATEGORIES),
+                                 settings.get('max_pending', 100000))
+
+
+def _print_rows(rows: List[Optional[Dict[str, Any]]]) -> None:
+    print(f"{'entity':30} {'provider':10} {'sentiment':>9} {'weight':>9} {'mentions':>8}  last seen")
+    for row in rows:
+        if row:
+            print(f"{row['entity'][:30]:30} {row['provider']:10} {row['sentiment']:9.3f} {row['weight']:9.2f} "
+                  f"{row['mentions']:8d}  {row['last_seen'][:19]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the per-entity sentiment index")
+    parser.add_argument("--snapshot", default="./results/entity_index.npz")
+    parser.add_argument("--half-life-hours", type=float, default=6.0)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Add NER and sentiment results from JSONL files")
+    build_parser.add_argument("paths", nargs="+")
+    query_parser = subparsers.add_parser("query", help="Rolling sentiment for entities")
+    query_parser.add_argument("entities", nargs="+")
+    top_parser = subparsers.add_parser("top", help="Most positive, most negative or most mentioned entities")
+    top_parser.add_argument("--k", type=int, default=10)
+    top_parser.add_argument("--order", choices=ORDERS, default="positive")
+    top_parser.add_argument("--provider")
+    top_parser.add_argument("--min-weight", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from corpus_reader import iter_chunks
+        joiner = build_index({"snapshot_path": args.snapshot, "half_life_hours": args.half_life_hours})
+        start = time.perf_counter()
+        for path in args.paths:
+            for chunk in iter_chunks(path, transform=joinable):
+                for record in chunk:
+                    joiner.observe(record)
+        joiner.index.save(args.snapshot)
+        print(f"Joined {joiner.joined} results into {joiner.index.size} entities "
+              f"in {time.perf_counter() - start:.1f}s; saved {args.snapshot}")
+    else:
+        index = EntitySentimentIndex.load(args.snapshot)
+        if args.command == "query":
+            _print_rows([row for entity in args.entities
+                         for row in [index.get(entity), *index.by_provider(entity).values()]])
+        else:
+            _print_rows(index.top(args.k, args.order, args.provider, args.min_weight))
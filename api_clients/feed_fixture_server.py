@@ -0,0 +1,141 @@
+import re
+import time
+import argparse
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Tuple
+
+"""
+Local fixture server for feed_ingest.py.
+
+Serves any number of synthetic RSS feeds at /feeds/<n>.xml and matching HTML pages at
+/pages/<n>.html. Each source gains a new headline every `--item-interval` seconds, and responses
+carry ETag and Last-Modified so conditional requests get a 304 until something new is published:
+
+    python feed_fixture_server.py --port 8998 --item-interval 5
+    python feed_ingest.py run --once --fixture-port 8998 --fixture-sources 500
+"""
+
+COMPANIES = ["Tesla", "Apple", "Nvidia", "Boeing", "Pfizer", "Exxon", "Walmart", "Intel", "Ford", "Netflix"]
+EVENTS = ["beats Q{q} estimates", "cuts {n} jobs", "announces ${n}B buyback", "shares fall {n}% on guidance",
+          "wins ${n}M contract", "faces probe over accounting"]
+ITEMS_PER_FEED = 20
+
+
+class FeedFixtures:
+    def __init__(self, item_interval: float):
+        self.item_interval = item_interval
+        self.started_at = time.time()
+        self.requests = 0
+        self.not_modified = 0
+        self.lock = threading.Lock()
+
+    def latest_item(self, feed: int) -> int:
+        # Feeds are offset so they do not all publish at the same moment
+        offset = (feed * 0.37) % 1.0 * self.item_interval
+        return int((time.time() - self.started_at + offset) // self.item_interval) + ITEMS_PER_FEED
+
+    def published_at(self, feed: int, item: int) -> float:
+        offset = (feed * 0.37) % 1.0 * self.item_interval
+        return self.started_at - offset + (item - ITEMS_PER_FEED) * self.item_interval
+
+    @staticmethod
+    def headline(feed: int, item: int) -> str:
+        company = COMPANIES[(feed + item) % len(COMPANIES)]
+        event = EVENTS[(feed * 7 + item) % len(EVENTS)].format(q=item % 4 + 1, n=(feed + item) % 90 + 5)
+        return f"{company} {event} (source {feed}, item {item})"
+
+    def items(self, feed: int):
+        latest = self.latest_item(feed)
+        return [(item, self.headline(feed, item)) for item in range(latest, max(latest - ITEMS_PER_FEED, 0), -1)]
+
+    def rss(self, feed: int) -> str:
+        entries = "".join(
+            f"<item><title>{title}</title><link>http://fixture/{feed}/{item}</link>"
+            f"<guid>fixture-{feed}-{item}</guid><pubDate>{formatdate(self.published_at(feed, item))}</pubDate></item>"
+            for item, title in self.items(feed))
+        return (f'<?xml version="1.0"?><rss version="2.0"><channel><title>Fixture feed {feed}</title>'
+                f"<link>http://fixture/{feed}</link>{entries}</channel></rss>")
+
+    def page(self, feed: int) -> str:
+        links = "".join(f'<h2><a href="/articles/{feed}/{item}">{title}</a></h2>' for item, title in self.items(feed))
+        return f"<html><body><h1>Fixture page {feed}</h1>{links}</body></html>"
+
+    def validators(self, feed: int) -> Tuple[str, float]:
+        latest = self.latest_item(feed)
+        return f'"{feed}-{latest}"', self.published_at(feed, latest)
+
+
+def make_handler(fixtures: FeedFixtures):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            match = re.fullmatch(r"/(feeds|pages)/(\d+)\.(xml|html)", self.path)
+            if not match:
+                self._send(404, b"not found", "text/plain")
+                return
+
+            feed = int(match.group(2))
+            etag, modified = fixtures.validators(feed)
+            with fixtures.lock:
+                fixtures.requests += 1
+            if self._not_modified(etag, modified):
+                with fixtures.lock:
+                    fixtures.not_modified += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            if match.group(1) == "feeds":
+                self._send(200, fixtures.rss(feed).encode(), "application/rss+xml", etag, modified)
+            else:
+                self._send(200, fixtures.page(feed).encode(), "text/html", etag, modified)
+
+        def _not_modified(self, etag: str, modified: float) -> bool:
+            if self.headers.get("If-None-Match"):
+                return self.headers["If-None-Match"] == etag
+            if self.headers.get("If-Modified-Since"):
+                try:
+                    return parsedate_to_datetime(self.headers["If-Modified-Since"]).timestamp() >= int(modified)
+                except (TypeError, ValueError):
+                    return False
+            return False
+
+        def _send(self, status: int, body: bytes, content_type: str, etag: str = None, modified: float = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", formatdate(modified, usegmt=True))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8998, item_interval: float = 5.0) -> ThreadingHTTPServer:
+    """Start the fixture server on a background thread and return it (call shutdown() to stop)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(FeedFixtures(item_interval)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fixture server with synthetic news feeds")
+    parser.add_argument("--port", type=int, default=8998)
+    parser.add_argument("--item-interval", type=float, default=5.0, help="Seconds between new items per feed")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(FeedFixtures(args.item_interval)))
+    server.daemon_threads = True
+    print(f"Feed fixtures on http://127.0.0.1:{args.port}/feeds/<n>.xml and /pages/<n>.html")
+    server.serve_forever()
@@ -0,0 +1,483 @@
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable
+
+import httpx
+import feedparser
+from bs4 import BeautifulSoup
+
+from tracing import tracer, SPAN_KIND_CLIENT
+
+"""
+Incremental headline ingestion from RSS/Atom feeds and plain news pages.
+
+Each source is polled on its own interval with conditional requests (ETag / If-Modified-Since), so
+an unchanged feed costs one 304 and no parsing. Items already seen for a source are skipped, and
+every new headline is pushed into APIHandler at bulk priority. All sources share one bounded httpx
+connection pool, so hundreds of them can be polled concurrently from a single event loop; parsing,
+SQLite and the hand-off to APIHandler run on worker threads so they never stall that loop. An item
+is only recorded as seen once its results have been written without error, and a response's
+ETag/Last-Modified are only stored once every new item from the source has been, so neither a crash
+mid-analysis nor a failed analysis loses an item behind a 304.
+
+Sources come from `ingestion_settings` in config.yaml:
+
+    ingestion_settings:
+      sources:
+        - {name: "reuters-business", url: "https://...rss", interval: 120}
+        - {name: "example-page", url: "https://...", type: "html", selector: "h2 a"}
+
+    python feed_ingest.py run --output headlines.jsonl
+    python feed_ingest.py run --once --fixture-port 8998   # against feed_fixture_server.py
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    last_fetch REAL,
+    last_status INTEGER,
+    failures INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS seen (
+    source TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (source, item_id)
+);
+"""
+
+DEFAULT_HTML_SELECTOR = "h1 a, h2 a, h3 a"
+MAX_BACKOFF_EXPONENT = 5
+
+
+class IngestionState:
+    """Per-source validators and seen-item ids, kept in SQLite so restarts do not re-ingest."""
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def source(self, name: str) -> Dict[str, Any]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT etag, last_modified, last_fetch, last_status, failures FROM sources WHERE name = ?",
+                (name,)).fetchone()
+        if row is None:
+            return {"etag": None, "last_modified": None, "last_fetch": None, "last_status": None, "failures": 0}
+        return dict(zip(("etag", "last_modified", "last_fetch", "last_status", "failures"), row))
+
+    def update_source(self, name: str, status: int, etag: Optional[str] = None,
+                      last_modified: Optional[str] = None, failed: bool = False) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO sources (name, etag, last_modified, last_fetch, last_status, failures) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+                "etag = COALESCE(excluded.etag, etag), last_modified = COALESCE(excluded.last_modified, last_modified), "
+                "last_fetch = excluded.last_fetch, last_status = excluded.last_status, "
+                "failures = CASE WHEN ? THEN failures + 1 ELSE 0 END",
+                (name, etag, last_modified, time.time(), status, int(failed), int(failed)))
+
+    def filter_new(self, source: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the items not yet marked seen for `source`."""
+        if not items:
+            return []
+        with self.lock:
+            new_items = [item for item in items if self.connection.execute(
+                "SELECT 1 FROM seen WHERE source = ? AND item_id = ?", (source, item['id'])).fetchone() is None]
+        return new_items
+
+    def set_validators(self, name: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE sources SET etag = ?, last_modified = ? WHERE name = ?",
+                                    (etag, last_modified, name))
+
+    def mark_seen(self, source: str, item_id: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO seen (source, item_id, first_seen) VALUES (?, ?, ?)",
+                                    (source, item_id, time.time()))
+
+    def prune(self, max_age_days: float) -> int:
+        with self.lock, self.connection:
+            return self.connection.execute("DELETE FROM seen WHERE first_seen < ?",
+                                           (time.time() - max_age_days * 86400,)).rowcount
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def _item_id(*parts: Optional[str]) -> str:
+    for part in parts:
+        if part:
+            return part
+    return ""
+
+
+def parse_feed(content: bytes, source: str) -> List[Dict[str, Any]]:
+    parsed = feedparser.parse(content)
+    items = []
+    for entry in parsed.entries:
+        title = (entry.get('title') or "").strip()
+        if not title:
+            continue
+        items.append({
+            "source": source,
+            "id": _item_id(entry.get('id'), entry.get('link'), hashlib.sha1(title.encode()).hexdigest()),
+            "title": title,
+            "link": entry.get('link'),
+            "published": entry.get('published') or entry.get('updated')
+        })
+    return items
+
+
+def parse_page(content: bytes, source: str, base_url: str, selector: str = DEFAULT_HTML_SELECTOR) -> List[Dict[str, Any]]:
+    soup = BeautifulSoup(content, 'lxml')
+    items, seen_ids = [], set()
+    for element in soup.select(selector):
+        title = " ".join(element.get_text(" ").split())
+        if not title:
+            continue
+        link = element.get('href')
+        link = str(httpx.URL(base_url).join(link)) if link else None
+        item_id = _item_id(link, hashlib.sha1(title.encode()).hexdigest())
+        if item_id in seen_ids:
+            continue
+        seen_ids.add(item_id)
+        items.append({"source": source, "id": item_id, "title": title, "link": link, "published": None})
+    return items
+
+
+class FeedIngestor:
+    def __init__(self, sources: List[Dict[str, Any]], state: IngestionState, sink: Callable[[Dict[str, Any]], None],
+                 default_interval: float = 300.0, max_connections: int = 50, concurrency: int = 100,
+                 timeout: float = 15.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Poll feed and page sources and hand every new item to `sink`.
+
+        Parameters:
+            sources (list): Dicts with `name`, `url`, optional `type` ('rss' or 'html'), `selector` and `interval`.
+            state (IngestionState): Conditional-request validators and seen-item ids.
+            sink (callable): Called with each new item dict. If it returns a Future, the item is marked
+                seen when that future succeeds; otherwise as soon as the call returns. A source's new
+                validators are stored only once all its items have been marked seen.
+            default_interval (float): Seconds between polls of a source without its own interval.
+            max_connections (int): Size of the shared connection pool.
+            concurrency (int): Sources fetched at the same time.
+            timeout (float): Per-request timeout in seconds.
+            transport (httpx.AsyncBaseTransport): Optional transport override.
+        """
+        names = [source['name'] for source in sources]
+        if len(set(names)) != len(names):
+            raise ValueError("Source names must be unique")
+        self.sources = sources
+        self.state = state
+        self.sink = sink
+        self.default_interval = default_interval
+        self.max_connections = max_connections
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.transport = transport
+        self.stats = {"fetched": 0, "not_modified": 0, "failed": 0, "items": 0, "new_items": 0}
+        # (source, item id) pairs handed to the sink but not yet marked seen, so a re-poll does not submit them again
+        self.in_flight = set()
+        # Per source: items in flight, validators of the latest response waiting for them, and whether one failed
+        self.in_flight_counts: Dict[str, int] = {}
+        self.pending_validators: Dict[str, tuple] = {}
+        self.unwritten = set()
+        self.lock = threading.Lock()
+
+    def _interval(self, source: Dict[str, Any], failures: int) -> float:
+        interval = source.get('interval', self.default_interval)
+        # Back off from failing sources instead of hammering them every cycle
+        return interval * 2 ** min(failures, MAX_BACKOFF_EXPONENT)
+
+    def due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        now = now or time.time()
+        due_sources = []
+        for source in self.sources:
+            state = self.state.source(source['name'])
+            if state['last_fetch'] is None or now >= state['last_fetch'] + self._interval(source, state['failures']):
+                due_sources.append(source)
+        return due_sources
+
+    def next_due_in(self) -> float:
+        now = time.time()
+        waits = []
+        for source in self.sources:
+            state = self.state.source(source['name'])
+            if state['last_fetch'] is None:
+                return 0.0
+            waits.append(state['last_fetch'] + self._interval(source, state['failures']) - now)
+        return max(0.0, min(waits)) if waits else self.default_interval
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=self.transport,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            timeout=httpx.Timeout(self.timeout, pool=None),
+            follow_redirects=True,
+            headers={"User-Agent": "nlie-feed-ingest/1.0"}
+        )
+
+    def _accept(self, name: str, items: List[Dict[str, Any]], validators: tuple) -> List[Dict[str, Any]]:
+        """Pick out the items that are neither seen nor in flight and hand them to the sink."""
+        new_items = []
+        with self.lock:
+            self.pending_validators[name] = validators
+            for item in self.state.filter_new(name, items):
+                if (name, item['id']) not in self.in_flight:
+                    self.in_flight.add((name, item['id']))
+                    new_items.append(item)
+            self.in_flight_counts[name] = self.in_flight_counts.get(name, 0) + len(new_items)
+        fetched_at = datetime.now().isoformat()
+        for position, item in enumerate(new_items):
+            try:
+                written = self.sink({**item, "fetched_at": fetched_at})
+            except Exception:
+                # Release this item and the ones not handed over yet so the next poll retries them
+                for pending in new_items[position:]:
+                    self._finish(name, pending['id'], False)
+                raise
+            if isinstance(written, Future):
+                written.add_done_callback(
+                    lambda done, item_id=item['id']: self._finish(name, item_id, done.exception() is None))
+            else:
+                self._finish(name, item['id'], True)
+        self._settle(name)
+        return new_items
+
+    def _finish(self, name: str, item_id: str, written: bool) -> None:
+        if written:
+            self.state.mark_seen(name, item_id)
+        with self.lock:
+            self.in_flight.discard((name, item_id))
+            self.in_flight_counts[name] -= 1
+            if not written:
+                self.unwritten.add(name)
+        self._settle(name)
+
+    def _settle(self, name: str) -> None:
+        """Store the latest validators once nothing from the source is in flight and nothing failed."""
+        with self.lock:
+            if self.in_flight_counts.get(name) or name not in self.pending_validators:
+                return
+            validators = self.pending_validators.pop(name)
+            if name in self.unwritten:
+                # Keep the old validators so the next poll gets a full response and retries the failed items
+                self.unwritten.discard(name)
+                return
+        if any(validators):
+            self.state.set_validators(name, *validators)
+
+    async def _fetch(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                     source: Dict[str, Any]) -> int:
+        name = source['name']
+        state = await asyncio.to_thread(self.state.source, name)
+        headers = {}
+        if state['etag']:
+            headers['If-None-Match'] = state['etag']
+        if state['last_modified']:
+            headers['If-Modified-Since'] = state['last_modified']
+
+        with tracer.span("feed.fetch", kind=SPAN_KIND_CLIENT, source=name, url=source['url']) as span:
+            try:
+                async with semaphore:
+                    response = await client.get(source['url'], headers=headers)
+                span.set_attribute("http.status_code", response.status_code)
+                if response.status_code == 304:
+                    await asyncio.to_thread(self.state.update_source, name, 304)
+                    self.stats['not_modified'] += 1
+                    return 0
+                response.raise_for_status()
+
+                if source.get('type', 'rss') == 'html':
+                    items = await asyncio.to_thread(parse_page, response.content, name, str(response.url),
+                                                    source.get('selector', DEFAULT_HTML_SELECTOR))
+                else:
+                    items = await asyncio.to_thread(parse_feed, response.content, name)
+                await asyncio.to_thread(self.state.update_source, name, response.status_code)
+                # The new validators are held back until the items are written (see _settle)
+                new_items = await asyncio.to_thread(
+                    self._accept, name, items, (response.headers.get('ETag'), response.headers.get('Last-Modified')))
+            except Exception as e:
+                span.record_exception(e)
+                status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else 0
+                await asyncio.to_thread(self.state.update_source, name, status, failed=True)
+                self.stats['failed'] += 1
+                return 0
+
+            span.set_attributes({"items": len(items), "new_items": len(new_items)})
+            self.stats['fetched'] += 1
+            self.stats['items'] += len(items)
+            self.stats['new_items'] += len(new_items)
+            return len(new_items)
+
+    async def poll_once(self, client: Optional[httpx.AsyncClient] = None) -> int:
+        """Fetch every source that is due and return the number of new items."""
+        sources = await asyncio.to_thread(self.due)
+        if not sources:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        if client is not None:
+            counts = await asyncio.gather(*(self._fetch(client, semaphore, source) for source in sources))
+        else:
+            async with self._client() as own_client:
+                counts = await asyncio.gather(*(self._fetch(own_client, semaphore, source) for source in sources))
+        return sum(counts)
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Poll until `stop` is set, sleeping until the next source is due."""
+        stop = stop or asyncio.Event()
+        async with self._client() as client:
+            while not stop.is_set():
+                await self.poll_once(client)
+                try:
+                    wait = await asyncio.to_thread(self.next_due_in)
+                    await asyncio.wait_for(stop.wait(), timeout=max(wait, 1.0))
+                except asyncio.TimeoutError:
+                    pass
+
+
+class AnalysisSink:
+    """Push new headlines into APIHandler at bulk priority and append results to a JSONL file."""
+
+    def __init__(self, handler, api_name: str, analysis_types: List[str], output_path: Optional[str] = None,
+                 joiner=None, snapshot_path: Optional[str] = None, snapshot_interval: float = 300.0):
+        """
+        `joiner` (an entity_index.EntitySentimentJoiner) also receives every result, and its index is
+        saved to `snapshot_path` every `snapshot_interval` seconds and on close.
+        """
+        self.handler = handler
+        self.api_name = api_name
+        self.analysis_types = analysis_types
+        self.output = open(output_path, 'a') if output_path else None
+        self.joiner = joiner
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.last_snapshot = time.time()
+        self.done = threading.Condition()
+        self.submitted = 0
+        self.completed = 0
+
+    def __call__(self, item: Dict[str, Any]) -> Future:
+        """
+        Submit every analysis of `item`; the returned future completes once all their results are written,
+        and fails if any of them is an error.
+        """
+        progress = {"written": Future(), "remaining": len(self.analysis_types), "errors": []}
+        for analysis_type in self.analysis_types:
+            with self.done:
+                self.submitted += 1
+            future = self.handler.submit(self.api_name, analysis_type, item['title'], 'bulk')
+            future.add_done_callback(
+                lambda done, analysis_type=analysis_type: self._write(item, analysis_type, done, progress))
+        return progress['written']
+
+    def _write(self, item: Dict[str, Any], analysis_type: str, future, progress: Dict[str, Any]) -> None:
+        result = future.result() if not future.cancelled() and future.exception() is None else {
+            "error": "Analysis was cancelled or failed"}
+        record = {**item, "analysis_type": analysis_type, "results": result}
+        if self.joiner:
+            self.joiner.observe(record)
+        with self.done:
+            if self.output:
+                self.output.write(json.dumps(record) + "\n")
+                self.output.flush()
+            self.completed += 1
+            if not isinstance(result, dict) or 'error' in result:
+                progress['errors'].append(
+                    f"{analysis_type}: {result.get('error') if isinstance(result, dict) else result}")
+            progress['remaining'] -= 1
+            item_written = progress['remaining'] == 0
+            snapshot_due = self.snapshot_path and time.time() - self.last_snapshot >= self.snapshot_interval
+            if snapshot_due:
+                self.last_snapshot = time.time()
+            self.done.notify_all()
+        if item_written:
+            if progress['errors']:
+                progress['written'].set_exception(RuntimeError("; ".join(progress['errors'])))
+            else:
+                progress['written'].set_result(None)
+        if snapshot_due and self.joiner:
+            self.joiner.index.save(self.snapshot_path)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted analysis has been written."""
+        with self.done:
+            return self.done.wait_for(lambda: self.completed >= self.submitted, timeout)
+
+    def close(self) -> None:
+        if self.output:
+            self.output.close()
+        if self.joiner and self.snapshot_path:
+            self.joiner.index.save(self.snapshot_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll news feeds and analyze new headlines")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("--output", help="JSONL file for analysis results")
+    run_parser.add_argument("--once", action="store_true", help="Poll every source once and exit")
+    run_parser.add_argument("--fixture-port", type=int,
+                            help="Poll a local feed_fixture_server.py instead of the configured sources")
+    run_parser.add_argument("--fixture-sources", type=int, default=200)
+    args = parser.parse_args()
+
+    from api_handler import APIHandler
+    handler = APIHandler()
+    settings = handler.config.get_ingestion_settings()
+    sources = settings.get('sources', [])
+    if args.fixture_port:
+        sources = [{"name": f"fixture-{index}", "url": f"http://127.0.0.1:{args.fixture_port}/feeds/{index}.xml"}
+                   for index in range(args.fixture_sources)]
+
+    state = IngestionState(settings.get('state_path', './ingestion_state.db'))
+    state.prune(settings.get('seen_retention_days', 30))
+    analysis_types = settings.get('analysis_types', ['Sentiment Analysis'])
+    index_settings = handler.config.get_entity_index_settings()
+    joiner = None
+    if index_settings.get('enabled'):
+        from entity_index import build_index, SENTIMENT, NER
+        joiner = build_index(index_settings)
+        # The index needs both halves of every headline
+        analysis_types = analysis_types + [analysis for analysis in (SENTIMENT, NER) if analysis not in analysis_types]
+    sink = AnalysisSink(handler, settings.get('api', 'Any'), analysis_types, args.output, joiner,
+                        index_settings.get('snapshot_path'), index_settings.get('snapshot_interval', 300))
+    ingestor = FeedIngestor(
+        sources, state, sink,
+        default_interval=settings.get('default_interval', 300),
+        max_connections=settings.get('max_connections', 50),
+        concurrency=settings.get('concurrency', 100),
+        timeout=settings.get('timeout', 15)
+    )
+
+    try:
+        if args.once:
+            start = time.perf_counter()
+            new_items = asyncio.run(ingestor.poll_once())
+            sink.wait()
+            print(f"Polled {len(sources)} sources in {time.perf_counter() - start:.2f}s: {new_items} new items, "
+                  f"{ingestor.stats}")
+        else:
+            asyncio.run(ingestor.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        handler.close()
+        sink.close()
+        state.close()
+
+
+if __name__ == "__main__":
+    main()
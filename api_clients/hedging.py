@@ -0,0 +1,143 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, Any, Callable, Optional
+
+from async_transport import Cancellation, current_cancellation
+from provider_health import HealthTracker
+from request_scheduler import RequestScheduler
+
+
+class RequestHedger:
+    def __init__(self, health: HealthTracker, scheduler: RequestScheduler, percentile: float = 0.95,
+                 min_delay: float = 0.5, max_hedge_rate: float = 0.1, hedge_priority: str = 'normal',
+                 max_workers: int = 64):
+        """
+        Fire a duplicate request when the first one is slower than usual and keep whichever returns first.
+
+        The hedge delay is the provider's recent latency at `percentile`, so with the default only about
+        5% of calls are duplicated. `max_hedge_rate` caps the fraction of calls that may be hedged so
+        extra spend stays bounded even when a provider slows down across the board. Hedges are queued on
+        the scheduler like any other call, so they respect the hedge provider's concurrency limit, and
+        one that cannot start within the hedge delay is dropped.
+
+        Parameters:
+            health (HealthTracker): Source of per-provider latency percentiles.
+            scheduler (RequestScheduler): Queue that hedge calls go through.
+            percentile (float): Latency percentile after which a hedge is sent.
+            min_delay (float): Lower bound on the hedge delay in seconds.
+            max_hedge_rate (float): Maximum fraction of requests that may be hedged.
+            hedge_priority (str): Scheduler priority of hedge calls.
+            max_workers (int): Threads for primary calls, i.e. hedged requests in flight at once.
+        """
+        self.health = health
+        self.scheduler = scheduler
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_hedge_rate = max_hedge_rate
+        self.hedge_priority = hedge_priority
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self.lock = threading.Lock()
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.cancelled_calls = 0
+        self.wasted_calls = 0
+
+    def _hedge_delay(self, provider: str):
+        latency = self.health.get(provider).latency_percentile(self.percentile)
+        return max(latency, self.min_delay) if latency is not None else None
+
+    def _budget_allows_hedge(self) -> bool:
+        with self.lock:
+            return self.hedged < self.max_hedge_rate * self.requests
+
+    @staticmethod
+    def _attempt(call: Callable[[str], Dict[str, Any]], provider: str, cancellation: Cancellation) -> Dict[str, Any]:
+        # Requests made under the cancellation are aborted when the other call wins
+        token = current_cancellation.set(cancellation)
+        try:
+            return call(provider)
+        finally:
+            current_cancellation.reset(token)
+
+    @staticmethod
+    def _result(future: Future) -> Dict[str, Any]:
+        try:
+            return future.result()
+        except Exception as e:
+            # e.g. a hedge that expired in the scheduler queue
+            return {"error": f"Hedged call failed: {str(e)}"}
+
+    def _count_loser(self, future: Future) -> None:
+        # Dropped before it started (cancelled or expired in the scheduler queue): nothing was spent
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = self._result(future)
+        with self.lock:
+            if isinstance(result, dict) and result.get('cancelled'):
+                self.cancelled_calls += 1
+            else:
+                self.wasted_calls += 1
+
+    def run(self, provider: str, hedge_provider: str, call: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Call `call(provider)`, hedging with `call(hedge_provider)` if it is slower than usual.
+
+        The first successful result wins. A losing call still queued is dropped; one already running is
+        cancelled, which aborts the HTTP request on the async transport. Calls through blocking SDK
+        clients cannot be interrupted, so their results are discarded and counted as wasted.
+        """
+        with self.lock:
+            self.requests += 1
+
+        primary_cancellation = Cancellation()
+        primary = self.executor.submit(self._attempt, call, provider, primary_cancellation)
+        delay = self._hedge_delay(provider)
+        # Without latency history there is no baseline to call a request slow
+        if delay is None or wait([primary], timeout=delay).done or not self._budget_allows_hedge():
+            return self._result(primary)
+
+        with self.lock:
+            self.hedged += 1
+        hedge_cancellation = Cancellation()
+        hedge = self.scheduler.submit(hedge_provider,
+                                      lambda: self._attempt(call, hedge_provider, hedge_cancellation),
+                                      self.hedge_priority, timeout=delay)
+
+        pending = {primary, hedge}
+        winner = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = done.pop()
+            if 'error' not in self._result(winner):
+                break
+            if done:
+                # Both finished together; prefer whichever succeeded
+                other = done.pop()
+                winner = other if 'error' not in self._result(other) else winner
+                break
+
+        if winner is primary:
+            loser, loser_cancellation = hedge, hedge_cancellation
+        else:
+            loser, loser_cancellation = primary, primary_cancellation
+        if not loser.cancel():
+            loser_cancellation.cancel()
+            loser.add_done_callback(self._count_loser)
+
+        if winner is hedge:
+            with self.lock:
+                self.hedge_wins += 1
+        return self._result(winner)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "cancelled_calls": self.cancelled_calls,
+                "wasted_calls": self.wasted_calls
+            }
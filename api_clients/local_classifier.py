@@ -0,0 +1,165 @@
+from typing import Dict, Any, List, Optional, Union
+from datetime import datetime
+
+import numpy as np
+
+from sentence_embedder import SentenceEmbedder
+
+
+class LocalTextClassifier:
+    def __init__(self, embedder: SentenceEmbedder, labels: Union[List[str], Dict[str, List[str]]],
+                 confidence_threshold: float = 0.5, max_categories: int = 5, temperature: float = 0.05):
+        """
+        Classify texts locally against a configurable label set.
+
+        Each label is described by one or more example phrases. By default texts are assigned to the
+        nearest label centroid in embedding space; once `fit_head` has been called (or a head has been
+        loaded) a linear softmax head is used instead.
+
+        Parameters:
+            embedder (SentenceEmbedder): Model used to embed both label examples and input texts.
+            labels (list | dict): Label names, or a mapping of label name to example phrases.
+            confidence_threshold (float): Minimum confidence for a category to be reported.
+            max_categories (int): Maximum number of categories returned per text.
+            temperature (float): Softmax temperature applied to centroid cosine similarities.
+        """
+        if not labels:
+            raise ValueError("At least one classification label must be configured")
+
+        if isinstance(labels, dict):
+            self.label_examples = {name: list(examples) or [name] for name, examples in labels.items()}
+        else:
+            self.label_examples = {name: [name] for name in labels}
+
+        self.embedder = embedder
+        self.label_names = list(self.label_examples)
+        self.confidence_threshold = confidence_threshold
+        self.max_categories = max_categories
+        self.temperature = temperature
+
+        self.centroids = self._build_centroids()
+        self.head_weights: Optional[np.ndarray] = None
+        self.head_bias: Optional[np.ndarray] = None
+
+    def _build_centroids(self) -> np.ndarray:
+        """Embed every label's examples in one batched pass and average them per label."""
+        examples, owners = [], []
+        for index, name in enumerate(self.label_names):
+            examples.extend(self.label_examples[name])
+            owners.extend([index] * len(self.label_examples[name]))
+
+        vectors = self.embedder.encode(examples)
+        owners = np.asarray(owners)
+        centroids = np.vstack([vectors[owners == i].mean(axis=0) for i in range(len(self.label_names))])
+        return centroids / np.linalg.norm(centroids, axis=1, keepdims=True)
+
+    def fit_head(self, texts: List[str], labels: List[str], epochs: int = 200,
+                 learning_rate: float = 0.5, l2: float = 1e-4) -> None:
+        """Train a softmax-regression head on labelled examples with full-batch gradient descent."""
+        unknown = set(labels) - set(self.label_names)
+        if unknown:
+            raise ValueError(f"Unknown labels in training data: {sorted(unknown)}")
+
+        features = self.embedder.encode(texts)
+        targets = np.zeros((len(labels), len(self.label_names)), dtype=np.float32)
+        targets[np.arange(len(labels)), [self.label_names.index(label) for label in labels]] = 1.0
+
+        # Start from the centroid classifier so few-shot training only has to refine it
+        weights = (self.centroids.T / self.temperature).astype(np.float32)
+        bias = np.zeros(len(self.label_names), dtype=np.float32)
+
+        for _ in range(epochs):
+            probabilities = self._softmax(features @ weights + bias)
+            gradient = (probabilities - targets) / len(labels)
+            weights -= learning_rate * (features.T @ gradient + l2 * weights)
+            bias -= learning_rate * gradient.sum(axis=0)
+
+        self.head_weights, self.head_bias = weights, bias
+
+    def save_head(self, path: str) -> None:
+        if self.head_weights is None:
+            raise ValueError("No linear head has been trained")
+        np.savez(path, weights=self.head_weights, bias=self.head_bias, labels=np.array(self.label_names))
+
+    def load_head(self, path: str) -> None:
+        data = np.load(path)
+        if list(data['labels']) != self.label_names:
+            raise ValueError("Saved head was trained on a different label set")
+        self.head_weights, self.head_bias = data['weights'], data['bias']
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return shifted / shifted.sum(axis=1, keepdims=True)
+
+    def _scores(self, features: np.ndarray) -> np.ndarray:
+        if self.head_weights is not None:
+            return self._softmax(features @ self.head_weights + self.head_bias)
+        return self._softmax((features @ self.centroids.T) / self.temperature)
+
+    def classify_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Classify many texts with a single batched embedding pass."""
+        scores = self._scores(self.embedder.encode(texts))
+        method = "linear head" if self.head_weights is not None else "nearest centroid"
+        timestamp = datetime.now().isoformat()
+
+        results = []
+        for row in scores:
+            ranked = np.argsort(row)[::-1][:self.max_categories]
+            categories = [
+                {
+                    "name": self.label_names[i],
+                    "confidence": round(float(row[i]), 4),
+                    "explanation": f"{method} score {row[i]:.3f}"
+                }
+                for i in ranked if row[i] >= self.confidence_threshold
+            ]
+            dominant = categories[0]['name'] if categories else None
+            results.append({
+                "categories": categories,
+                "dominant_category": dominant,
+                "summary": f"Classified locally by {method}: {dominant or 'no category above threshold'}",
+                "timestamp": timestamp
+            })
+        return results
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        return self.classify_batch([text])[0]
+
+
+def build_classifier(settings: Dict[str, Any]) -> LocalTextClassifier:
+    """Build a classifier from the `analysis_settings.classification` section of config.yaml."""
+    embedder = SentenceEmbedder(
+        settings['embedding_model_path'],
+        batch_size=settings.get('batch_size', 32)
+    )
+    classifier = LocalTextClassifier(
+        embedder,
+        settings.get('labels', []),
+        confidence_threshold=settings.get('confidence_threshold', 0.5),
+        max_categories=settings.get('max_categories', 5)
+    )
+    if settings.get('head_path'):
+        classifier.load_head(settings['head_path'])
+    return classifier
+
+
+# Example usage
+if __name__ == "__main__":
+    classifier = build_classifier({
+        "embedding_model_path": "./models/all-MiniLM-L6-v2",
+        "labels": {
+            "earnings": ["Company reports quarterly earnings", "Profit beats analyst estimates"],
+            "layoffs": ["Company cuts jobs", "Workforce reduction announced"],
+            "supply chain": ["Chip shortage disrupts production", "Shipping delays hit inventory"]
+        },
+        "confidence_threshold": 0.2
+    })
+
+    headlines = [
+        "Tesla Reports Record Q4 Earnings, Beating Analyst Expectations",
+        "Meta Announces 10% Workforce Reduction Amid Cost-Cutting Measures",
+        "Apple Maintains Market Position Despite Industry-Wide Chip Shortage"
+    ]
+    for headline, result in zip(headlines, classifier.classify_batch(headlines)):
+        print(f"{headline}\n  -> {result['dominant_category']} {result['categories']}")
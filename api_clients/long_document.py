@@ -0,0 +1,97 @@
+import re
+from typing import Dict, Any, List, Tuple
+
+SENTIMENT_LABELS = ('positive', 'neutral', 'negative')
+
+WORD_PATTERN = re.compile(r'\S+')
+
+
+def split_into_windows(text: str, max_words: int = 350, overlap_words: int = 50) -> List[Tuple[int, int, str]]:
+    """
+    Split text into overlapping word windows for the LLM clients.
+
+    Returns:
+        list: (start_char, end_char, window_text) tuples covering the whole text.
+    """
+    if overlap_words >= max_words:
+        raise ValueError("overlap_words must be smaller than max_words")
+
+    words = [match.span() for match in WORD_PATTERN.finditer(text)]
+    if not words:
+        return []
+
+    windows = []
+    step = max_words - overlap_words
+    for start in range(0, len(words), step):
+        span = words[start:start + max_words]
+        start_char, end_char = span[0][0], span[-1][1]
+        windows.append((start_char, end_char, text[start_char:end_char]))
+        if start + max_words >= len(words):
+            break
+    return windows
+
+
+def chunk_weight(sentiment: Dict[str, float], length: int, pooling: str) -> float:
+    """Weight of one chunk: its length, or how decisive its prediction is."""
+    if pooling == 'length':
+        return float(length)
+    if pooling == 'confidence':
+        return max(float(sentiment.get(label, 0)) for label in SENTIMENT_LABELS) / 100.0
+    raise ValueError(f"Unknown pooling method: {pooling}")
+
+
+def pool_sentiments(chunks: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Weighted average of per-chunk percentage breakdowns."""
+    total = sum(chunk['weight'] for chunk in chunks)
+    if total == 0:
+        return {label: 0 for label in SENTIMENT_LABELS}
+    return {
+        label: round(sum(float(chunk['sentiment'].get(label, 0)) * chunk['weight'] for chunk in chunks) / total, 2)
+        for label in SENTIMENT_LABELS
+    }
+
+
+def summarize_chunks(chunks: List[Dict[str, Any]], pooling: str) -> Dict[str, Any]:
+    """Build the long-document result: pooled sentiment plus per-chunk scores for locating hot spots."""
+    scored = [chunk for chunk in chunks if 'error' not in chunk]
+    if not scored:
+        # Zeroed scores would pass for a real result downstream
+        return {
+            "error": f"All {len(chunks)} chunks failed: {chunks[0]['error']}" if chunks else "Document is empty",
+            "pooling": pooling,
+            "chunk_count": len(chunks),
+            "failed_chunks": len(chunks),
+            "chunks": chunks
+        }
+    result = {
+        "sentiment": pool_sentiments(scored),
+        "pooling": pooling,
+        "chunk_count": len(chunks),
+        "chunks": chunks
+    }
+    if len(scored) < len(chunks):
+        result['failed_chunks'] = len(chunks) - len(scored)
+    result['most_negative_chunk'] = max(scored, key=lambda c: c['sentiment'].get('negative', 0))['index']
+    result['most_positive_chunk'] = max(scored, key=lambda c: c['sentiment'].get('positive', 0))['index']
+    return result
+
+
+def analyze_long_document_remote(handler, api_name: str, text: str, pooling: str = 'length',
+                                 max_words: int = 350, overlap_words: int = 50,
+                                 priority: str = 'normal') -> Dict[str, Any]:
+    """Score each window through the handler's scheduler in parallel, then pool the results."""
+    windows = split_into_windows(text, max_words, overlap_words)
+    futures = [handler.submit(api_name, "Sentiment Analysis", window, priority) for _, _, window in windows]
+
+    chunks = []
+    for index, ((start_char, end_char, window), future) in enumerate(zip(windows, futures)):
+        response = future.result()
+        chunk = {"index": index, "start_char": start_char, "end_char": end_char}
+        if 'error' in response:
+            chunk['error'] = response['error']
+        else:
+            chunk['sentiment'] = response['sentiment']
+            chunk['weight'] = chunk_weight(response['sentiment'], len(window), pooling)
+        chunks.append(chunk)
+
+    return summarize_chunks(chunks, pooling)
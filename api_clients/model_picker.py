@@ -0,0 +1,206 @@
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from api_handler import (ClaudeClient, ChatGPTClient, SonarClient, xAIClient, DeBERTaClient, BaseAPIClient,
+                         SYSTEM_PROMPTS, USER_PROMPTS)
+from config_handler import ConfigHandler
+
+"""
+Pick the fastest model per task that meets an accuracy bar.
+
+Runs a labeled sample through candidate `Provider:model` pairs and reports latency, estimated cost
+and agreement with a reference, which is either a "label" field on each record or the results of a
+`--reference` candidate:
+
+    python model_picker.py --analysis sentiment --input sample.jsonl --min-agreement 0.9 \\
+        --candidates Claude:claude-3-haiku-20240307 Claude:claude-3-5-sonnet-20240620 ChatGPT:gpt-4o-mini DeBERTa:local
+
+The recommended model goes under `api_keys.<service>.tasks.<analysis>.model` in config.yaml.
+Costs are estimates from prompt and output length (about four characters per token).
+"""
+
+# Client class and config.yaml service for each provider
+PROVIDERS = {
+    "Claude": (ClaudeClient, "claude"),
+    "ChatGPT": (ChatGPTClient, "openai"),
+    "Sonar": (SonarClient, "sonar"),
+    "xAI": (xAIClient, "xai")
+}
+
+# USD per million (input, output) tokens; override or extend with --prices
+PRICES = {
+    "claude-3-haiku-20240307": (0.25, 1.25),
+    "claude-3-5-haiku-20241022": (0.80, 4.00),
+    "claude-3-5-sonnet-20240620": (3.00, 15.00),
+    "claude-3-sonnet-20240229": (3.00, 15.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "grok-2-latest": (2.00, 10.00),
+    "sonar": (1.00, 1.00),
+    "local": (0.0, 0.0)
+}
+
+CHARS_PER_TOKEN = 4
+
+
+def build_candidate(config: ConfigHandler, candidate: str, analysis: str) -> BaseAPIClient:
+    provider, _, model = candidate.partition(':')
+    if provider == "DeBERTa":
+        if analysis != "sentiment":
+            raise ValueError("DeBERTa only supports sentiment")
+        return DeBERTaClient()
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider: {provider}")
+
+    client_class, service = PROVIDERS[provider]
+    settings = config.get_task_settings(service, analysis)
+    if model:
+        settings['model'] = model
+    task_settings = {analysis: settings}
+    if client_class in (SonarClient, xAIClient):
+        return client_class(config.get_api_key(service), config.get_base_url(service), task_settings=task_settings)
+    return client_class(config.get_api_key(service), task_settings=task_settings)
+
+
+def run_analysis(client: BaseAPIClient, analysis: str, text: str) -> Dict[str, Any]:
+    return getattr(client, f"analyze_{analysis}")(text)
+
+
+def label_of(result: Dict[str, Any], analysis: str) -> Any:
+    """Reduce a result to what agreement is measured on."""
+    if analysis == "sentiment":
+        scores = result.get('sentiment') or {}
+        return max(scores, key=scores.get) if scores else None
+    if analysis == "classification":
+        dominant = result.get('dominant_category')
+        if not dominant and result.get('categories'):
+            dominant = max(result['categories'], key=lambda category: category.get('confidence', 0))['name']
+        return dominant.lower() if dominant else None
+    return {(entity.get('text', '').lower(), entity.get('category')) for entity in result.get('entities', [])}
+
+
+def agreement(candidate: Any, reference: Any, analysis: str) -> float:
+    if analysis != "ner":
+        return float(candidate is not None and candidate == reference)
+    # Entity-level F1; two empty sets agree
+    if not candidate and not reference:
+        return 1.0
+    overlap = len(candidate & reference)
+    return 2 * overlap / (len(candidate) + len(reference))
+
+
+def reference_label(record: Dict[str, Any], analysis: str) -> Any:
+    label = record['label']
+    if analysis == "ner":
+        return {(entity['text'].lower(), entity['category']) for entity in label}
+    return label.lower()
+
+
+def estimate_cost(model: str, analysis: str, text: str, result: Dict[str, Any],
+                  prices: Dict[str, Tuple[float, float]]) -> Optional[float]:
+    if model not in prices:
+        return None
+    input_price, output_price = prices[model]
+    input_tokens = (len(SYSTEM_PROMPTS[analysis]) + len(USER_PROMPTS[analysis].format(text=text))) / CHARS_PER_TOKEN
+    output_tokens = len(json.dumps(result)) / CHARS_PER_TOKEN
+    return (input_tokens * input_price + output_tokens * output_price) / 1e6
+
+
+def evaluate(client: BaseAPIClient, analysis: str, texts: List[str], concurrency: int) -> List[Tuple[float, Dict]]:
+    def timed(text: str):
+        start = time.perf_counter()
+        result = run_analysis(client, analysis, text)
+        return time.perf_counter() - start, result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(timed, texts))
+
+
+def summarize(candidate: str, model: str, analysis: str, texts: List[str], runs: List[Tuple[float, Dict]],
+              references: List[Any], prices: Dict[str, Tuple[float, float]]) -> Dict[str, Any]:
+    latencies = sorted(latency for latency, _ in runs)
+    errors = sum(1 for _, result in runs if 'error' in result)
+    scores = [agreement(label_of(result, analysis), reference, analysis) if 'error' not in result else 0.0
+              for (_, result), reference in zip(runs, references)]
+    costs = [estimate_cost(model, analysis, text, result, prices) for text, (_, result) in zip(texts, runs)]
+    return {
+        "candidate": candidate,
+        "requests": len(runs),
+        "errors": errors,
+        "p50_latency": latencies[len(latencies) // 2],
+        "p95_latency": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        "cost_per_1k": None if None in costs else round(1000 * sum(costs) / len(costs), 4),
+        "agreement": round(sum(scores) / len(scores), 4)
+    }
+
+
+def recommend(reports: List[Dict[str, Any]], min_agreement: float) -> Optional[Dict[str, Any]]:
+    """Fastest candidate meeting the bar, cheaper first on ties."""
+    eligible = [report for report in reports if report['agreement'] >= min_agreement]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda report: (report['p50_latency'], report['cost_per_1k'] or 0.0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare models per task on latency, cost and agreement")
+    parser.add_argument("--analysis", choices=list(SYSTEM_PROMPTS), required=True)
+    parser.add_argument("--input", required=True, help="JSONL sample with 'text' and optionally 'label'")
+    parser.add_argument("--candidates", nargs="+", required=True, help="Provider:model pairs")
+    parser.add_argument("--reference", help="Provider:model whose results stand in for missing labels")
+    parser.add_argument("--min-agreement", type=float, default=0.9)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--prices", help="JSON file of {model: [input, output]} USD per million tokens")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    config = ConfigHandler()
+    prices = dict(PRICES)
+    if args.prices:
+        with open(args.prices, 'r') as file:
+            prices.update({model: tuple(price) for model, price in json.load(file).items()})
+
+    with open(args.input, 'r') as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    texts = [record['text'] for record in records]
+
+    if all('label' in record for record in records):
+        references = [reference_label(record, args.analysis) for record in records]
+    elif args.reference:
+        reference_runs = evaluate(build_candidate(config, args.reference, args.analysis), args.analysis, texts,
+                                  args.concurrency)
+        references = [label_of(result, args.analysis) for _, result in reference_runs]
+    else:
+        parser.error("Records need a 'label' field, or pass --reference")
+
+    reports = []
+    for candidate in args.candidates:
+        client = build_candidate(config, candidate, args.analysis)
+        model = "local" if isinstance(client, DeBERTaClient) else client.settings_for(args.analysis)['model']
+        runs = evaluate(client, args.analysis, texts, args.concurrency)
+        reports.append(summarize(candidate, model, args.analysis, texts, runs, references, prices))
+
+    print(f"{'candidate':45} {'p50 s':>7} {'p95 s':>7} {'$/1k':>8} {'agree':>6} {'errors':>6}")
+    for report in reports:
+        cost = f"{report['cost_per_1k']:.4f}" if report['cost_per_1k'] is not None else "?"
+        print(f"{report['candidate']:45} {report['p50_latency']:7.2f} {report['p95_latency']:7.2f} "
+              f"{cost:>8} {report['agreement']:6.2f} {report['errors']:6d}")
+
+    best = recommend(reports, args.min_agreement)
+    if best:
+        print(f"\nFastest model with agreement >= {args.min_agreement}: {best['candidate']}")
+    else:
+        print(f"\nNo candidate reached agreement {args.min_agreement}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({"analysis": args.analysis, "reports": reports,
+                       "recommended": best['candidate'] if best else None}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
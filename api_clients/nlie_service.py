@@ -0,0 +1,311 @@
+import json
+import time
+import signal
+import asyncio
+import argparse
+from typing import Dict, Any, List, Optional, Tuple
+
+from api_handler import APIHandler
+from request_scheduler import PRIORITIES
+
+"""
+Headless HTTP service exposing APIHandler to other services.
+
+Endpoints:
+    POST /v1/sentiment, /v1/ner, /v1/classification
+        {"api": "Claude", "text": "..."}            -> single result
+        {"api": "Claude", "texts": ["...", "..."]}  -> {"results": [...]}
+        Optional "priority": "interactive" | "normal" | "bulk" (default "normal").
+        Providers with a native async client (ChatGPT, Sonar, xAI) are awaited on the service's event
+        loop through the async transport; the rest go through the threaded scheduler at `priority`.
+    GET /health   -> liveness and in-flight count
+    GET /metrics  -> request counters, micro-batch stats, scheduler queue metrics and parse failure rates
+"""
+
+ENDPOINTS = {
+    "/v1/sentiment": "Sentiment Analysis",
+    "/v1/ner": "Named Entity Recognition",
+    "/v1/classification": "Text Classification"
+}
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class RequestError(Exception):
+    """A request that cannot be read; answered with `status` and the connection closed."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    def __init__(self, client, window_ms: float = 10.0, max_batch: int = 32):
+        """
+        Coalesce concurrent DeBERTa requests into one forward pass.
+
+        The first queued text opens a window of `window_ms`; everything arriving before it closes (up to
+        `max_batch` texts) is scored together on a worker thread.
+        """
+        self.client = client
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def submit(self, text: str) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                results = await asyncio.to_thread(self.client.analyze_sentiment_batch, texts)
+            except Exception as e:
+                results = [{"error": f"Analysis failed: {str(e)}"}] * len(batch)
+
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queued": self.queue.qsize()
+        }
+
+
+class NLIEService:
+    def __init__(self, handler: APIHandler, host: str = "127.0.0.1", port: int = 8080,
+                 batch_window_ms: float = 10.0, max_batch: int = 32, drain_timeout: float = 30.0):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.batch_window_ms = batch_window_ms
+        self.max_batch = max_batch
+        self.drain_timeout = drain_timeout
+
+        self.batcher: Optional[MicroBatcher] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.shutting_down = False
+        self.in_flight = 0
+        self.idle = asyncio.Event()
+        self.started_at = time.time()
+        self.request_counts: Dict[str, int] = {}
+        self.error_count = 0
+
+    async def _analyze_one(self, api_name: str, analysis_type: str, text: str, priority: str) -> Dict[str, Any]:
+        if api_name == 'DeBERTa' and analysis_type == "Sentiment Analysis":
+            return await self.batcher.submit(text)
+        client = self.handler.clients.get(api_name)
+        if client is not None and client.native_async:
+            return await self.handler.aanalyze(api_name, analysis_type, text)
+        future = self.handler.submit(api_name, analysis_type, text, priority)
+        return await asyncio.wrap_future(future)
+
+    async def _handle_analysis(self, analysis_type: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        api_name = body.get('api')
+        priority = body.get('priority', 'normal')
+        if not api_name:
+            return 400, {"error": "Request body must include 'api'"}
+        if priority not in PRIORITIES:
+            return 400, {"error": f"'priority' must be one of {', '.join(PRIORITIES)}"}
+
+        if 'texts' in body:
+            texts = body['texts']
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                return 400, {"error": "'texts' must be a list of strings"}
+            results = await asyncio.gather(*(self._analyze_one(api_name, analysis_type, t, priority) for t in texts))
+            return 200, {"results": results}
+
+        if not isinstance(body.get('text'), str):
+            return 400, {"error": "Request body must include 'text' or 'texts'"}
+        return 200, await self._analyze_one(api_name, analysis_type, body['text'], priority)
+
+    def _metrics(self) -> Dict[str, Any]:
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "in_flight": self.in_flight,
+            "requests": self.request_counts,
+            "errors": self.error_count,
+            "micro_batching": self.batcher.stats(),
+            "scheduler": self.handler.scheduler.metrics(),
+            "providers": self.handler.health_report(),
+            "hedging": self.handler.hedging_report(),
+            "parsing": self.handler.parsing_report()
+        }
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        if path == "/health":
+            status = "draining" if self.shutting_down else "ok"
+            return (503 if self.shutting_down else 200), {"status": status, "in_flight": self.in_flight}
+        if path == "/metrics":
+            return 200, self._metrics()
+        if path not in ENDPOINTS:
+            return 404, {"error": f"Unknown endpoint: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST for analysis endpoints"}
+        if self.shutting_down:
+            return 503, {"error": "Service is shutting down"}
+
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"Invalid JSON body: {str(e)}"}
+        if not isinstance(payload, dict):
+            return 400, {"error": "Request body must be a JSON object"}
+
+        self.request_counts[path] = self.request_counts.get(path, 0) + 1
+        return await self._handle_analysis(ENDPOINTS[path], payload)
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        parts = request_line.decode('latin-1').split(' ', 2)
+        if len(parts) != 3:
+            raise RequestError(400, "Malformed request line")
+        method, path, _ = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise RequestError(400, "Invalid Content-Length")
+        if length < 0:
+            raise RequestError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise RequestError(413, "Payload too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split('?', 1)[0], headers, body
+
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any],
+                              keep_alive: bool) -> None:
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except RequestError as e:
+                    await self._write_response(writer, e.status, {"error": str(e)}, False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+
+                self.in_flight += 1
+                self.idle.clear()
+                try:
+                    status, payload = await self._route(method, path, body)
+                except Exception as e:
+                    self.error_count += 1
+                    status, payload = 500, {"error": f"Analysis failed: {str(e)}"}
+                finally:
+                    self.in_flight -= 1
+                    if self.in_flight == 0:
+                        self.idle.set()
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and not self.shutting_down
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        self.batcher = MicroBatcher(self.handler.clients['DeBERTa'], self.batch_window_ms, self.max_batch)
+        self.batcher.start()
+        self.idle.set()
+
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                # Signal handlers are unavailable on Windows event loops
+                pass
+
+        print(f"NLIE service listening on http://{self.host}:{self.port}")
+        async with self.server:
+            await stop.wait()
+            await self.shutdown()
+
+    async def shutdown(self) -> None:
+        """Stop accepting connections, drain in-flight requests, then release the handler."""
+        self.shutting_down = True
+        self.server.close()
+        try:
+            await asyncio.wait_for(self.idle.wait(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"Drain timed out with {self.in_flight} requests still in flight")
+        await self.batcher.stop()
+        self.handler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run APIHandler as a local HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--batch-window-ms", type=float, default=10.0,
+                        help="How long to wait for more DeBERTa requests before running a batch")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    service = NLIEService(APIHandler(), args.host, args.port, args.batch_window_ms,
+                          args.max_batch, args.drain_timeout)
+    asyncio.run(service.serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ProviderHealth:
+    def __init__(self, name: str, window_seconds: float = 60.0, failure_threshold: float = 0.5,
+                 min_requests: int = 10, open_seconds: float = 30.0, half_open_probes: int = 1):
+        """
+        Rolling error rate and latency for one provider, with a circuit breaker.
+
+        The breaker opens when at least `min_requests` calls in the last `window_seconds` failed at a
+        rate of `failure_threshold` or more. After `open_seconds` it lets `half_open_probes` calls
+        through; a successful probe closes it again, a failed one re-opens it.
+        """
+        self.name = name
+        self.window_seconds = window_seconds
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.samples = deque()  # (timestamp, ok, latency_seconds)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        while self.samples and self.samples[0][0] < now - self.window_seconds:
+            self.samples.popleft()
+
+    def is_open(self) -> bool:
+        """True while calls should fail fast, without consuming a half-open probe."""
+        with self.lock:
+            return self.state == OPEN and time.monotonic() < self.opened_at + self.open_seconds
+
+    def allow_request(self) -> bool:
+        """Decide whether a call may go out now. Every allowed call must be followed by record()."""
+        with self.lock:
+            if self.state == OPEN:
+                if time.monotonic() < self.opened_at + self.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self.probes_in_flight = 0
+
+            if self.state == HALF_OPEN:
+                if self.probes_in_flight >= self.half_open_probes:
+                    return False
+                self.probes_in_flight += 1
+            return True
+
+    def release_probe(self) -> None:
+        """Hand back an allowed call that was abandoned before it said anything about the provider."""
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def record(self, ok: bool, latency: float) -> None:
+        now = time.monotonic()
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+                if ok:
+                    self.state = CLOSED
+                    self.samples.clear()
+                else:
+                    self.state = OPEN
+                    self.opened_at = now
+
+            self.samples.append((now, ok, latency))
+            self._trim(now)
+
+            if self.state == CLOSED and len(self.samples) >= self.min_requests:
+                failures = sum(1 for _, sample_ok, _ in self.samples if not sample_ok)
+                if failures / len(self.samples) >= self.failure_threshold:
+                    self.state = OPEN
+                    self.opened_at = now
+
+    def route_key(self) -> Optional[tuple]:
+        """
+        Sort key for "Any" routing, lower is better, or None if the provider should not get routed traffic.
+
+        Closed circuits rank by p95 latency inflated by the error rate. One with no calls in the window
+        (never tried, or its data went stale) is scored optimistically at zero latency, so it gets tried
+        and can displace a provider that has become slow. Closed circuits whose calls have all failed,
+        open circuits past their cool-down and half-open ones with a free probe slot rank last, so they
+        only get traffic when nothing healthy is left.
+        """
+        now = time.monotonic()
+        with self.lock:
+            self._trim(now)
+            if self.state == OPEN:
+                return (1, 0.0) if now >= self.opened_at + self.open_seconds else None
+            if self.state == HALF_OPEN:
+                return (1, 0.0) if self.probes_in_flight < self.half_open_probes else None
+            if not self.samples:
+                return (0, 0.0)
+            latencies = sorted(latency for _, ok, latency in self.samples if ok)
+            if not latencies:
+                return (1, 0.0)
+            error_rate = 1 - len(latencies) / len(self.samples)
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            # Expected latency when failed calls have to be retried
+            return (0, p95 / (1 - error_rate))
+
+    def error_rate(self) -> float:
+        with self.lock:
+            self._trim(time.monotonic())
+            if not self.samples:
+                return 0.0
+            return sum(1 for _, ok, _ in self.samples if not ok) / len(self.samples)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency of successful calls in the window, or None without data."""
+        with self.lock:
+            self._trim(time.monotonic())
+            latencies = sorted(latency for _, ok, latency in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(percentile * len(latencies)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.latency_percentile(0.95)
+        return {
+            "state": self.state,
+            "requests_in_window": len(self.samples),
+            "error_rate": round(self.error_rate(), 4),
+            "p95_latency": round(p95, 3) if p95 is not None else None
+        }
+
+
+class HealthTracker:
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, explore_every: int = 20):
+        """
+        Per-provider health, created on first use with the `routing_settings.circuit_breaker` values.
+
+        Every `explore_every`-th routing decision goes to the healthy candidate with the fewest calls in
+        its window instead of the fastest, so every provider's latency estimate stays current (0 disables).
+        """
+        self.settings = settings or {}
+        self.explore_every = explore_every
+        self.decisions = 0
+        self.providers: Dict[str, ProviderHealth] = {}
+        self.lock = threading.Lock()
+
+    def get(self, name: str) -> ProviderHealth:
+        with self.lock:
+            if name not in self.providers:
+                self.providers[name] = ProviderHealth(name, **self.settings)
+            return self.providers[name]
+
+    def fastest(self, candidates: List[str]) -> Optional[str]:
+        """
+        Pick the healthy candidate with the lowest error-adjusted p95 latency.
+
+        Providers without recent data are tried first, failing and recovering circuits only get traffic
+        when nothing else is available (see ProviderHealth.route_key), and a share of decisions explores.
+        """
+        keys = {name: self.get(name).route_key() for name in candidates}
+        available = [name for name, key in keys.items() if key is not None]
+        if not available:
+            return None
+        with self.lock:
+            self.decisions += 1
+            explore = self.explore_every and self.decisions % self.explore_every == 0
+        healthy = [name for name in available if keys[name][0] == 0]
+        if explore and len(healthy) > 1:
+            return min(healthy, key=lambda name: len(self.providers[name].samples))
+        return min(available, key=keys.get)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            providers = dict(self.providers)
+        return {name: health.snapshot() for name, health in providers.items()}
@@ -0,0 +1,253 @@
+import os
+import json
+import gzip
+import time
+import base64
+import hashlib
+import asyncio
+import argparse
+import threading
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+"""
+Record/replay layer for provider HTTP traffic.
+
+In record mode every request/response pair that goes through the clients is captured, with its
+latency, into a gzip-compressed JSONL cassette. In replay mode responses are served from the cassette,
+either after the recorded latency or immediately, so the whole APIHandler stack can be profiled and
+regression-tested without network access or API spend.
+
+Identical requests are matched in the order they were recorded; once the recordings for a request are
+used up the last one is served again.
+"""
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+# Headers describing the wire encoding; replayed bodies are already decoded
+HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+class CassetteMiss(Exception):
+    pass
+
+
+def request_key(method: str, url: str, body: bytes) -> str:
+    return hashlib.sha256(method.upper().encode() + b" " + url.encode() + b"\n" + body).hexdigest()
+
+
+class Cassette:
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self.positions: Dict[str, int] = {}
+        self.new_entries = 0
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                for line in file:
+                    entry = json.loads(line)
+                    self.entries.setdefault(entry['key'], []).append(entry)
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self.lock:
+            self.entries.setdefault(entry['key'], []).append(entry)
+            self.new_entries += 1
+
+    def next(self, key: str) -> Dict[str, Any]:
+        with self.lock:
+            recordings = self.entries.get(key)
+            if not recordings:
+                raise CassetteMiss(f"No recorded response for request {key[:12]} in {self.path}")
+            position = self.positions.get(key, 0)
+            self.positions[key] = position + 1
+            return recordings[min(position, len(recordings) - 1)]
+
+    def save(self) -> None:
+        with self.lock:
+            if not self.new_entries:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_path = self.path + ".tmp"
+            with gzip.open(temp_path, 'wt', encoding='utf-8') as file:
+                for recordings in self.entries.values():
+                    for entry in recordings:
+                        file.write(json.dumps(entry) + "\n")
+            os.replace(temp_path, self.path)
+            self.new_entries = 0
+
+    def stats(self) -> Dict[str, Any]:
+        recordings = [entry for entries in self.entries.values() for entry in entries]
+        latencies = sorted(entry['elapsed'] for entry in recordings)
+        return {
+            "requests": len(recordings),
+            "unique_requests": len(self.entries),
+            "hosts": sorted({httpx.URL(entry['url']).host for entry in recordings}),
+            "median_latency": latencies[len(latencies) // 2] if latencies else None
+        }
+
+
+class TrafficRecorder:
+    def __init__(self, cassette_path: str, mode: str = REPLAY, latency: str = 'recorded'):
+        """
+        Shared record/replay state handed to every client's transport.
+
+        Parameters:
+            cassette_path (str): Path of the .jsonl.gz cassette.
+            mode (str): 'record' to capture live traffic, 'replay' to serve it from the cassette.
+            latency (str): On replay, 'recorded' to wait the recorded time or 'fast' to answer at once.
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if latency not in ('recorded', 'fast'):
+            raise ValueError(f"Unknown replay latency: {latency}")
+        self.mode = mode
+        self.latency = latency
+        self.cassette = Cassette(cassette_path)
+
+    def capture(self, method: str, url: str, body: bytes, status: int, headers: Dict[str, str],
+                content: bytes, elapsed: float) -> None:
+        try:
+            stored, encoding = content.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            stored, encoding = base64.b64encode(content).decode('ascii'), 'base64'
+        self.cassette.add({
+            "key": request_key(method, url, body),
+            "method": method,
+            "url": url,
+            "request_body": body.decode('utf-8', errors='replace'),
+            "status": status,
+            "headers": {name: value for name, value in headers.items() if name.lower() not in HOP_HEADERS},
+            "body": stored,
+            "body_encoding": encoding,
+            "elapsed": elapsed,
+            "recorded_at": time.time()
+        })
+
+    def lookup(self, method: str, url: str, body: bytes) -> Dict[str, Any]:
+        return self.cassette.next(request_key(method, url, body))
+
+    @staticmethod
+    def body_of(entry: Dict[str, Any]) -> bytes:
+        if entry.get('body_encoding') == 'base64':
+            return base64.b64decode(entry['body'])
+        return entry['body'].encode('utf-8')
+
+    def replay_delay(self, entry: Dict[str, Any]) -> float:
+        return entry['elapsed'] if self.latency == 'recorded' else 0.0
+
+    def save(self) -> None:
+        if self.mode == RECORD:
+            self.cassette.save()
+
+    # Factories for the client libraries in use
+    def httpx_client(self, **kwargs) -> httpx.Client:
+        return httpx.Client(transport=RecordReplayTransport(self), **kwargs)
+
+    def async_transport(self, http2: bool = True) -> "AsyncRecordReplayTransport":
+        return AsyncRecordReplayTransport(self, http2=http2)
+
+
+class RecordReplayTransport(httpx.BaseTransport):
+    def __init__(self, recorder: TrafficRecorder, inner: Optional[httpx.BaseTransport] = None):
+        self.recorder = recorder
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        url = str(request.url)
+        if self.recorder.mode == REPLAY:
+            entry = self.recorder.lookup(request.method, url, body)
+            time.sleep(self.recorder.replay_delay(entry))
+            return httpx.Response(entry['status'], headers=entry['headers'],
+                                  content=self.recorder.body_of(entry), request=request)
+
+        start = time.monotonic()
+        response = self.inner.handle_request(request)
+        content = response.read()
+        elapsed = time.monotonic() - start
+        self.recorder.capture(request.method, url, body, response.status_code, dict(response.headers),
+                              content, elapsed)
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS}
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class AsyncRecordReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, recorder: TrafficRecorder, inner: Optional[httpx.AsyncBaseTransport] = None,
+                 http2: bool = True):
+        self.recorder = recorder
+        self.inner = inner or httpx.AsyncHTTPTransport(http2=http2)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        url = str(request.url)
+        if self.recorder.mode == REPLAY:
+            entry = self.recorder.lookup(request.method, url, body)
+            await asyncio.sleep(self.recorder.replay_delay(entry))
+            return httpx.Response(entry['status'], headers=entry['headers'],
+                                  content=self.recorder.body_of(entry), request=request)
+
+        start = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        elapsed = time.monotonic() - start
+        self.recorder.capture(request.method, url, body, response.status_code, dict(response.headers),
+                              content, elapsed)
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS}
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def build_recorder(settings: Dict[str, Any]) -> Optional[TrafficRecorder]:
+    """Build a recorder from the `replay_settings` section of config.yaml, or None when disabled."""
+    mode = settings.get('mode')
+    if not mode or mode == 'off':
+        return None
+    return TrafficRecorder(settings.get('cassette', './cassettes/traffic.jsonl.gz'), mode,
+                           settings.get('latency', 'recorded'))
+
+
+def benchmark(cassette: str, input_path: str, api_name: str, analysis_type: str, latency: str) -> None:
+    """Replay a recorded run through the full APIHandler stack and report throughput."""
+    from api_handler import APIHandler
+
+    with open(input_path, 'r') as file:
+        texts = [json.loads(line)['text'] for line in file if line.strip()]
+
+    handler = APIHandler(replay_settings={"mode": REPLAY, "cassette": cassette, "latency": latency})
+    start = time.perf_counter()
+    futures = [handler.submit(api_name, analysis_type, text, 'bulk') for text in texts]
+    results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    handler.close()
+
+    errors = sum(1 for result in results if 'error' in result)
+    print(f"{len(texts)} requests in {elapsed:.2f}s ({len(texts) / elapsed:.1f}/s), {errors} errors")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect cassettes or benchmark against a replay")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = subparsers.add_parser("stats")
+    stats_parser.add_argument("cassette")
+
+    benchmark_parser = subparsers.add_parser("benchmark")
+    benchmark_parser.add_argument("cassette")
+    benchmark_parser.add_argument("--input", required=True, help="JSONL file of records with a 'text' field")
+    benchmark_parser.add_argument("--api", default="Claude")
+    benchmark_parser.add_argument("--analysis", default="Sentiment Analysis")
+    benchmark_parser.add_argument("--latency", choices=["recorded", "fast"], default="fast")
+
+    args = parser.parse_args()
+    if args.command == "stats":
+        print(json.dumps(Cassette(args.cassette).stats(), indent=2))
+    else:
+        benchmark(args.cassette, args.input, args.api, args.analysis, args.latency)
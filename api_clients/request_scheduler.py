@@ -0,0 +1,196 @@
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional
+
+# Highest priority first
+PRIORITIES = ('interactive', 'normal', 'bulk')
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class ScheduledRequest:
+    def __init__(self, fn: Callable[[], Any], priority: str, deadline: Optional[float]):
+        self.fn = fn
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+        self.future: Future = Future()
+        self.expired = False
+
+
+class ProviderQueue:
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queues = {priority: deque() for priority in PRIORITIES}
+        self.recent_waits = {priority: deque(maxlen=1000) for priority in PRIORITIES}
+        self.dispatched = {priority: 0 for priority in PRIORITIES}
+        self.dropped = {priority: 0 for priority in PRIORITIES}
+        self.in_flight = 0
+        # (deadline, sequence, request) for queued requests with a timeout, soonest first
+        self.deadlines = []
+        # Dispatches since aged lower-priority work was last let through
+        self.since_aged = 0
+
+
+class RequestScheduler:
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None, default_concurrency: int = 4,
+                 max_wait: Optional[Dict[str, float]] = None, aged_every: int = 5):
+        """
+        Share provider capacity between interactive, normal and bulk work.
+
+        Each provider gets its own queues and worker threads, so a backlog on one provider never
+        delays another. Within a provider the highest-priority non-empty queue is served first. A
+        request that has waited longer than its class's `max_wait` may jump ahead, but only once every
+        `aged_every` dispatches, so bulk work keeps moving under sustained interactive load without
+        ever taking most of the capacity from interactive calls.
+
+        Parameters:
+            concurrency (dict): Maximum in-flight requests per provider.
+            default_concurrency (int): Limit for providers missing from `concurrency`.
+            max_wait (dict): Seconds after which a queued request of that priority counts as aged.
+            aged_every (int): At most one aged request is promoted per this many dispatches.
+        """
+        self.concurrency = concurrency or {}
+        self.default_concurrency = default_concurrency
+        self.max_wait = {'normal': 10.0, 'bulk': 30.0}
+        self.max_wait.update(max_wait or {})
+        self.aged_every = max(1, aged_every)
+        self.sequence = itertools.count()
+
+        self.providers: Dict[str, ProviderQueue] = {}
+        self.condition = threading.Condition()
+        self.running = True
+
+    def _provider(self, name: str) -> ProviderQueue:
+        provider = self.providers.get(name)
+        if provider is None:
+            provider = ProviderQueue(name, self.concurrency.get(name, self.default_concurrency))
+            self.providers[name] = provider
+            for index in range(provider.concurrency):
+                threading.Thread(target=self._worker, args=(provider,),
+                                 name=f"scheduler-{name}-{index}", daemon=True).start()
+        return provider
+
+    def submit(self, provider_name: str, fn: Callable[[], Any], priority: str = 'normal',
+               timeout: Optional[float] = None) -> Future:
+        """
+        Queue `fn` to run against a provider's capacity.
+
+        Parameters:
+            provider_name (str): Provider whose concurrency slots the call uses.
+            fn (callable): Zero-argument function performing the request.
+            priority (str): One of 'interactive', 'normal' or 'bulk'.
+            timeout (float): Seconds after which the request is dropped if it has not started.
+
+        Returns:
+            Future: Resolves to the return value of `fn`. Cancelling it drops the queued request.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        request = ScheduledRequest(fn, priority, deadline)
+        with self.condition:
+            if not self.running:
+                raise RuntimeError("Scheduler has been shut down")
+            provider = self._provider(provider_name)
+            provider.queues[priority].append(request)
+            if deadline is not None:
+                heapq.heappush(provider.deadlines, (deadline, next(self.sequence), request))
+            self.condition.notify_all()
+        return request.future
+
+    @staticmethod
+    def _head(provider: ProviderQueue, priority: str) -> Optional[ScheduledRequest]:
+        """First live request of a class; expired and cancelled ones are discarded on the way."""
+        queue = provider.queues[priority]
+        while queue:
+            request = queue[0]
+            if not request.expired and not request.future.cancelled():
+                return request
+            queue.popleft()
+            if not request.expired:
+                provider.dropped[priority] += 1
+        return None
+
+    def _next_request(self, provider: ProviderQueue) -> Optional[ScheduledRequest]:
+        """Pick the next runnable request. Must be called with the condition held."""
+        now = time.monotonic()
+
+        # Fail requests whose deadline has passed; they are skipped when they reach the head of their queue
+        while provider.deadlines and provider.deadlines[0][0] < now:
+            _, _, request = heapq.heappop(provider.deadlines)
+            if request.future.done() or request.future.running():
+                continue
+            request.expired = True
+            provider.dropped[request.priority] += 1
+            if request.future.set_running_or_notify_cancel():
+                request.future.set_exception(DeadlineExceeded("Request expired before it was dispatched"))
+
+        heads = {priority: self._head(provider, priority) for priority in PRIORITIES}
+        highest = next((priority for priority in PRIORITIES if heads[priority]), None)
+        if highest is None:
+            return None
+
+        # Aged lower-priority work gets a bounded share so it cannot starve, nor starve interactive calls
+        if provider.since_aged >= self.aged_every - 1:
+            for priority in PRIORITIES[PRIORITIES.index(highest) + 1:]:
+                if heads[priority] and now - heads[priority].enqueued_at > self.max_wait[priority]:
+                    provider.since_aged = 0
+                    return provider.queues[priority].popleft()
+        provider.since_aged += 1
+        return provider.queues[highest].popleft()
+
+    def _worker(self, provider: ProviderQueue) -> None:
+        while True:
+            with self.condition:
+                request = self._next_request(provider)
+                while request is None:
+                    if not self.running:
+                        return
+                    self.condition.wait(timeout=1.0)
+                    request = self._next_request(provider)
+
+                provider.in_flight += 1
+                provider.dispatched[request.priority] += 1
+                provider.recent_waits[request.priority].append(time.monotonic() - request.enqueued_at)
+
+            if request.future.set_running_or_notify_cancel():
+                try:
+                    request.future.set_result(request.fn())
+                except Exception as e:
+                    request.future.set_exception(e)
+
+            with self.condition:
+                provider.in_flight -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, dispatch/drop counts and wait times per provider and priority."""
+        with self.condition:
+            report = {}
+            for name, provider in self.providers.items():
+                classes = {}
+                for priority in PRIORITIES:
+                    waits = sorted(provider.recent_waits[priority])
+                    classes[priority] = {
+                        "queue_depth": len(provider.queues[priority]),
+                        "dispatched": provider.dispatched[priority],
+                        "dropped": provider.dropped[priority],
+                        "mean_wait": sum(waits) / len(waits) if waits else 0.0,
+                        "p95_wait": waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0
+                    }
+                report[name] = {"in_flight": provider.in_flight, "priorities": classes}
+            return report
+
+    def shutdown(self) -> None:
+        """Stop accepting work; workers exit once their queues are empty."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
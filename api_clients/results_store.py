@@ -0,0 +1,272 @@
+import os
+import re
+import json
+import sqlite3
+import argparse
+import threading
+from functools import partial
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from corpus_reader import iter_chunks
+
+"""
+Disk-backed store of analysis results for browsing large runs.
+
+Results live in a SQLite table with one row per analyzed text plus a few summary columns (label and
+score) that can be sorted and filtered without decoding the stored JSON. Readers ask for one page at
+a time, with sorting and filtering done by SQLite on indexed columns and text search done through an
+FTS5 index, so the GUI only ever holds the rows it is showing.
+
+Output from work_queue.py, feed_ingest.py, batch_jobs.py and the GUI can be imported:
+
+    python results_store.py --db results/results.db import /shared/results/shard-*/*.jsonl
+    python results_store.py --db results/results.db stats
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    api TEXT,
+    analysis_type TEXT,
+    input_text TEXT NOT NULL,
+    label TEXT,
+    score REAL,
+    results TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at);
+CREATE INDEX IF NOT EXISTS results_api ON results (api);
+CREATE INDEX IF NOT EXISTS results_analysis_type ON results (analysis_type);
+CREATE INDEX IF NOT EXISTS results_input_text ON results (input_text);
+CREATE INDEX IF NOT EXISTS results_label ON results (label);
+CREATE INDEX IF NOT EXISTS results_score ON results (score);
+CREATE VIRTUAL TABLE IF NOT EXISTS results_text USING fts5 (input_text, content='results', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS results_text_insert AFTER INSERT ON results BEGIN
+    INSERT INTO results_text (rowid, input_text) VALUES (new.id, new.input_text);
+END;
+CREATE TRIGGER IF NOT EXISTS results_text_delete AFTER DELETE ON results BEGIN
+    INSERT INTO results_text (results_text, rowid, input_text) VALUES ('delete', old.id, old.input_text);
+END;
+"""
+
+# Columns a page can be sorted by; the table shows these plus the row id
+SORTABLE_COLUMNS = ("id", "created_at", "api", "analysis_type", "input_text", "label", "score")
+# Columns that take an exact-match filter
+FILTER_COLUMNS = ("api", "analysis_type", "label")
+
+MAX_LABEL_ENTITIES = 5
+
+
+def summarize(results: Dict[str, Any]) -> Tuple[Optional[str], Optional[float]]:
+    """Reduce a result of any analysis type to a (label, score) pair for sorting and filtering."""
+    if not isinstance(results, dict):
+        return None, None
+    if 'error' in results:
+        return "error", None
+    if results.get('sentiment'):
+        scores = results['sentiment']
+        label = max(scores, key=scores.get)
+        return label, float(scores[label])
+    if results.get('dominant_category') or results.get('categories'):
+        categories = results.get('categories') or []
+        best = max(categories, key=lambda category: category.get('confidence', 0)) if categories else {}
+        label = results.get('dominant_category') or best.get('name')
+        confidence = next((category.get('confidence') for category in categories if category.get('name') == label),
+                          best.get('confidence'))
+        return label, float(confidence) if confidence is not None else None
+    if 'entities' in results:
+        names = [entity.get('text', '') for entity in results['entities'][:MAX_LABEL_ENTITIES]]
+        return ", ".join(name for name in names if name) or "none", float(len(results['entities']))
+    return None, None
+
+
+def result_row(record: Dict[str, Any], created_at: str) -> tuple:
+    """The `results` table row for one result record."""
+    results = record.get('results', {})
+    label, score = summarize(results)
+    text = record.get('input_text') or record.get('text') or record.get('title') or record.get('id') or ""
+    return (record.get('created_at') or record.get('fetched_at') or created_at, record.get('api'),
+            record.get('analysis_type'), text, label, score, json.dumps(results))
+
+
+def result_rows(records: List[Dict[str, Any]], created_at: str) -> List[tuple]:
+    # Runs in the corpus_reader workers, so only flat row tuples are sent back to the importing process
+    return [result_row(record, created_at) for record in records]
+
+
+def _match_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class ResultsStore:
+    def __init__(self, path: str, page_size: int = 200, cached_pages: int = 32):
+        """
+        Open (or create) a results database.
+
+        Parameters:
+            path (str): SQLite file.
+            page_size (int): Rows fetched per query by `rows()`.
+            cached_pages (int): Pages kept in memory so scrolling back and forth does not re-query.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.pages: "OrderedDict[tuple, List[tuple]]" = OrderedDict()
+        self.counts: Dict[tuple, int] = {}
+
+    def _invalidate(self) -> None:
+        self.pages.clear()
+        self.counts.clear()
+
+    def add(self, api: str, analysis_type: str, input_text: str, results: Dict[str, Any]) -> int:
+        """Store a single result and return its row id."""
+        row = result_row({"api": api, "analysis_type": analysis_type, "input_text": input_text, "results": results},
+                        datetime.now().isoformat())
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO results (created_at, api, analysis_type, input_text, label, score, results) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            self._invalidate()
+        return cursor.lastrowid
+
+    def add_many(self, records: List[Dict[str, Any]]) -> int:
+        """Store result records as written by work_queue.py, feed_ingest.py or batch_jobs.py."""
+        return self._insert(result_rows(records, datetime.now().isoformat()))
+
+    def _insert(self, rows: List[tuple]) -> int:
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO results (created_at, api, analysis_type, input_text, label, score, results) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._invalidate()
+        return len(rows)
+
+    def import_jsonl(self, path: str, workers: int = None) -> int:
+        """Import a JSONL results file, parsing it in parallel chunks."""
+        imported = 0
+        rows = partial(result_rows, created_at=datetime.now().isoformat())
+        for chunk in iter_chunks(path, workers, chunk_bytes=4 * 1024 * 1024, transform=rows):
+            imported += self._insert(chunk)
+        return imported
+
+    @staticmethod
+    def _where(filters: Optional[Dict[str, Any]]) -> Tuple[str, list]:
+        clauses, params = [], []
+        for column, value in (filters or {}).items():
+            if value in (None, ""):
+                continue
+            if column == "text":
+                query = _match_query(value)
+                if query:
+                    clauses.append("id IN (SELECT rowid FROM results_text WHERE results_text MATCH ?)")
+                    params.append(query)
+            elif column in FILTER_COLUMNS:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+            else:
+                raise ValueError(f"Unsupported filter: {column}")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    @staticmethod
+    def _key(filters: Optional[Dict[str, Any]]) -> tuple:
+        return tuple(sorted((column, value) for column, value in (filters or {}).items() if value not in (None, "")))
+
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        key = self._key(filters)
+        with self.lock:
+            if key not in self.counts:
+                where, params = self._where(filters)
+                self.counts[key] = self.connection.execute(f"SELECT COUNT(*) FROM results{where}", params).fetchone()[0]
+            return self.counts[key]
+
+    def _page(self, index: int, sort: str, descending: bool, filters: Optional[Dict[str, Any]]) -> List[tuple]:
+        key = (index, sort, descending, self._key(filters))
+        with self.lock:
+            if key in self.pages:
+                self.pages.move_to_end(key)
+                return self.pages[key]
+            where, params = self._where(filters)
+            direction = "DESC" if descending else "ASC"
+            # id breaks ties so pages are stable when the sort column has duplicates
+            rows = self.connection.execute(
+                f"SELECT id, created_at, api, analysis_type, input_text, label, score FROM results{where} "
+                f"ORDER BY {sort} {direction}, id {direction} LIMIT ? OFFSET ?",
+                params + [self.page_size, index * self.page_size]).fetchall()
+            self.pages[key] = rows
+            if len(self.pages) > self.cached_pages:
+                self.pages.popitem(last=False)
+            return rows
+
+    def rows(self, offset: int, limit: int, sort: str = "id", descending: bool = True,
+             filters: Optional[Dict[str, Any]] = None) -> List[tuple]:
+        """
+        Return `limit` summary rows starting at `offset` of the sorted, filtered view.
+
+        Rows are (id, created_at, api, analysis_type, input_text, label, score); use `get` for the full result.
+        """
+        if sort not in SORTABLE_COLUMNS:
+            raise ValueError(f"Unsupported sort column: {sort}")
+        rows = []
+        index = offset // self.page_size
+        skip = offset - index * self.page_size
+        while len(rows) < limit:
+            page = self._page(index, sort, descending, filters)
+            rows.extend(page[skip:skip + limit - len(rows)])
+            if len(page) < self.page_size:
+                break
+            index, skip = index + 1, 0
+        return rows
+
+    def get(self, row_id: int) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT id, created_at, api, analysis_type, input_text, results FROM results WHERE id = ?",
+                (row_id,)).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "created_at": row[1], "api": row[2], "analysis_type": row[3],
+                "input_text": row[4], "results": json.loads(row[5])}
+
+    def distinct(self, column: str) -> List[str]:
+        """Values of a filter column, for populating filter choices."""
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Unsupported filter: {column}")
+        with self.lock:
+            # Walks the column's index rather than the table
+            return [value for (value,) in self.connection.execute(
+                f"SELECT DISTINCT {column} FROM results WHERE {column} IS NOT NULL ORDER BY {column} LIMIT 1000")]
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import and inspect stored analysis results")
+    parser.add_argument("--db", default="./results/results.db")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Import JSONL result files")
+    import_parser.add_argument("paths", nargs="+")
+    subparsers.add_parser("stats", help="Show row counts per API and analysis type")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.db)
+    if args.command == "import":
+        for path in args.paths:
+            print(f"Imported {store.import_jsonl(path)} results from {path}")
+    else:
+        print(f"{store.count()} results in {args.db}")
+        for api, analysis_type, count in store.connection.execute(
+                "SELECT api, analysis_type, COUNT(*) FROM results GROUP BY api, analysis_type"):
+            print(f"  {api or '-':12} {analysis_type or '-':28} {count}")
+    store.close()
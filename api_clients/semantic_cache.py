@@ -0,0 +1,315 @@
+import os
+import copy
+import json
+import time
+import threading
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from sentence_embedder import SentenceEmbedder
+
+
+class SemanticCache:
+    def __init__(self, embedder: SentenceEmbedder, directory: str, capacity: int = 100000,
+                 thresholds: Optional[Dict[str, float]] = None, default_threshold: float = 0.95,
+                 flush_every: int = 100, block_size: int = 1024):
+        """
+        Cache analysis results by meaning rather than exact text.
+
+        Incoming texts are embedded and compared against a flat index of previously analysed texts.
+        The index lives in memory-mapped arrays inside `directory`, so it survives restarts and only
+        the pages that are touched get loaded. Slots are handed out to namespaces in contiguous blocks,
+        so a lookup multiplies only its own namespace's blocks, as views, against the query. When the
+        cache is full the namespace's least recently used entry is overwritten, or a new namespace
+        takes over the block that has gone unused longest.
+
+        Result metadata is kept as a snapshot (entries.json) plus an append-only log of the entries
+        changed since, which is folded back into the snapshot once it outgrows it.
+
+        Parameters:
+            embedder (SentenceEmbedder): Model used to embed texts.
+            directory (str): Directory holding the memory-mapped index files.
+            capacity (int): Maximum number of cached results.
+            thresholds (dict): Minimum cosine similarity per analysis type for a hit.
+            default_threshold (float): Similarity used for analysis types without a threshold.
+            flush_every (int): Number of stores between automatic flushes to disk.
+            block_size (int): Number of slots handed to a namespace at a time.
+        """
+        self.embedder = embedder
+        self.directory = directory
+        self.capacity = capacity
+        self.thresholds = thresholds or {}
+        self.default_threshold = default_threshold
+        self.flush_every = flush_every
+        self.block_size = block_size
+        self.pending_writes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.entries_path = os.path.join(directory, "entries.json")
+        self.log_path = os.path.join(directory, "entries.log")
+        dimension = embedder.dimension
+
+        # Fixed-size arrays; `namespaces` is -1 for empty slots
+        self.vectors = self._open_array("vectors.f32", np.float32, (capacity, dimension))
+        self.namespaces = self._open_array("namespaces.i32", np.int32, (capacity,), fill=-1)
+        self.last_used = self._open_array("last_used.f64", np.float64, (capacity,))
+
+        self.namespace_ids: Dict[str, int] = {}
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        # Slots changed since the last flush, and namespaces not yet written to the log
+        self.dirty: set = set()
+        self.new_namespaces: List[str] = []
+        self.log_lines = 0
+        self._load_entries()
+        self._drop_orphaned_slots()
+
+        # Block ownership; each namespace has its blocks and the empty slots within them
+        self.block_count = -(-capacity // block_size)
+        self.block_owners: List[Optional[int]] = [None] * self.block_count
+        self.blocks: Dict[int, List[int]] = {}
+        self.free_slots: Dict[int, List[int]] = {}
+        self.free_blocks: List[int] = []
+        self._index_blocks()
+
+    def _open_array(self, name: str, dtype, shape: tuple, fill: float = 0) -> np.memmap:
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            array = np.memmap(path, dtype=dtype, mode='r+')
+            if array.size != int(np.prod(shape)):
+                raise ValueError(f"Cache file {path} does not match capacity {self.capacity}")
+            return array.reshape(shape)
+
+        array = np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+        array[:] = fill
+        return array
+
+    def _load_entries(self) -> None:
+        if os.path.exists(self.entries_path):
+            with open(self.entries_path, 'r') as file:
+                saved = json.load(file)
+            self.namespace_ids = saved.get('namespaces', {})
+            self.entries = {int(slot): entry for slot, entry in saved.get('entries', {}).items()}
+        if not os.path.exists(self.log_path):
+            return
+
+        with open(self.log_path, 'r') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut off by an unclean exit; everything before it is intact
+                    break
+                self.log_lines += 1
+                if 'namespace' in record:
+                    self.namespace_ids[record['namespace']] = record['id']
+                elif record.get('removed'):
+                    self.entries.pop(record['slot'], None)
+                elif self.namespaces[record['slot']] == record['ns']:
+                    self.entries[record['slot']] = {"text": record['text'], "result": record['result']}
+                else:
+                    # The slot was taken by another namespace after this line was written
+                    self.entries.pop(record['slot'], None)
+
+    def _drop_orphaned_slots(self) -> None:
+        # The arrays reach disk before the metadata does; after an unclean exit, slots written since
+        # the last flush have no entry and their namespace ids may be reissued, so forget them
+        orphaned = np.flatnonzero(self.namespaces != -1)
+        orphaned = [slot for slot in orphaned if int(slot) not in self.entries]
+        if orphaned:
+            self.namespaces[orphaned] = -1
+            self.last_used[orphaned] = 0
+            self.namespaces.flush()
+        for slot in [slot for slot in self.entries if self.namespaces[slot] == -1]:
+            del self.entries[slot]
+
+    def _block_range(self, block: int) -> range:
+        return range(block * self.block_size, min((block + 1) * self.block_size, self.capacity))
+
+    def _index_blocks(self) -> None:
+        """Rebuild block ownership from the namespace array, once at startup."""
+        changed = False
+        for block in range(self.block_count):
+            slots = self._block_range(block)
+            owners = self.namespaces[slots.start:slots.stop]
+            used = owners[owners != -1]
+            if len(used) == 0:
+                self.free_blocks.append(block)
+                continue
+            # Caches written before slots were blocked may mix namespaces; the majority keeps the block
+            values, counts = np.unique(used, return_counts=True)
+            owner = int(values[np.argmax(counts)])
+            if len(values) > 1:
+                for slot in slots:
+                    if self.namespaces[slot] not in (-1, owner):
+                        self._clear_slot(slot)
+                changed = True
+            self.block_owners[block] = owner
+            self.blocks.setdefault(owner, []).append(block)
+            free = self.free_slots.setdefault(owner, [])
+            free.extend(slot for slot in reversed(slots) if self.namespaces[slot] == -1)
+        # Take free blocks from the front first
+        self.free_blocks.reverse()
+        if changed:
+            self.namespaces.flush()
+
+    def _clear_slot(self, slot: int) -> None:
+        self.namespaces[slot] = -1
+        self.last_used[slot] = 0
+        if self.entries.pop(slot, None) is not None:
+            self.dirty.add(slot)
+
+    def _namespace_id(self, namespace: str) -> int:
+        if namespace not in self.namespace_ids:
+            self.namespace_ids[namespace] = len(self.namespace_ids)
+            self.new_namespaces.append(namespace)
+        return self.namespace_ids[namespace]
+
+    def _block_last_used(self, block: int) -> float:
+        slots = self._block_range(block)
+        return float(self.last_used[slots.start:slots.stop].max())
+
+    def _take_block(self, namespace_id: int) -> None:
+        """Give the namespace a free block, or else the block whose entries have gone unused longest."""
+        if self.free_blocks:
+            block = self.free_blocks.pop()
+        else:
+            block = min(range(self.block_count), key=self._block_last_used)
+            previous = self.block_owners[block]
+            self.blocks[previous].remove(block)
+            slots = self._block_range(block)
+            self.free_slots[previous] = [slot for slot in self.free_slots[previous] if slot not in slots]
+            for slot in slots:
+                self._clear_slot(slot)
+
+        self.block_owners[block] = namespace_id
+        self.blocks.setdefault(namespace_id, []).append(block)
+        self.free_slots.setdefault(namespace_id, []).extend(reversed(self._block_range(block)))
+
+    def _slot_for(self, namespace_id: int) -> int:
+        free = self.free_slots.setdefault(namespace_id, [])
+        if not free and (self.free_blocks or not self.blocks.get(namespace_id)):
+            self._take_block(namespace_id)
+        if free:
+            return free.pop()
+
+        # The namespace's blocks are full and no block is free: overwrite its least recently used entry
+        oldest, oldest_time = None, None
+        for block in self.blocks[namespace_id]:
+            slots = self._block_range(block)
+            offset = int(np.argmin(self.last_used[slots.start:slots.stop]))
+            if oldest is None or self.last_used[slots.start + offset] < oldest_time:
+                oldest, oldest_time = slots.start + offset, self.last_used[slots.start + offset]
+        return oldest
+
+    def lookup(self, namespace: str, analysis_type: str, text: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result for a sufficiently similar text, or None."""
+        query = self.embedder.encode_one(text)
+        threshold = self.thresholds.get(analysis_type, self.default_threshold)
+
+        with self.lock:
+            namespace_id = self.namespace_ids.get(namespace)
+            slot, similarity = None, -np.inf
+            for block in self.blocks.get(namespace_id, []):
+                slots = self._block_range(block)
+                # Slicing keeps these views of the memory map; no rows are copied
+                similarities = self.vectors[slots.start:slots.stop] @ query
+                similarities[self.namespaces[slots.start:slots.stop] != namespace_id] = -np.inf
+                best = int(np.argmax(similarities))
+                if similarities[best] > similarity:
+                    slot, similarity = slots.start + best, float(similarities[best])
+
+            entry = self.entries.get(slot) if similarity >= threshold else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.last_used[slot] = time.time()
+            self.hits += 1
+            result = copy.deepcopy(entry['result'])
+
+        result['cache'] = {
+            "type": "semantic",
+            "matched_text": entry['text'],
+            "similarity": round(similarity, 4)
+        }
+        return result
+
+    def store(self, namespace: str, text: str, result: Dict[str, Any]) -> None:
+        vector = self.embedder.encode_one(text)
+
+        with self.lock:
+            namespace_id = self._namespace_id(namespace)
+            slot = self._slot_for(namespace_id)
+
+            self.vectors[slot] = vector
+            self.namespaces[slot] = namespace_id
+            self.last_used[slot] = time.time()
+            self.entries[slot] = {"text": text, "result": copy.deepcopy(result)}
+            self.dirty.add(slot)
+            self.pending_writes += 1
+            should_flush = self.pending_writes >= self.flush_every
+
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the arrays to disk and append the entries changed since the last flush to the log."""
+        with self.lock:
+            self.vectors.flush()
+            self.namespaces.flush()
+            self.last_used.flush()
+
+            lines = [json.dumps({"namespace": namespace, "id": self.namespace_ids[namespace]})
+                     for namespace in self.new_namespaces]
+            for slot in sorted(self.dirty):
+                entry = self.entries.get(slot)
+                if entry is None:
+                    lines.append(json.dumps({"slot": slot, "removed": True}))
+                else:
+                    lines.append(json.dumps({"slot": slot, "ns": int(self.namespaces[slot]), **entry}))
+            if lines:
+                with open(self.log_path, 'a') as file:
+                    file.write("\n".join(lines) + "\n")
+                self.log_lines += len(lines)
+            self.dirty.clear()
+            self.new_namespaces = []
+            self.pending_writes = 0
+
+            if self.log_lines > max(len(self.entries), self.flush_every):
+                self._compact()
+
+    def _compact(self) -> None:
+        """Fold the log into a fresh snapshot."""
+        temp_path = self.entries_path + ".tmp"
+        with open(temp_path, 'w') as file:
+            json.dump({"namespaces": self.namespace_ids, "entries": self.entries}, file)
+        os.replace(temp_path, self.entries_path)
+        # A crash between the two steps replays log lines the snapshot already holds, which is harmless
+        os.remove(self.log_path)
+        self.log_lines = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+def build_semantic_cache(settings: Dict[str, Any]) -> SemanticCache:
+    """Build a cache from the `cache_settings.semantic` section of config.yaml."""
+    return SemanticCache(
+        SentenceEmbedder(settings['embedding_model_path']),
+        settings.get('directory', './cache/semantic'),
+        capacity=settings.get('capacity', 100000),
+        thresholds=settings.get('thresholds', {}),
+        default_threshold=settings.get('default_threshold', 0.95),
+        flush_every=settings.get('flush_every', 100),
+        block_size=settings.get('block_size', 1024)
+    )
@@ -0,0 +1,72 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModel
+
+"""
+Small sentence-embedding models (e.g. sentence-transformers/all-MiniLM-L6-v2) are loaded from a local
+directory so that no Hugging Face hub lookups happen at request time. Embeddings are mean-pooled over
+the attention mask and L2-normalised, so a dot product between two vectors is their cosine similarity.
+"""
+
+os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+
+
+class SentenceEmbedder:
+    def __init__(self, model_path: str, batch_size: int = 32, max_length: int = 128,
+                 device: Optional[str] = None):
+        """
+        Load a sentence-embedding model from disk.
+
+        Parameters:
+            model_path (str): Local directory containing the model and tokenizer files.
+            batch_size (int): Number of texts encoded per forward pass.
+            max_length (int): Maximum number of tokens kept per text.
+            device (str): Torch device, defaults to CUDA when available.
+        """
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"Embedding model directory not found: {model_path}")
+
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+        self.model = AutoModel.from_pretrained(model_path, local_files_only=True).to(self.device)
+        self.model.eval()
+
+    @property
+    def dimension(self) -> int:
+        return self.model.config.hidden_size
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a list of texts in batches.
+
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dimension) with unit-length rows.
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        batches = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), self.batch_size):
+                chunk = texts[start:start + self.batch_size]
+                inputs = self.tokenizer(chunk, padding=True, truncation=True,
+                                        max_length=self.max_length, return_tensors="pt").to(self.device)
+                hidden = self.model(**inputs).last_hidden_state
+
+                # Mean pooling over real tokens only
+                mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+                batches.append(pooled.cpu().numpy().astype(np.float32))
+
+        return np.vstack(batches)
+
+    def encode_one(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
@@ -0,0 +1,277 @@
+import json
+import threading
+from typing import Dict, Any, List, Optional
+
+from tracing import tracer
+
+"""
+Structured output helpers shared by the LLM clients.
+
+`RESPONSE_SCHEMAS` describes each analysis result as JSON Schema, for providers that can enforce it
+natively (OpenAI/xAI/Sonar `response_format`, Claude tool input schemas). For everything else,
+`extract_json` finds the result object in noisy model text: code fences, leading prose and trailing
+commentary are skipped instead of failing the call, and `JSONStreamExtractor` does the same
+incrementally for streamed output. `PARSE_METRICS` counts how often each provider needed repair
+or failed outright.
+"""
+
+RESPONSE_SCHEMAS = {
+    "sentiment": {
+        "type": "object",
+        "properties": {
+            "sentiment": {
+                "type": "object",
+                "properties": {
+                    "positive": {"type": "number"},
+                    "neutral": {"type": "number"},
+                    "negative": {"type": "number"}
+                },
+                "required": ["positive", "neutral", "negative"],
+                "additionalProperties": False
+            },
+            "explanation": {"type": "string"}
+        },
+        "required": ["sentiment", "explanation"],
+        "additionalProperties": False
+    },
+    "ner": {
+        "type": "object",
+        "properties": {
+            "entities": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "text": {"type": "string"},
+                        "category": {"type": "string",
+                                     "enum": ["PERSON", "ORGANIZATION", "LOCATION", "DATE", "MONEY", "MISC"]},
+                        "start": {"type": "integer"},
+                        "end": {"type": "integer"}
+                    },
+                    "required": ["text", "category", "start", "end"],
+                    "additionalProperties": False
+                }
+            },
+            "summary": {"type": "string"}
+        },
+        "required": ["entities", "summary"],
+        "additionalProperties": False
+    },
+    "classification": {
+        "type": "object",
+        "properties": {
+            "categories": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string"},
+                        "confidence": {"type": "number"},
+                        "explanation": {"type": "string"}
+                    },
+                    "required": ["name", "confidence", "explanation"],
+                    "additionalProperties": False
+                }
+            },
+            "dominant_category": {"type": "string"},
+            "summary": {"type": "string"}
+        },
+        "required": ["categories", "dominant_category", "summary"],
+        "additionalProperties": False
+    }
+}
+
+# Top-level keys a result must carry to be accepted; explanations and summaries are optional
+RESULT_KEYS = {
+    "sentiment": ("sentiment",),
+    "ner": ("entities",),
+    "classification": ("categories",)
+}
+
+_decoder = json.JSONDecoder()
+
+
+def openai_response_format(analysis: str) -> Dict[str, Any]:
+    """OpenAI-style strict `response_format` for `analysis`."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": f"{analysis}_result", "schema": RESPONSE_SCHEMAS[analysis], "strict": True}
+    }
+
+
+# OpenAI models that accept `json_schema` response formats (structured outputs)
+JSON_SCHEMA_MODELS = ("gpt-4o", "chatgpt-4o", "gpt-4.1", "gpt-4.5", "gpt-5", "o1", "o3", "o4")
+# Snapshots under those prefixes that predate structured outputs
+JSON_SCHEMA_EXCLUDED = ("gpt-4o-2024-05-13", "o1-mini", "o1-preview")
+# Older models that only have JSON mode
+JSON_OBJECT_MODELS = ("gpt-3.5-turbo", "gpt-4-turbo", "gpt-4-1106", "gpt-4-0125")
+
+
+def openai_response_format_for(model: str, analysis: str) -> Optional[Dict[str, Any]]:
+    """
+    Strictest `response_format` the OpenAI `model` supports: a json_schema, JSON mode, or None.
+
+    Unknown and older models get JSON mode or nothing rather than a request they would reject; the
+    extractor checks the result keys either way.
+    """
+    if model.startswith(JSON_SCHEMA_MODELS) and not model.startswith(JSON_SCHEMA_EXCLUDED):
+        return openai_response_format(analysis)
+    if model.startswith(JSON_OBJECT_MODELS):
+        return {"type": "json_object"}
+    return None
+
+
+# OpenAI reasoning models take `max_completion_tokens` and reject any temperature other than the default
+REASONING_MODELS = ("o1", "o3", "o4", "gpt-5")
+
+
+def openai_sampling_params(model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    """Token limit and temperature in the form the OpenAI `model` accepts."""
+    if model.startswith(REASONING_MODELS):
+        return {"max_completion_tokens": max_tokens}
+    return {"max_tokens": max_tokens, "temperature": temperature}
+
+
+def anthropic_tool(analysis: str) -> Dict[str, Any]:
+    """Tool whose input schema is the `analysis` result; forcing it makes Claude answer in that shape."""
+    return {
+        "name": f"record_{analysis}",
+        "description": f"Record the {analysis} analysis result.",
+        "input_schema": RESPONSE_SCHEMAS[analysis]
+    }
+
+
+class StructuredOutputError(ValueError):
+    pass
+
+
+def is_valid(result: Any, analysis: str) -> bool:
+    return isinstance(result, dict) and all(key in result for key in RESULT_KEYS[analysis])
+
+
+def extract_json(text: str, analysis: str) -> Dict[str, Any]:
+    """
+    Return the first JSON object in `text` that has the result keys for `analysis`.
+
+    Clean output is parsed directly; otherwise every '{' is tried as the start of an object, which
+    skips code fences, prose around the object and unrelated objects such as examples.
+    """
+    result, _ = _extract(text, analysis)
+    return result
+
+
+def _extract(text: str, analysis: str):
+    stripped = text.strip()
+    try:
+        result = json.loads(stripped)
+        if is_valid(result, analysis):
+            return result, False
+    except ValueError:
+        pass
+
+    start = stripped.find('{')
+    while start != -1:
+        try:
+            result, _ = _decoder.raw_decode(stripped, start)
+            if is_valid(result, analysis):
+                return result, True
+        except ValueError:
+            pass
+        start = stripped.find('{', start + 1)
+    raise StructuredOutputError(f"No valid {analysis} JSON object in model output: {text[:200]!r}")
+
+
+class JSONStreamExtractor:
+    """
+    Incremental extractor for streamed model output.
+
+    `feed` each text delta as it arrives; it returns the result object as soon as its closing brace is
+    seen, so a caller can stop reading the stream (and stop paying for trailing commentary).
+    """
+
+    def __init__(self, analysis: str):
+        self.analysis = analysis
+        self.buffer: List[str] = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        for char in chunk:
+            if self.depth == 0:
+                if char == '{':
+                    self.buffer = ['{']
+                    self.depth = 1
+                continue
+
+            self.buffer.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                self.depth += 1
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        result = json.loads(''.join(self.buffer))
+                    except ValueError:
+                        continue
+                    if is_valid(result, self.analysis):
+                        return result
+        return None
+
+
+class ParseMetrics:
+    """Per-provider counts of clean, repaired and failed result parses."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, provider: str, outcome: str) -> None:
+        with self.lock:
+            counts = self.counts.setdefault(provider, {"clean": 0, "repaired": 0, "failed": 0})
+            counts[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            report = {}
+            for provider, counts in self.counts.items():
+                total = sum(counts.values())
+                report[provider] = {**counts, "total": total,
+                                    "failure_rate": counts['failed'] / total if total else 0.0}
+            return report
+
+
+PARSE_METRICS = ParseMetrics()
+
+
+def parse_result(text: str, analysis: str, provider: str) -> Dict[str, Any]:
+    """Extract a result from model text, recording the outcome in PARSE_METRICS."""
+    with tracer.span("parse.result", provider=provider, **{"output.chars": len(text)}) as span:
+        try:
+            result, repaired = _extract(text, analysis)
+        except StructuredOutputError:
+            PARSE_METRICS.record(provider, "failed")
+            span.set_attribute("parse.outcome", "failed")
+            raise
+        outcome = "repaired" if repaired else "clean"
+        PARSE_METRICS.record(provider, outcome)
+        span.set_attribute("parse.outcome", outcome)
+        return result
+
+
+def check_result(result: Any, analysis: str, provider: str) -> Dict[str, Any]:
+    """Validate an already-structured result, e.g. Claude tool input, recording the outcome."""
+    if not is_valid(result, analysis):
+        PARSE_METRICS.record(provider, "failed")
+        raise StructuredOutputError(f"Structured {analysis} result is missing required keys: {result!r}"[:300])
+    PARSE_METRICS.record(provider, "clean")
+    return result
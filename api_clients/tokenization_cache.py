@@ -0,0 +1,102 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
+
+import torch
+
+
+class TokenizationCache:
+    def __init__(self, tokenizer, max_length: int = 512, capacity: int = 50000):
+        """
+        Bounded LRU cache of tokenized encodings keyed by the exact input text.
+
+        Only cache misses are sent to the tokenizer, deduplicated and in one batch call, so
+        recycled headlines and boilerplate skip tokenization entirely.
+
+        Parameters:
+            tokenizer: Hugging Face (fast) tokenizer.
+            max_length (int): Truncation length used when encoding.
+            capacity (int): Maximum number of cached encodings.
+        """
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.capacity = capacity
+        self.entries: "OrderedDict[str, Dict[str, Tuple[int, ...]]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Locks cannot be pickled; spawned workers start with their own lock and an empty cache
+        state = self.__dict__.copy()
+        del state['lock']
+        state['entries'] = OrderedDict()
+        state['hits'] = state['misses'] = 0
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def encode_many(self, texts: List[str]) -> List[Dict[str, Tuple[int, ...]]]:
+        """Return unpadded encodings for each text, tokenizing only the misses."""
+        # Keys are the texts themselves: any normalization would change what the model sees
+        keys = list(texts)
+        found: Dict[str, Dict[str, Tuple[int, ...]]] = {}
+
+        with self.lock:
+            for key in keys:
+                if key in found:
+                    continue
+                entry = self.entries.get(key)
+                if entry is not None:
+                    self.entries.move_to_end(key)
+                    found[key] = entry
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            encoded = self.tokenizer(missing, truncation=True, max_length=self.max_length, padding=False)
+            fields = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in encoded]
+            new_entries = {
+                key: {name: tuple(encoded[name][i]) for name in fields}
+                for i, key in enumerate(missing)
+            }
+            found.update(new_entries)
+
+            with self.lock:
+                self.entries.update(new_entries)
+                while len(self.entries) > self.capacity:
+                    self.entries.popitem(last=False)
+
+        return [found[key] for key in keys]
+
+    def encode_batch(self, texts: List[str]) -> Dict[str, torch.Tensor]:
+        """Encode texts and pad them into tensors, ready to pass to the model."""
+        encodings = self.encode_many(texts)
+        width = max(len(encoding['input_ids']) for encoding in encodings)
+        pad_values = {'input_ids': self.tokenizer.pad_token_id, 'attention_mask': 0, 'token_type_ids': 0}
+        left_pad = self.tokenizer.padding_side == 'left'
+
+        batch = {}
+        for name in encodings[0]:
+            tensor = torch.full((len(encodings), width), pad_values[name], dtype=torch.long)
+            for row, encoding in enumerate(encodings):
+                values = torch.tensor(encoding[name], dtype=torch.long)
+                if left_pad:
+                    tensor[row, width - len(values):] = values
+                else:
+                    tensor[row, :len(values)] = values
+            batch[name] = tensor
+        return batch
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
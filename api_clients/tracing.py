@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+
+"""
+Lightweight tracing for the analysis path.
+
+Spans nest through a context variable, so a span opened in APIHandler becomes the parent of the
+client's request and parse spans without being passed around. The sampling decision is taken once
+per trace at the root; unsampled traces get a shared no-op span, which keeps the cost at full load
+to a context-variable lookup per instrumented call.
+
+Finished spans are batched and appended to a file in OTLP/JSON form (one ExportTraceServiceRequest
+per line, as written by the OpenTelemetry collector's file exporter), so they can be loaded into
+Jaeger, Tempo or any OTLP-aware tool.
+"""
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class NoopSpan:
+    is_recording = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        pass
+
+    def set_status(self, code: int, message: str = "") -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+_current_span: ContextVar[Any] = ContextVar('nlie_current_span', default=None)
+
+
+class Span(NoopSpan):
+    is_recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None,
+                 kind: int = SPAN_KIND_INTERNAL):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.events: List[Dict[str, Any]] = []
+        self.status = (0, "")
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes or {}})
+
+    def set_status(self, code: int, message: str = "") -> None:
+        self.status = (code, message)
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.add_event("exception", {"exception.type": type(exception).__name__,
+                                     "exception.message": str(exception)})
+        self.set_status(STATUS_ERROR, str(exception))
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if self.tracer.exporter:
+            self.tracer.exporter.export(self)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OTLPJsonFileExporter:
+    def __init__(self, path: str, service_name: str = "nlie", flush_interval: float = 5.0, max_batch: int = 512):
+        """
+        Buffer finished spans and append them to `path` as OTLP/JSON lines.
+
+        Parameters:
+            path (str): Output file; one ExportTraceServiceRequest is appended per flush.
+            service_name (str): `service.name` resource attribute.
+            flush_interval (float): Seconds between background flushes.
+            max_batch (int): Buffered spans that trigger an immediate flush.
+        """
+        self.path = path
+        self.service_name = service_name
+        self.max_batch = max_batch
+        self.buffer: List[Span] = []
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.exported = 0
+        self.stopped = threading.Event()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.thread = threading.Thread(target=self._flush_periodically, args=(flush_interval,),
+                                       name="trace-export", daemon=True)
+        self.thread.start()
+
+    def export(self, span: Span) -> None:
+        with self.lock:
+            self.buffer.append(span)
+            full = len(self.buffer) >= self.max_batch
+        if full:
+            self.flush()
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self.stopped.wait(interval):
+            self.flush()
+
+    @staticmethod
+    def _encode(span: Span) -> Dict[str, Any]:
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            "events": [{"timeUnixNano": str(event['time_ns']), "name": event['name'],
+                        "attributes": _otlp_attributes(event['attributes'])} for event in span.events],
+            "status": {"code": span.status[0], "message": span.status[1]} if span.status[0] else {}
+        }
+        if span.parent_id:
+            encoded['parentSpanId'] = span.parent_id
+        return encoded
+
+    def flush(self) -> None:
+        with self.lock:
+            spans, self.buffer = self.buffer, []
+        if not spans:
+            return
+        request = {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+            "scopeSpans": [{"scope": {"name": "nlie.api_clients"}, "spans": [self._encode(span) for span in spans]}]
+        }]}
+        with self.write_lock, open(self.path, 'a') as file:
+            file.write(json.dumps(request) + "\n")
+        self.exported += len(spans)
+
+    def shutdown(self) -> None:
+        self.stopped.set()
+        self.flush()
+
+
+class Tracer:
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.exporter: Optional[OTLPJsonFileExporter] = None
+
+    def configure(self, sample_rate: float, exporter: Optional[OTLPJsonFileExporter]) -> None:
+        previous, self.exporter = self.exporter, exporter
+        self.sample_rate = sample_rate
+        # Flush what the old exporter buffered and stop its flush thread; spans ending from now on go to the new one
+        if previous is not None and previous is not exporter:
+            previous.shutdown()
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Any = None,
+                   start_ns: Optional[int] = None, kind: int = SPAN_KIND_INTERNAL):
+        """Start a span under `parent` (default: the current span); the caller must end() it."""
+        parent = parent if parent is not None else _current_span.get()
+        if parent is None:
+            # New trace: the sampling decision is made here, once
+            if self.exporter is None or random.random() >= self.sample_rate:
+                return NOOP_SPAN
+            return Span(self, name, os.urandom(16).hex(), None, attributes, start_ns, kind)
+        if not parent.is_recording:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, attributes, start_ns, kind)
+
+    @contextmanager
+    def use_span(self, span, end_on_exit: bool = False):
+        """Make `span` current for the block, e.g. on a worker thread that picks up queued work."""
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            if end_on_exit:
+                span.end()
+
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+        """Context manager for a child of the current span (or a new, possibly sampled, trace)."""
+        return self.use_span(self.start_span(name, attributes, kind=kind), end_on_exit=True)
+
+    def shutdown(self) -> None:
+        if self.exporter:
+            self.exporter.shutdown()
+
+
+tracer = Tracer()
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+def configure_tracing(settings: Dict[str, Any]) -> Tracer:
+    """Set up the shared tracer from the `tracing_settings` section of config.yaml."""
+    if not settings.get('enabled'):
+        tracer.configure(0.0, None)
+        return tracer
+    exporter = OTLPJsonFileExporter(
+        settings.get('path', './traces/spans.otlp.jsonl'),
+        service_name=settings.get('service_name', 'nlie'),
+        flush_interval=settings.get('flush_interval', 5.0),
+        max_batch=settings.get('max_batch', 512)
+    )
+    tracer.configure(settings.get('sample_rate', 0.01), exporter)
+    return tracer
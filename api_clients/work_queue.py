@@ -0,0 +1,359 @@
+import os
+import json
+import hashlib
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+from typing import Dict, Any, List, Optional
+
+from corpus_reader import split_ranges, parse_range
+from tracing import tracer
+
+"""
+Lease-based work queue for running bulk analysis across several worker nodes.
+
+The queue is a SQLite database on a volume every node can reach. It uses the rollback journal rather
+than WAL, which needs memory shared on one host; the volume must support POSIX file locks (e.g. NFSv4
+with locking enabled), otherwise run the queue on one host only. Each task is a newline-aligned byte
+range of an input JSONL file, so the database stays small even for tens of millions of records.
+Workers lease a task, heartbeat while processing it and write its results to
+`<output>/shard-NNNN/<task>.jsonl` atomically, so a task retried after an expired lease simply
+overwrites the same file. A retry re-analyzes only the records whose results were errors and merges
+them into the rows already written; on its last attempt a task with some successes completes with
+its error count recorded, and only a task where every record failed is marked failed.
+
+    python work_queue.py --db queue.db enqueue --input headlines.jsonl --task-kb 256
+    python work_queue.py --db queue.db work --output results/ --api Claude --analysis "Sentiment Analysis"
+    python work_queue.py --db queue.db status
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    started_at REAL,
+    finished_at REAL,
+    record_count INTEGER,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    last_heartbeat REAL NOT NULL,
+    current_task TEXT,
+    tasks_done INTEGER NOT NULL DEFAULT 0,
+    records_done INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class WorkQueue:
+    def __init__(self, db_path: str, lease_seconds: float = 300.0, max_attempts: int = 3):
+        """
+        Parameters:
+            db_path (str): SQLite database shared by the coordinator and all workers.
+            lease_seconds (float): How long a task stays leased without a heartbeat.
+            max_attempts (int): Leases per task before it is marked failed.
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # `timeout` is SQLite's busy timeout: writers from other nodes are waited for, not failed
+        connection = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        # WAL relies on shared memory within one host and is unsafe with several machines on a network volume
+        connection.execute("PRAGMA journal_mode=DELETE")
+        return connection
+
+    def enqueue_file(self, path: str, task_bytes: int = 256 * 1024, shards: int = 16) -> int:
+        """Split a JSONL file into newline-aligned tasks of about `task_bytes`. Re-enqueueing is a no-op."""
+        path = os.path.abspath(path)
+        # The full path and size identify the input, so another file with the same name is not taken as done
+        identity = hashlib.sha1(f"{path}:{os.path.getsize(path)}".encode()).hexdigest()[:12]
+        name = f"{os.path.basename(path)}-{identity}"
+        return self.enqueue_ranges(name, path, split_ranges(path, task_bytes), shards)
+
+    def enqueue_ranges(self, name: str, path: str, ranges: List[tuple], shards: int = 16) -> int:
+        rows = [(f"{name}:{index:08d}", index % shards, path, start, end)
+                for index, (start, end) in enumerate(ranges)]
+        with self._connect() as connection:
+            before = connection.total_changes
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT OR IGNORE INTO tasks (task_id, shard, path, start_offset, end_offset) VALUES (?, ?, ?, ?, ?)",
+                rows)
+            connection.execute("COMMIT")
+            return connection.total_changes - before
+
+    def register(self, node_id: str) -> None:
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO nodes (node_id, started_at, last_heartbeat) VALUES (?, ?, ?) "
+                "ON CONFLICT(node_id) DO UPDATE SET last_heartbeat = excluded.last_heartbeat",
+                (node_id, now, now))
+
+    def claim(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the next pending task, or one whose previous lease expired."""
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            # Expired leases that used up their attempts are given up on
+            connection.execute(
+                "UPDATE tasks SET status = 'failed', last_error = 'lease expired too many times' "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts))
+            row = connection.execute(
+                "SELECT * FROM tasks WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY attempts, task_id LIMIT 1",
+                (now,)).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+
+            connection.execute(
+                "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, started_at = ? WHERE task_id = ?",
+                (node_id, now + self.lease_seconds, now, row['task_id']))
+            connection.execute("UPDATE nodes SET current_task = ?, last_heartbeat = ? WHERE node_id = ?",
+                               (row['task_id'], now, node_id))
+            connection.execute("COMMIT")
+            return {**dict(row), "attempts": row['attempts'] + 1}
+
+    def heartbeat(self, node_id: str, task_id: str) -> bool:
+        """Extend the lease. Returns False if the task was re-leased to another node."""
+        now = time.time()
+        with self._connect() as connection:
+            updated = connection.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE task_id = ? AND lease_owner = ? AND status = 'leased'",
+                (now + self.lease_seconds, task_id, node_id)).rowcount
+            connection.execute("UPDATE nodes SET last_heartbeat = ? WHERE node_id = ?", (now, node_id))
+            return updated == 1
+
+    def complete(self, node_id: str, task_id: str, record_count: int, error: Optional[str] = None) -> None:
+        """Mark a task done; `error` summarizes records that still failed after the last attempt."""
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            # Output is idempotent, so a late finisher may still mark the task done
+            updated = connection.execute(
+                "UPDATE tasks SET status = 'done', finished_at = ?, record_count = ?, lease_owner = ?, last_error = ? "
+                "WHERE task_id = ? AND status != 'done'",
+                (now, record_count, node_id, error, task_id)).rowcount
+            if updated:
+                connection.execute(
+                    "UPDATE nodes SET tasks_done = tasks_done + 1, records_done = records_done + ?, "
+                    "current_task = NULL, last_heartbeat = ? WHERE node_id = ?",
+                    (record_count, now, node_id))
+            connection.execute("COMMIT")
+
+    def release(self, node_id: str, task_id: str, error: str) -> None:
+        """Give a task back after a failure so another attempt can pick it up."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_owner = NULL, lease_expires = NULL, last_error = ? WHERE task_id = ? AND lease_owner = ?",
+                (self.max_attempts, error, task_id, node_id))
+            connection.execute("UPDATE nodes SET current_task = NULL WHERE node_id = ?", (node_id,))
+
+    def remaining(self) -> int:
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def progress(self, straggler_factor: float = 3.0) -> Dict[str, Any]:
+        """Task counts, per-node throughput, and stragglers: leases running far past the median task time."""
+        now = time.time()
+        with self._connect() as connection:
+            counts = {row['status']: row['n'] for row in
+                      connection.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status")}
+            records_done = connection.execute(
+                "SELECT COALESCE(SUM(record_count), 0) FROM tasks WHERE status = 'done'").fetchone()[0]
+            durations = [row[0] for row in connection.execute(
+                "SELECT finished_at - started_at FROM tasks WHERE status = 'done' ORDER BY 1")]
+            leased = connection.execute(
+                "SELECT task_id, lease_owner, started_at, attempts FROM tasks WHERE status = 'leased'").fetchall()
+            nodes = connection.execute("SELECT * FROM nodes ORDER BY node_id").fetchall()
+
+        median = durations[len(durations) // 2] if durations else None
+        stragglers = [
+            {"task_id": row['task_id'], "node": row['lease_owner'], "running_seconds": round(now - row['started_at'], 1),
+             "attempts": row['attempts']}
+            for row in leased if median and now - row['started_at'] > straggler_factor * median
+        ]
+
+        node_report = []
+        for node in nodes:
+            elapsed = max(node['last_heartbeat'] - node['started_at'], 1e-9)
+            node_report.append({
+                "node": node['node_id'],
+                "tasks_done": node['tasks_done'],
+                "records_done": node['records_done'],
+                "records_per_second": round(node['records_done'] / elapsed, 2),
+                "current_task": node['current_task'],
+                "seconds_since_heartbeat": round(now - node['last_heartbeat'], 1)
+            })
+
+        return {
+            "tasks": counts,
+            "records_done": records_done,
+            "median_task_seconds": round(median, 2) if median is not None else None,
+            "nodes": node_report,
+            "stragglers": stragglers
+        }
+
+
+def read_task_records(task: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return parse_range(task['path'], task['start_offset'], task['end_offset'])
+
+
+def shard_output_path(output_dir: str, task: Dict[str, Any]) -> str:
+    shard_dir = os.path.join(output_dir, f"shard-{task['shard']:04d}")
+    return os.path.join(shard_dir, task['task_id'].replace(os.sep, '_').replace(':', '_') + ".jsonl")
+
+
+def read_shard_output(output_dir: str, task: Dict[str, Any], record_count: int) -> List[Optional[Dict[str, Any]]]:
+    """Rows a previous attempt wrote for the task, in record order, or all None if there are none usable."""
+    path = shard_output_path(output_dir, task)
+    try:
+        with open(path) as file:
+            rows = [json.loads(line) for line in file if line.strip()]
+    except (OSError, ValueError):
+        return [None] * record_count
+    # Written by an attempt over the same byte range, so anything but a full set means the file is not ours
+    return rows if len(rows) == record_count else [None] * record_count
+
+
+def _failed(row: Optional[Dict[str, Any]]) -> bool:
+    return row is None or not isinstance(row.get('results'), dict) or 'error' in row['results']
+
+
+def write_shard_output(output_dir: str, task: Dict[str, Any], rows: List[Dict[str, Any]], node_id: str) -> str:
+    """Write a task's results atomically; a retried task replaces the same file."""
+    path = shard_output_path(output_dir, task)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Pids repeat across machines sharing the volume; node ids do not
+    temp_path = f"{path}.{node_id.replace(os.sep, '_')}.tmp"
+    with open(temp_path, 'w') as file:
+        for row in rows:
+            file.write(json.dumps(row) + "\n")
+    os.replace(temp_path, path)
+    return path
+
+
+def run_worker(queue: WorkQueue, handler, output_dir: str, api_name: str, analysis_type: str,
+               node_id: Optional[str] = None, idle_exit: bool = True) -> Dict[str, Any]:
+    """
+    Lease and process tasks until the queue is drained.
+
+    Returns this node's counts of completed and released tasks and the ids of tasks whose lease
+    expired while they were being processed (their output is idempotent, so they still count as done).
+    """
+    node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue.register(node_id)
+    summary = {"node": node_id, "completed": 0, "released": 0, "leases_lost": []}
+
+    while True:
+        task = queue.claim(node_id)
+        if task is None:
+            if idle_exit and queue.remaining() == 0:
+                return summary
+            # Other nodes still hold leases that may expire and need retrying
+            time.sleep(min(queue.lease_seconds / 3, 10))
+            queue.heartbeat(node_id, "")
+            continue
+
+        stop = threading.Event()
+        lease_lost = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(queue.lease_seconds / 3):
+                if not queue.heartbeat(node_id, task['task_id']):
+                    lease_lost.set()
+                    return
+
+        heartbeat_thread = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat_thread.start()
+        try:
+            records = read_task_records(task)
+            # A retry keeps the rows earlier attempts got right and re-analyzes only the failed ones
+            rows = read_shard_output(output_dir, task, len(records)) if task['attempts'] > 1 else [None] * len(records)
+            pending = [index for index, row in enumerate(rows) if _failed(row)]
+            futures = {index: handler.submit(api_name, analysis_type, records[index]['text'], 'bulk')
+                       for index in pending}
+            for index, future in futures.items():
+                rows[index] = {**records[index], "api": api_name, "analysis_type": analysis_type,
+                               "results": future.result()}
+            with tracer.span("output.write", task=task['task_id'], records=len(rows), analyzed=len(pending)):
+                write_shard_output(output_dir, task, rows, node_id)
+            errors = [row['results'].get('error', 'invalid result') if isinstance(row['results'], dict)
+                      else 'invalid result' for row in rows if _failed(row)]
+            error = f"{len(errors)} of {len(rows)} records failed: {errors[0]}" if errors else None
+            if errors and (task['attempts'] < queue.max_attempts or len(errors) == len(rows)):
+                # Retried until max_attempts; a task where every record failed is then left failed
+                queue.release(node_id, task['task_id'], error)
+                summary['released'] += 1
+                continue
+            queue.complete(node_id, task['task_id'], len(rows), error)
+            summary['completed'] += 1
+            if lease_lost.is_set():
+                summary['leases_lost'].append(task['task_id'])
+        except Exception as e:
+            queue.release(node_id, task['task_id'], str(e))
+            summary['released'] += 1
+        finally:
+            stop.set()
+            heartbeat_thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed bulk analysis over a shared work queue")
+    parser.add_argument("--db", required=True, help="Path of the shared SQLite queue")
+    parser.add_argument("--lease-seconds", type=float, default=300.0)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Split an input JSONL file into tasks")
+    enqueue_parser.add_argument("--input", required=True)
+    enqueue_parser.add_argument("--task-kb", type=int, default=256, help="Approximate input size of each task")
+    enqueue_parser.add_argument("--shards", type=int, default=16)
+
+    work_parser = subparsers.add_parser("work", help="Run a worker node")
+    work_parser.add_argument("--output", required=True)
+    work_parser.add_argument("--api", default="Claude")
+    work_parser.add_argument("--analysis", default="Sentiment Analysis")
+    work_parser.add_argument("--node-id")
+
+    subparsers.add_parser("status", help="Report progress, per-node throughput and stragglers")
+
+    args = parser.parse_args()
+    queue = WorkQueue(args.db, lease_seconds=args.lease_seconds)
+
+    if args.command == "enqueue":
+        print(f"Enqueued {queue.enqueue_file(args.input, args.task_kb * 1024, args.shards)} new tasks")
+    elif args.command == "work":
+        from api_handler import APIHandler
+        handler = APIHandler()
+        try:
+            print(json.dumps(run_worker(queue, handler, args.output, args.api, args.analysis, args.node_id), indent=2))
+        finally:
+            handler.close()
+    else:
+        print(json.dumps(queue.progress(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
 import json
 import requests
+from async_transport import AsyncChatCompletionsClient
 
 class OpenAIClient:
     def __init__(self, api_key, base_url="https://api.x.ai/v1"):
@@ -17,6 +18,7 @@ class OpenAIClient:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.async_client = AsyncChatCompletionsClient(api_key, base_url)
 
     def chat_completion(self, model, messages):
         """
@@ -40,6 +42,19 @@ class OpenAIClient:
         else:
             response.raise_for_status()
 
+    async def achat_completion(self, model, messages):
+        """
+        Async variant of chat_completion. Concurrent calls share a few HTTP/2 connections.
+
+        Parameters:
+            model (str): The model to use, e.g., "grok-2-latest".
+            messages (list): A list of messages in the chat format.
+
+        Returns:
+            dict: The response from the API.
+        """
+        return await self.async_client.chat_completion(model, messages)
+
 # Example usage
 if __name__ == "__main__":
     XAI_API_KEY = ""
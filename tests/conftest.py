@@ -0,0 +1,15 @@
+import os
+import sys
+import socket
+
+import pytest
+
+# The modules under api_clients import each other by bare name, as when run from that directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api_clients"))
+
+
+@pytest.fixture
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
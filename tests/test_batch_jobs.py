@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import batch_standin_server
+from batch_jobs import BatchJob, OpenAIBatchJob, AnthropicBatchJob, ENVELOPE_BYTES
+
+RECORDS = [{"id": f"r{index}", "text": f"Tesla beats estimates {index}", "source": "wire"} for index in range(5)]
+RECORDS[2] = {"id": "r2", "text": "FAIL this one", "source": "wire"}
+
+
+@pytest.fixture
+def server_port(free_port):
+    server = batch_standin_server.serve(free_port, delay=0.1)
+    yield free_port
+    server.shutdown()
+
+
+@pytest.fixture(params=["openai", "anthropic"])
+def job(request, server_port):
+    if request.param == "openai":
+        return OpenAIBatchJob("key", f"http://127.0.0.1:{server_port}/v1", max_requests=2)
+    return AnthropicBatchJob("key", f"http://127.0.0.1:{server_port}", max_requests=2)
+
+
+def test_inputs_are_split_at_the_request_limit(job):
+    assert len(job.submit(RECORDS)) == 3
+
+
+def test_inputs_are_split_at_the_size_limit():
+    job = OpenAIBatchJob("key")
+    request_size = len(json.dumps(job._request("r0", RECORDS[0]))) + 1
+    job.max_bytes = ENVELOPE_BYTES + 2 * request_size + 10
+    assert [len(chunk) for chunk in job._split([job._request(r["id"], r) for r in RECORDS])] == [2, 2, 1]
+
+
+def test_results_join_back_to_input_records(job, tmp_path):
+    job.submit(RECORDS)
+    state = str(tmp_path / "job.json")
+    job.save(state)
+
+    resumed = BatchJob.load(state, "key")
+    assert resumed.batch_ids == job.batch_ids
+    rows = resumed.join(RECORDS, resumed.collect(poll_interval=0.05, timeout=10))
+
+    assert [row["id"] for row in rows] == [record["id"] for record in RECORDS]
+    assert all(row["source"] == "wire" and row["api"] == f"batch:{job.provider}" for row in rows)
+    assert all(row["analysis_type"] == "Sentiment Analysis" for row in rows)
+    assert "error" in rows[2]["results"]
+    assert all("sentiment" in row["results"] and "error" not in row["results"] for row in rows if row["id"] != "r2")
+
+
+def test_old_single_batch_state_still_loads(tmp_path):
+    state = tmp_path / "job.json"
+    state.write_text(json.dumps({"provider": "openai", "batch_id": "batch_1", "record_ids": ["a"], "model": "m",
+                                 "analysis": "sentiment", "base_url": "http://localhost"}))
+    assert BatchJob.load(str(state), "key").batch_ids == ["batch_1"]
+
+
+def test_duplicate_record_ids_are_rejected():
+    with pytest.raises(ValueError):
+        OpenAIBatchJob("key").submit([{"id": "a", "text": "x"}, {"id": "a", "text": "y"}])
+
+
+def test_reasoning_model_bodies_omit_temperature():
+    body = OpenAIBatchJob("key", model="o3-mini")._request("a", {"text": "x"})["body"]
+    assert body["max_completion_tokens"] == 1000 and "temperature" not in body and "max_tokens" not in body
@@ -0,0 +1,94 @@
+import asyncio
+from concurrent.futures import Future
+
+import pytest
+
+import feed_fixture_server
+from feed_fixture_server import ITEMS_PER_FEED
+from feed_ingest import FeedIngestor, IngestionState, AnalysisSink
+
+OK = {"sentiment": {"positive": 60.0, "neutral": 30.0, "negative": 10.0}}
+
+
+class PendingHandler:
+    """Hands out futures the test resolves, standing in for APIHandler.submit."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, api_name, analysis_type, text, priority):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+@pytest.fixture
+def sources(free_port):
+    # A long item interval keeps the feeds unchanged for the whole test
+    server = feed_fixture_server.serve(free_port, item_interval=1000.0)
+    yield [{"name": f"f{feed}", "url": f"http://127.0.0.1:{free_port}/feeds/{feed}.xml", "interval": 0}
+           for feed in range(3)]
+    server.shutdown()
+
+
+def ingestor(sources, state):
+    handler = PendingHandler()
+    return FeedIngestor(sources, state, AnalysisSink(handler, "Any", ["Sentiment Analysis"])), handler
+
+
+def seen_count(state):
+    return state.connection.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+
+def test_unchanged_feeds_cost_a_304(sources, tmp_path):
+    state = IngestionState(str(tmp_path / "state.db"))
+    first, handler = ingestor(sources, state)
+    assert asyncio.run(first.poll_once()) == 3 * ITEMS_PER_FEED
+    for future in handler.futures:
+        future.set_result(OK)
+
+    second, handler = ingestor(sources, state)
+    assert asyncio.run(second.poll_once()) == 0
+    assert second.stats["not_modified"] == 3
+    assert handler.futures == []
+
+
+def test_items_cut_off_by_a_crash_are_fetched_again(sources, tmp_path):
+    path = str(tmp_path / "state.db")
+    crashed, _ = ingestor(sources, IngestionState(path))
+    assert asyncio.run(crashed.poll_once()) == 3 * ITEMS_PER_FEED
+
+    # Nothing was written before the crash, so no validators or seen ids were saved
+    state = IngestionState(path)
+    assert state.source("f0")["etag"] is None
+    restarted, handler = ingestor(sources, state)
+    assert asyncio.run(restarted.poll_once()) == 3 * ITEMS_PER_FEED
+    assert restarted.stats["not_modified"] == 0
+
+    for future in handler.futures:
+        future.set_result(OK)
+    assert seen_count(state) == 3 * ITEMS_PER_FEED
+    assert all(state.source(f"f{feed}")["etag"] for feed in range(3))
+
+
+def test_failed_analysis_holds_back_validators(sources, tmp_path):
+    state = IngestionState(str(tmp_path / "state.db"))
+    first, handler = ingestor(sources, state)
+    asyncio.run(first.poll_once())
+    handler.futures[0].set_result({"error": "An error occurred: circuit open", **OK})
+    for future in handler.futures[1:]:
+        future.set_result(OK)
+
+    failed_feed = next(source["name"] for source in sources if state.source(source["name"])["etag"] is None)
+    assert seen_count(state) == 3 * ITEMS_PER_FEED - 1
+
+    # Only the feed with the failed item is fetched in full, and only that item is new
+    retry, handler = ingestor(sources, state)
+    assert asyncio.run(retry.poll_once()) == 1
+    assert retry.stats["not_modified"] == 2
+    handler.futures[0].set_result(OK)
+    assert state.source(failed_feed)["etag"]
+
+    settled, _ = ingestor(sources, state)
+    assert asyncio.run(settled.poll_once()) == 0
+    assert settled.stats["not_modified"] == 3
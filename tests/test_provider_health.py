@@ -0,0 +1,78 @@
+import time
+
+from provider_health import ProviderHealth, HealthTracker, CLOSED, OPEN, HALF_OPEN
+
+
+def tripped(open_seconds=0.05, **kwargs):
+    health = ProviderHealth("p", min_requests=4, failure_threshold=0.5, open_seconds=open_seconds, **kwargs)
+    for ok in (True, False, False, False):
+        assert health.allow_request()
+        health.record(ok, 0.1)
+    return health
+
+
+def test_breaker_opens_at_failure_threshold():
+    health = tripped(open_seconds=30)
+    assert health.state == OPEN
+    assert health.is_open()
+    assert not health.allow_request()
+    assert health.route_key() is None
+
+
+def test_breaker_stays_closed_below_min_requests():
+    health = ProviderHealth("p", min_requests=10)
+    for _ in range(5):
+        health.record(False, 0.1)
+    assert health.state == CLOSED
+
+
+def test_successful_probe_closes_breaker():
+    health = tripped()
+    time.sleep(0.06)
+    assert health.route_key() == (1, 0.0)
+    assert health.allow_request()
+    assert health.state == HALF_OPEN
+    # Only one probe at a time
+    assert not health.allow_request()
+    health.record(True, 0.1)
+    assert health.state == CLOSED
+    assert health.allow_request()
+
+
+def test_failed_probe_reopens_breaker():
+    health = tripped()
+    time.sleep(0.06)
+    assert health.allow_request()
+    health.record(False, 0.1)
+    assert health.state == OPEN
+    assert not health.allow_request()
+
+
+def test_released_probe_frees_the_slot():
+    health = tripped()
+    time.sleep(0.06)
+    assert health.allow_request()
+    health.release_probe()
+    assert health.allow_request()
+
+
+def test_routing_prefers_fast_then_untried_and_sidelines_failures():
+    tracker = HealthTracker({"min_requests": 100}, explore_every=0)
+    for _ in range(5):
+        tracker.get("fast").record(True, 0.1)
+        tracker.get("slow").record(True, 2.0)
+        tracker.get("failing").record(False, 0.1)
+    assert tracker.fastest(["slow", "fast", "failing"]) == "fast"
+    # No data yet is scored optimistically, so a new provider gets tried
+    assert tracker.fastest(["slow", "fast", "new"]) == "new"
+    assert tracker.fastest(["failing", "slow"]) == "slow"
+    assert tracker.fastest(["failing"]) == "failing"
+
+
+def test_exploration_picks_least_sampled_provider():
+    tracker = HealthTracker({"min_requests": 100}, explore_every=2)
+    for _ in range(10):
+        tracker.get("fast").record(True, 0.1)
+    for _ in range(2):
+        tracker.get("slow").record(True, 2.0)
+    assert [tracker.fastest(["fast", "slow"]) for _ in range(4)] == ["fast", "slow", "fast", "slow"]
@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import pytest
+
+from record_replay import (TrafficRecorder, RecordReplayTransport, AsyncRecordReplayTransport, CassetteMiss, RECORD,
+                           REPLAY)
+
+
+def counting_upstream():
+    calls = []
+
+    def handle(request):
+        calls.append(request.content)
+        return httpx.Response(200, json={"call": len(calls), "echo": request.content.decode()})
+
+    return calls, handle
+
+
+def test_recorded_traffic_replays_in_order_without_upstream(tmp_path):
+    cassette = str(tmp_path / "traffic.jsonl.gz")
+    calls, handle = counting_upstream()
+    recorder = TrafficRecorder(cassette, RECORD)
+    with httpx.Client(transport=RecordReplayTransport(recorder, httpx.MockTransport(handle))) as client:
+        first = client.post("https://api.example/v1/chat", content=b"same").json()
+        second = client.post("https://api.example/v1/chat", content=b"same").json()
+        other = client.post("https://api.example/v1/chat", content=b"other").json()
+    recorder.save()
+    assert len(calls) == 3
+
+    replayer = TrafficRecorder(cassette, REPLAY, latency='fast')
+    with replayer.httpx_client() as client:
+        assert client.post("https://api.example/v1/chat", content=b"same").json() == first
+        assert client.post("https://api.example/v1/chat", content=b"same").json() == second
+        assert client.post("https://api.example/v1/chat", content=b"other").json() == other
+        # Past the end of the recordings the last one is repeated
+        assert client.post("https://api.example/v1/chat", content=b"same").json() == second
+        with pytest.raises(CassetteMiss):
+            client.post("https://api.example/v1/chat", content=b"never recorded")
+    assert len(calls) == 3
+
+
+def test_async_transport_replays_recorded_traffic(tmp_path):
+    cassette = str(tmp_path / "traffic.jsonl.gz")
+    calls, handle = counting_upstream()
+    recorder = TrafficRecorder(cassette, RECORD)
+
+    async def exchange(transport):
+        async with httpx.AsyncClient(transport=transport) as client:
+            return (await client.post("https://api.example/v1/chat", content=b"async")).json()
+
+    recorded = asyncio.run(exchange(AsyncRecordReplayTransport(recorder, httpx.MockTransport(handle))))
+    recorder.save()
+
+    replayer = TrafficRecorder(cassette, REPLAY, latency='fast')
+    assert asyncio.run(exchange(replayer.async_transport())) == recorded
+    assert len(calls) == 1
+    assert replayer.cassette.stats()["unique_requests"] == 1
+
+
+def test_invalid_modes_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        TrafficRecorder(str(tmp_path / "c.jsonl.gz"), "live")
+    with pytest.raises(ValueError):
+        TrafficRecorder(str(tmp_path / "c.jsonl.gz"), REPLAY, latency="slow")
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from request_scheduler import RequestScheduler, DeadlineExceeded
+
+
+def blocked_scheduler(**kwargs):
+    """A scheduler with one slot for provider "p", held until the returned event is set."""
+    scheduler = RequestScheduler({"p": 1}, **kwargs)
+    release, started = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+        return "held"
+
+    held = scheduler.submit("p", hold, 'interactive')
+    assert started.wait(5)
+    return scheduler, release, held
+
+
+def test_higher_priority_runs_first():
+    scheduler, release, held = blocked_scheduler()
+    order = []
+    futures = [scheduler.submit("p", lambda name=name: order.append(name), priority)
+               for name, priority in (("bulk", 'bulk'), ("normal", 'normal'), ("interactive", 'interactive'))]
+    release.set()
+    for future in futures:
+        future.result(5)
+    assert order == ["interactive", "normal", "bulk"]
+    scheduler.shutdown()
+
+
+def test_aged_request_jumps_ahead_once_per_window():
+    scheduler, release, held = blocked_scheduler(max_wait={'bulk': 0.0}, aged_every=3)
+    order = []
+    futures = [scheduler.submit("p", lambda: order.append("bulk"), 'bulk')]
+    futures += [scheduler.submit("p", lambda index=index: order.append(f"i{index}"), 'interactive')
+                for index in range(4)]
+    release.set()
+    for future in futures:
+        future.result(5)
+    # The held call and i0 are dispatched before the aged bulk request gets its turn
+    assert order == ["i0", "bulk", "i1", "i2", "i3"]
+    scheduler.shutdown()
+
+
+def test_request_expires_before_dispatch():
+    scheduler, release, held = blocked_scheduler()
+    ran = []
+    expiring = scheduler.submit("p", lambda: ran.append("late"), 'bulk', timeout=0.01)
+    threading.Event().wait(0.05)
+    release.set()
+    with pytest.raises(DeadlineExceeded):
+        expiring.result(5)
+    assert held.result(5) == "held"
+    assert ran == []
+    assert scheduler.metrics()["p"]["priorities"]["bulk"]["dropped"] == 1
+    scheduler.shutdown()
+
+
+def test_cancelled_request_is_dropped():
+    scheduler, release, held = blocked_scheduler()
+    ran = []
+    cancelled = scheduler.submit("p", lambda: ran.append("cancelled"), 'normal')
+    assert cancelled.cancel()
+    after = scheduler.submit("p", lambda: "after", 'normal')
+    release.set()
+    assert after.result(5) == "after"
+    assert ran == []
+    scheduler.shutdown()
+
+
+def test_unknown_priority_is_rejected():
+    scheduler = RequestScheduler()
+    with pytest.raises(ValueError):
+        scheduler.submit("p", lambda: None, 'urgent')
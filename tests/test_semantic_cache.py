@@ -0,0 +1,112 @@
+import sys
+import types
+import zlib
+
+import numpy as np
+import pytest
+
+
+class HashEmbedder:
+    """Deterministic unit vectors; texts that differ only after a '#' embed identically."""
+    dimension = 16
+
+    def encode_one(self, text):
+        seed = zlib.crc32(text.split('#')[0].encode())
+        vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def semantic_cache(monkeypatch):
+    # The real embedder needs torch; the cache only uses its encode_one and dimension
+    fake = types.ModuleType("sentence_embedder")
+    fake.SentenceEmbedder = HashEmbedder
+    monkeypatch.setitem(sys.modules, "sentence_embedder", fake)
+    monkeypatch.delitem(sys.modules, "semantic_cache", raising=False)
+    import semantic_cache
+    return semantic_cache
+
+
+def open_cache(module, directory, **kwargs):
+    kwargs = {"capacity": 10, "block_size": 4, "default_threshold": 0.99, **kwargs}
+    return module.SemanticCache(HashEmbedder(), str(directory), **kwargs)
+
+
+def test_similar_text_hits_within_its_namespace(semantic_cache, tmp_path):
+    cache = open_cache(semantic_cache, tmp_path)
+    cache.store("Claude:sentiment", "Tesla beats estimates", {"label": "positive"})
+    hit = cache.lookup("Claude:sentiment", "sentiment", "Tesla beats estimates#reworded")
+    assert hit["label"] == "positive"
+    assert hit["cache"]["matched_text"] == "Tesla beats estimates"
+    assert cache.lookup("xAI:sentiment", "sentiment", "Tesla beats estimates") is None
+    assert cache.lookup("Claude:sentiment", "sentiment", "Meta cuts jobs") is None
+
+
+def test_hits_return_copies(semantic_cache, tmp_path):
+    cache = open_cache(semantic_cache, tmp_path)
+    cache.store("n", "text", {"scores": {"positive": 1}})
+    cache.lookup("n", "sentiment", "text")["scores"]["positive"] = 0
+    assert cache.lookup("n", "sentiment", "text")["scores"]["positive"] == 1
+
+
+def test_entries_survive_reopen(semantic_cache, tmp_path):
+    cache = open_cache(semantic_cache, tmp_path, flush_every=1000)
+    for index in range(3):
+        cache.store("a", f"a{index}", {"value": index})
+    cache.store("b", "b0", {"value": "b"})
+    cache.flush()
+
+    reopened = open_cache(semantic_cache, tmp_path)
+    assert reopened.lookup("a", "sentiment", "a2")["value"] == 2
+    assert reopened.lookup("b", "sentiment", "b0")["value"] == "b"
+    assert reopened.stats()["size"] == 4
+
+
+def test_log_is_compacted_into_snapshot(semantic_cache, tmp_path):
+    cache = open_cache(semantic_cache, tmp_path, flush_every=2)
+    for index in range(12):
+        cache.store("a", f"a{index}", {"value": index})
+    cache.flush()
+    assert (tmp_path / "entries.json").exists()
+    assert cache.log_lines <= max(len(cache.entries), cache.flush_every)
+
+    reopened = open_cache(semantic_cache, tmp_path)
+    assert reopened.entries == cache.entries
+    assert reopened.lookup("a", "sentiment", "a11")["value"] == 11
+
+
+def test_unflushed_slots_are_dropped_after_unclean_exit(semantic_cache, tmp_path):
+    cache = open_cache(semantic_cache, tmp_path, flush_every=1000)
+    cache.store("a", "kept", {"value": 1})
+    cache.flush()
+    cache.store("a", "lost", {"value": 2})
+    cache.vectors.flush()
+    cache.namespaces.flush()
+
+    reopened = open_cache(semantic_cache, tmp_path)
+    assert reopened.lookup("a", "sentiment", "kept")["value"] == 1
+    assert reopened.lookup("a", "sentiment", "lost") is None
+    assert reopened.stats()["size"] == 1
+
+
+def test_full_namespace_evicts_its_least_recently_used_entry(semantic_cache, tmp_path):
+    cache = open_cache(semantic_cache, tmp_path, capacity=4, block_size=4)
+    for index in range(4):
+        cache.store("a", f"a{index}", {"value": index})
+    cache.lookup("a", "sentiment", "a0")
+    cache.store("a", "a4", {"value": 4})
+    assert cache.lookup("a", "sentiment", "a0") is not None
+    assert cache.lookup("a", "sentiment", "a1") is None
+    assert cache.lookup("a", "sentiment", "a4") is not None
+
+
+def test_new_namespace_takes_the_stalest_block(semantic_cache, tmp_path):
+    cache = open_cache(semantic_cache, tmp_path, capacity=8, block_size=4)
+    for index in range(4):
+        cache.store("old", f"old{index}", {"value": index})
+    for index in range(4):
+        cache.store("recent", f"recent{index}", {"value": index})
+    cache.store("new", "new0", {"value": 0})
+    assert cache.lookup("new", "sentiment", "new0") is not None
+    assert cache.lookup("old", "sentiment", "old3") is None
+    assert cache.lookup("recent", "sentiment", "recent3") is not None
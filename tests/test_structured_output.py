@@ -0,0 +1,69 @@
+import pytest
+
+from structured_output import (extract_json, parse_result, check_result, JSONStreamExtractor, StructuredOutputError,
+                               PARSE_METRICS, openai_response_format_for, openai_sampling_params)
+
+SENTIMENT = '{"sentiment": {"positive": 70, "neutral": 20, "negative": 10}, "explanation": "Beat estimates"}'
+
+
+def test_clean_output_parses_directly():
+    assert extract_json(SENTIMENT, "sentiment")["sentiment"]["positive"] == 70
+
+
+@pytest.mark.parametrize("text", [
+    f"```json\n{SENTIMENT}\n```",
+    f"Here is the analysis:\n{SENTIMENT}\nLet me know if you need more.",
+    # An example object before the answer is skipped because it lacks the result keys
+    f'For example {{"label": "x"}} would be wrong. Answer: {SENTIMENT}',
+    # Braces inside strings do not confuse the scan
+    '{"sentiment": {"positive": 1, "neutral": 0, "negative": 0}, "explanation": "uses { and } in text"}',
+])
+def test_object_is_found_around_noise(text):
+    assert "sentiment" in extract_json(text, "sentiment")
+
+
+@pytest.mark.parametrize("text", ["", "no json here", '{"sentiment": ', '{"entities": []}'])
+def test_missing_or_wrong_object_raises(text):
+    with pytest.raises(StructuredOutputError):
+        extract_json(text, "sentiment")
+
+
+def test_parse_outcomes_are_counted_per_provider():
+    parse_result(SENTIMENT, "sentiment", "test-provider")
+    parse_result(f"Sure! {SENTIMENT}", "sentiment", "test-provider")
+    with pytest.raises(StructuredOutputError):
+        parse_result("I cannot help with that.", "sentiment", "test-provider")
+    counts = PARSE_METRICS.snapshot()["test-provider"]
+    assert (counts["clean"], counts["repaired"], counts["failed"]) == (1, 1, 1)
+
+
+def test_check_result_rejects_missing_keys():
+    assert check_result({"entities": []}, "ner", "test-check") == {"entities": []}
+    with pytest.raises(StructuredOutputError):
+        check_result({"categories": []}, "ner", "test-check")
+
+
+def test_stream_extractor_returns_at_closing_brace():
+    extractor = JSONStreamExtractor("sentiment")
+    chunks = ['Thinking... {"example": {"a": 1}} then ', SENTIMENT[:25], SENTIMENT[25:], " and trailing prose"]
+    results = [extractor.feed(chunk) for chunk in chunks]
+    assert results[:2] == [None, None]
+    assert results[2]["sentiment"]["negative"] == 10
+
+
+def test_stream_extractor_handles_escaped_quotes():
+    extractor = JSONStreamExtractor("ner")
+    text = '{"entities": [{"text": "The \\"Big\\" {Deal}", "type": "MISC"}]}'
+    assert [extractor.feed(char) for char in text][-1]["entities"][0]["text"] == 'The "Big" {Deal}'
+
+
+def test_response_format_follows_model_support():
+    assert openai_response_format_for("gpt-4o-mini", "ner")["type"] == "json_schema"
+    assert openai_response_format_for("gpt-4o-2024-05-13", "ner") is None
+    assert openai_response_format_for("gpt-3.5-turbo", "ner") == {"type": "json_object"}
+    assert openai_response_format_for("some-other-model", "ner") is None
+
+
+def test_reasoning_models_get_completion_token_limit_without_temperature():
+    assert openai_sampling_params("o3-mini", 500, 0) == {"max_completion_tokens": 500}
+    assert openai_sampling_params("gpt-4o", 500, 0) == {"max_tokens": 500, "temperature": 0}
@@ -0,0 +1,69 @@
+import json
+from concurrent.futures import Future
+
+from work_queue import WorkQueue, run_worker, shard_output_path
+
+
+class FlakyHandler:
+    """Fails texts containing "FAIL" on their first `failures` calls, and counts every call."""
+
+    def __init__(self, failures=1):
+        self.failures = failures
+        self.calls = {}
+
+    def submit(self, api_name, analysis_type, text, priority):
+        self.calls[text] = self.calls.get(text, 0) + 1
+        future = Future()
+        if "FAIL" in text and self.calls[text] <= self.failures:
+            future.set_result({"error": "An error occurred: rate limited"})
+        else:
+            future.set_result({"sentiment": {"positive": 60.0, "neutral": 30.0, "negative": 10.0}})
+        return future
+
+
+def make_queue(tmp_path, texts, max_attempts=3):
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text("".join(json.dumps({"id": index, "text": text}) + "\n" for index, text in enumerate(texts)))
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=30, max_attempts=max_attempts)
+    queue.enqueue_file(str(corpus), task_bytes=1 << 20)
+    return queue
+
+
+def output_rows(tmp_path, queue):
+    with queue._connect() as connection:
+        tasks = [dict(row) for row in connection.execute("SELECT * FROM tasks")]
+    rows = []
+    for task in tasks:
+        with open(shard_output_path(str(tmp_path / "out"), task)) as file:
+            rows += [json.loads(line) for line in file]
+    return tasks, rows
+
+
+def test_retry_reanalyzes_only_failed_records(tmp_path):
+    texts = [f"headline {index}" for index in range(20)] + ["FAIL one", "FAIL two"]
+    queue = make_queue(tmp_path, texts)
+    handler = FlakyHandler(failures=1)
+
+    summary = run_worker(queue, handler, str(tmp_path / "out"), "Any", "Sentiment Analysis", node_id="n1")
+
+    assert summary["released"] == 1 and summary["completed"] == 1
+    assert all(count == 1 for text, count in handler.calls.items() if "FAIL" not in text)
+    assert handler.calls["FAIL one"] == 2 and handler.calls["FAIL two"] == 2
+    tasks, rows = output_rows(tmp_path, queue)
+    assert [task["status"] for task in tasks] == ["done"]
+    assert [row["text"] for row in rows] == texts
+    assert not any("error" in row["results"] for row in rows)
+
+
+def test_records_still_failing_are_reported_after_last_attempt(tmp_path):
+    queue = make_queue(tmp_path, ["fine", "FAIL always"], max_attempts=2)
+    handler = FlakyHandler(failures=10)
+
+    summary = run_worker(queue, handler, str(tmp_path / "out"), "Any", "Sentiment Analysis", node_id="n1")
+
+    assert summary["completed"] == 1
+    assert handler.calls == {"fine": 1, "FAIL always": 2}
+    tasks, rows = output_rows(tmp_path, queue)
+    assert tasks[0]["status"] == "done"
+    assert tasks[0]["last_error"].startswith("1 of 2 records failed")
+    assert "error" in rows[1]["results"]